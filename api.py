@@ -0,0 +1,241 @@
+# api.py - JSON API (v1) for shifts, applications and the current user
+import hashlib
+import time
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_login import current_user
+
+from models import DoctorUser, HospitalUser, Shift
+from utils.applications import applicants_by_shift, history_rows
+from utils.encryption import Encryptor
+from utils.events import format_sse, get_broker
+from utils.loading import load_shift_hospitals
+from utils.matching import get_matching_engine
+from utils.roster import RosterImport
+from utils.shift_search import ShiftSearch
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+SHIFT_FIELDS = ('id', 'hospital_id', 'hospital_name', 'city', 'title', 'specialty', 'shift_date',
+                'start_time', 'end_time', 'pay_rate', 'pay_type', 'location_ward', 'requirements',
+                'is_urgent', 'status', 'capacity', 'applications_count', 'posted_at', 'updated_at', 'snippet',
+                'distance_km')
+DEFAULT_SHIFT_FIELDS = ('id', 'hospital_name', 'city', 'title', 'specialty', 'shift_date', 'start_time',
+                        'end_time', 'pay_rate', 'pay_type', 'is_urgent', 'status')
+DEFAULT_APPLICATION_FIELDS = ('id', 'shift_id', 'doctor_id', 'doctor_name', 'status', 'applied_at',
+                              'payment_amount', 'payment_status', 'updated_at', 'shift')
+APPLICATION_FIELDS = DEFAULT_APPLICATION_FIELDS + ('doctor_phone',)
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapped
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def requested_fields(allowed, default):
+    """Parse ?fields=a,b,c, keeping only known fields and falling back to `default`."""
+    raw = request.args.get('fields')
+    if not raw:
+        return default
+    fields = tuple(field for field in raw.split(',') if field in allowed)
+    return fields or default
+
+
+def row_version(row):
+    return row.updated_at or getattr(row, 'posted_at', None) or getattr(row, 'applied_at', None)
+
+
+def serialize_shift(shift, fields):
+    data = {}
+    for field in fields:
+        if field == 'hospital_name':
+            data[field] = shift.hospital.hospital_name if shift.hospital else None
+        elif field == 'city':
+            profile = shift.hospital.profile if shift.hospital else None
+            data[field] = profile.city if profile else None
+        elif field in ('shift_date', 'start_time', 'end_time', 'posted_at', 'updated_at'):
+            data[field] = _iso(getattr(shift, field))
+        elif field == 'distance_km':
+            data[field] = getattr(shift, 'distance_km', None)  # set by ShiftSearch for ?near= searches
+        elif field == 'snippet':
+            snippet = getattr(shift, 'search_snippet', None)  # set by ShiftSearch for ?q= searches
+            data[field] = str(snippet) if snippet else None
+        else:
+            data[field] = getattr(shift, field)
+    return data
+
+
+def serialize_application(application, fields, shift=None, doctor=None, shift_fields=DEFAULT_SHIFT_FIELDS):
+    data = {}
+    for field in fields:
+        if field == 'shift':
+            data[field] = serialize_shift(shift, shift_fields) if shift else None
+        elif field == 'doctor_name':
+            data[field] = doctor.full_name if doctor else None
+        elif field == 'doctor_phone':
+            data[field] = doctor.profile.phone if doctor and doctor.profile else None
+        elif field in ('applied_at', 'updated_at'):
+            data[field] = _iso(getattr(application, field))
+        else:
+            data[field] = getattr(application, field)
+    return data
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def conditional_json(etag, build):
+    """Answer 304 if the client's If-None-Match still matches `etag`, otherwise jsonify(build()).
+
+    `build` is only called when the body is actually needed, so an unchanged
+    poll skips serialisation as well as the transfer. There is no
+    Last-Modified: the newest row on a page says nothing about rows that
+    left it, and HTTP dates cannot tell two changes in the same second apart,
+    so the ETag (built from every row's id and version) is the only validator.
+    """
+    fresh = bool(request.if_none_match) and request.if_none_match.contains(etag)
+    response = Response(status=304) if fresh else jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api.route('/shifts')
+@api_login_required
+def shifts():
+    fields = requested_fields(SHIFT_FIELDS, DEFAULT_SHIFT_FIELDS)
+    search = ShiftSearch.from_args(request.args, page_size=current_app.config['SHIFT_PAGE_SIZE'])
+    if 'fields' not in request.args:
+        fields += (('snippet',) if search.q else ()) + (('distance_km',) if search.origin else ())
+    rows, next_cursor = search.page()
+    if {'hospital_name', 'city'} & set(fields):
+        load_shift_hospitals(rows)
+
+    versions = [(shift.id, row_version(shift)) for shift in rows]
+    etag = make_etag(request.query_string, versions, next_cursor)
+    return conditional_json(etag, lambda: {
+        'items': [serialize_shift(shift, fields) for shift in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@api.route('/applications')
+@api_login_required
+def applications():
+    fields = requested_fields(APPLICATION_FIELDS, DEFAULT_APPLICATION_FIELDS)
+    shift_fields = requested_fields(SHIFT_FIELDS, DEFAULT_SHIFT_FIELDS) if 'shift' in fields else ()
+
+    if isinstance(current_user, DoctorUser):
+        rows = history_rows(current_user.id)
+    else:
+        query = Shift.query.filter_by(hospital_id=current_user.id)
+        shift_id = request.args.get('shift_id', type=int)
+        if shift_id is not None:
+            query = query.filter_by(id=shift_id)
+        shifts = query.order_by(Shift.posted_at.desc()).all()
+        rows = []
+        for entry in applicants_by_shift(shifts):
+            for row in entry.rows:
+                row.shift = entry.shift
+                rows.append(row)
+    if {'hospital_name', 'city'} & set(shift_fields):
+        load_shift_hospitals({row.shift for row in rows if row.shift})
+    if 'doctor_phone' in fields:
+        doctors = (row.doctor or row.application.doctor for row in rows)
+        Encryptor.prime({doctor.profile for doctor in doctors if doctor and doctor.profile}, 'phone')
+
+    versions = [(row.application.id, row.application.status, row_version(row.application),
+                 row.shift and row_version(row.shift)) for row in rows]
+    etag = make_etag(current_user.get_id(), request.query_string, versions)
+    return conditional_json(etag, lambda: {
+        'items': [serialize_application(row.application, fields, shift=row.shift,
+                                        doctor=row.doctor or row.application.doctor, shift_fields=shift_fields)
+                  for row in rows],
+    })
+
+
+@api.route('/me')
+@api_login_required
+def me():
+    user = current_user
+    if isinstance(user, HospitalUser):
+        data = {'type': 'hospital', 'id': user.id, 'hospital_name': user.hospital_name,
+                'contact_person': user.contact_person, 'email': user.email}
+    else:
+        data = {'type': 'doctor', 'id': user.id, 'full_name': user.full_name,
+                'years_of_experience': user.years_of_experience, 'email': user.email}
+    return conditional_json(make_etag(sorted(data.items())), lambda: data)
+
+
+@api.route('/shifts/bulk', methods=['POST'])
+@api_login_required
+def bulk_create_shifts():
+    """Create many shifts from a JSON array (or {"shifts": [...]}); invalid rows are reported, not fatal."""
+    if not isinstance(current_user, HospitalUser):
+        return jsonify({'error': 'Only hospitals can create shifts'}), 403
+    payload = request.get_json(silent=True)
+    rows = payload.get('shifts') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        return jsonify({'error': 'Expected a JSON array of shifts'}), 400
+    if len(rows) > current_app.config['ROSTER_MAX_ROWS']:
+        return jsonify({'error': f"At most {current_app.config['ROSTER_MAX_ROWS']} shifts per request"}), 413
+
+    roster = RosterImport(current_user.id, batch_size=current_app.config['ROSTER_BATCH_SIZE'])
+    report = roster.run(rows)
+    return jsonify(report), 201 if report['created'] else 400
+
+
+@api.route('/shifts/<int:shift_id>/candidates')
+@api_login_required
+def shift_candidates(shift_id):
+    """Best-matching doctors for one of the current hospital's shifts."""
+    if not isinstance(current_user, HospitalUser):
+        return jsonify({'error': 'Only hospitals can search candidates'}), 403
+    shift = Shift.query.filter_by(id=shift_id, hospital_id=current_user.id).first()
+    if shift is None:
+        return jsonify({'error': 'Shift not found'}), 404
+
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    matches = get_matching_engine().candidates_for_shift(shift, limit=limit)
+    return jsonify({'items': [
+        {'doctor_id': record.id, 'full_name': record.name, 'years_of_experience': record.years,
+         'city': record.city, 'specialties': sorted(record.specialties), 'score': score}
+        for score, record in matches
+    ]})
+
+
+@api.route('/events')
+@api_login_required
+def events():
+    """Server-sent event stream of new/updated/filled shifts (?specialty=&city=) and, for
+    doctors, their own application status changes."""
+    subscription = get_broker().subscribe(
+        last_event_id=request.headers.get('Last-Event-ID', type=int),
+        specialty=request.args.get('specialty'),
+        city=request.args.get('city'),
+        doctor_id=current_user.id if isinstance(current_user, DoctorUser) else None,
+    )
+    heartbeat = current_app.config['SSE_HEARTBEAT']
+    deadline = time.monotonic() + current_app.config['SSE_MAX_DURATION']
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.closed and time.monotonic() < deadline:
+                event = subscription.get(timeout=heartbeat)
+                yield format_sse(event) if event else ': ping\n\n'
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
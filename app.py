@@ -1,367 +1,172 @@
-# app.py - Final Complete Version with Cloudinary
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+# app.py - Application factory: extensions, CLI commands and blueprint registration
+import click
+from flask import Flask
+from flask_login import LoginManager
 from config import Config
-from models import db, DoctorUser, HospitalUser, DoctorProfile, DoctorDocument, HospitalProfile, HospitalDocument, Shift, ShiftApplication
-import cloudinary
-from cloudinary.uploader import upload
-from datetime import datetime as dt
-import os
+from models import db, DoctorUser, HospitalUser, DoctorProfile, DoctorDocument, HospitalProfile, HospitalDocument, Shift
+from utils.applications import backfill_intervals
+from utils.caching import SHIFTS, init_caching, invalidate_on_change, precompress_static
+from utils.auth import init_auth
+from utils.database import configure_engine_options, install_sqlite_pragmas
+from utils.encryption import EncryptedField, Encryptor
+from utils.events import init_events
+from utils.fulltext import init_fulltext, rebuild_index
+from utils.geo import geocode_hospitals, init_geo
+from utils.lifecycle import init_lifecycle, run_lifecycle
+from utils.metrics import init_metrics, stats_collector
+from utils.notifications import init_notifications
+from utils.payments import rebuild_summaries
+from utils.query_budget import init_query_budget
+from utils.schema import SchemaUpgradeError, check_schema, upgrade_schema
+from utils.uploads import UploadPipeline, get_pipeline
+from utils.user_cache import init_user_cache
 from dotenv import load_dotenv
 load_dotenv()
 
-def create_app():
+
+def register_blueprints(app):
+    """Import the view modules and register their blueprints.
+
+    Imported here rather than at the top so that importing this module (for
+    create_app, or from a CLI command or a test) doesn't load every view.
+    """
+    from api import api
+    from auth import auth
+    from doctor import doctor
+    from hospital import hospital
+
+    for blueprint in (auth, doctor, hospital, api):
+        app.register_blueprint(blueprint)
+
+
+def create_app(config=None):
+    """Build the app; `config` overrides settings from Config (tests point the binds at temporary files)."""
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
+    configure_engine_options(app)
     db.init_app(app)
-
-    # Cloudinary Configuration
-    cloudinary.config(
-        cloud_name = os.environ.get('CLOUDINARY_CLOUD_NAME'),
-        api_key = os.environ.get('CLOUDINARY_API_KEY'),
-        api_secret = os.environ.get('CLOUDINARY_API_SECRET'),
-        secure = True
-    )
+    install_sqlite_pragmas(app)
+    init_query_budget(app)
 
     login_manager = LoginManager()
-    login_manager.login_view = 'login'
+    login_manager.login_view = 'auth.login'
     login_manager.login_message_category = 'info'
     login_manager.init_app(app)
 
+    init_auth(app)
+    user_cache = init_user_cache(app)
+
     @login_manager.user_loader
     def load_user(user_id):
         if user_id.startswith('doctor_'):
             doc_id = int(user_id.split('_')[1])
-            return DoctorUser.query.get(doc_id)
+            return user_cache.load(DoctorUser, user_id, doc_id)
         elif user_id.startswith('hospital_'):
             hosp_id = int(user_id.split('_')[1])
-            return HospitalUser.query.get(hosp_id)
+            return user_cache.load(HospitalUser, user_id, hosp_id)
         return None
 
-    with app.app_context():
-        db.create_all()
-
-    # Home
-    @app.route('/')
-    def home():
-        return render_template('homepage.html')
-
-    # Login
-    @app.route('/login', methods=['GET', 'POST'])
-    def login():
-        if current_user.is_authenticated:
-            return redirect(url_for('dashboard'))
-
-        if request.method == 'POST':
-            email = request.form['email'].strip()
-            password = request.form['password']
-            user_type = request.form.get('user_type', 'doctor')
-
-            if user_type == 'doctor':
-                user = DoctorUser.query.filter_by(email=email).first()
-            else:
-                user = HospitalUser.query.filter_by(email=email).first()
-
-            if user and user.check_password(password):
-                login_user(user)
-                flash('Login successful!', 'success')
-                return redirect(url_for('dashboard'))
-            else:
-                flash('Invalid email or password.', 'error')
-
-        return render_template('login.html')
-
-    # Register Doctor
-    @app.route('/register-doctor', methods=['GET', 'POST'])
-    def register_doctor():
-        if request.method == 'POST':
-            full_name = request.form['fullName']
-            years_exp = request.form.get('yearsOfExperience', 0, type=int)
-            email = request.form['email'].strip()
-            password = request.form['password']
-            confirm = request.form['confirmPassword']
-
-            if password != confirm:
-                flash('Passwords do not match!', 'error')
-                return redirect(url_for('register_doctor'))
-
-            if DoctorUser.query.filter_by(email=email).first():
-                flash('Email already registered!', 'error')
-                return redirect(url_for('register_doctor'))
-
-            new_doctor = DoctorUser(
-                full_name=full_name,
-                years_of_experience=years_exp,
-                email=email
-            )
-            new_doctor.set_password(password)
-            db.session.add(new_doctor)
+    # Schema changes are made by `flask upgrade-db`, not on every start.
+    check_schema(app)
+    init_fulltext(app)
+    init_geo(app)
+
+    UploadPipeline(app)
+    init_events(app)
+    response_cache = init_caching(app)
+    invalidate_on_change(Shift, SHIFTS)
+
+    init_lifecycle(app)
+    notifications = init_notifications(app)
+    metrics = init_metrics(app)
+    metrics.collectors.append(stats_collector('user_cache', 'Authenticated user cache statistics.', user_cache.stats))
+    metrics.collectors.append(stats_collector('response_cache', 'Page/fragment cache statistics.',
+                                              response_cache.stats))
+    metrics.collectors.append(stats_collector('notifications', 'Notification dispatch counts.', notifications.stats))
+    app.add_template_global(lambda: Shift.query.filter_by(status='Open').count(), 'open_shift_count')
+
+    @app.cli.command('upgrade-db')
+    def upgrade_db():
+        """Create missing tables, columns and indexes (and the search indexes) and record the schema version."""
+        try:
+            upgrade_schema()
+        except SchemaUpgradeError as error:
+            raise click.ClickException(str(error))
+        print("Database schema is up to date")
+
+    @app.cli.command('rotate-encryption-keys')
+    def rotate_encryption_keys():
+        """Re-encrypt stored profile fields under the first key in ENCRYPTION_KEYS."""
+        for model in (DoctorProfile, HospitalProfile):
+            columns = [field.column for field in vars(model).values() if isinstance(field, EncryptedField)]
+            for profile in model.query.yield_per(500):
+                for column in columns:
+                    setattr(profile, column, Encryptor.rotate(getattr(profile, column)))
             db.session.commit()
-            flash('Doctor account created successfully!', 'success')
-            return redirect(url_for('login'))
-
-        return render_template('register-doctor.html')
-
-    # Register Hospital
-    @app.route('/register-hospital', methods=['GET', 'POST'])
-    def register_hospital():
-        if request.method == 'POST':
-            hospital_name = request.form['hospitalName']
-            contact_person = request.form['contactPerson']
-            email = request.form['email'].strip()
-            password = request.form['password']
-            confirm = request.form['confirmPassword']
-
-            if password != confirm:
-                flash('Passwords do not match!', 'error')
-                return redirect(url_for('register_hospital'))
-
-            if HospitalUser.query.filter_by(email=email).first():
-                flash('Email already registered!', 'error')
-                return redirect(url_for('register_hospital'))
-
-            new_hospital = HospitalUser(
-                hospital_name=hospital_name,
-                contact_person=contact_person,
-                email=email
-            )
-            new_hospital.set_password(password)
-            db.session.add(new_hospital)
-            db.session.commit()
-            flash('Hospital account created successfully!', 'success')
-            return redirect(url_for('login'))
-
-        return render_template('register-hospital.html')
-
-    # Dashboard
-    @app.route('/dashboard')
-    @login_required
-    def dashboard():
-        if isinstance(current_user, DoctorUser):
-            return render_template('doctor/dashboard.html')
-        else:
-            return render_template('hospital/dashboard.html')
-
-    # ==============================
-    # HOSPITAL ROUTES
-    # ==============================
-
-    @app.route('/hospital/account', methods=['GET', 'POST'])
-    @login_required
-    def hospital_account():
-        if not isinstance(current_user, HospitalUser):
-            return redirect(url_for('dashboard'))
-
-        profile = current_user.profile or HospitalProfile(hospital_id=current_user.id)
-
-        if request.method == 'POST':
-            profile.hospital_type = request.form['hospital_type']
-            profile.address = request.form['address']
-            profile.city = request.form['city']
-            profile.state = request.form['state']
-            profile.pincode = request.form['pincode']
-            profile.phone = request.form['phone']
-            profile.alternate_phone = request.form['alternate_phone']
-            profile.website = request.form['website']
-            profile.number_of_beds = request.form.get('number_of_beds', type=int)
-            profile.about = request.form['about']
-
-            if not current_user.profile:
-                db.session.add(profile)
-            db.session.commit()
-            flash('Profile updated successfully!', 'success')
-
-        return render_template('hospital/account.html', profile=profile)
-
-    @app.route('/hospital/documents')
-    @login_required
-    def hospital_documents():
-        if not isinstance(current_user, HospitalUser):
-            return redirect(url_for('dashboard'))
-        return render_template('hospital/documents.html')
-
-    @app.route('/upload-document', methods=['POST'])
-    @login_required
-    def upload_document():
-        if not isinstance(current_user, HospitalUser):
-            return redirect(url_for('dashboard'))
-
-        file = request.files['document_file']
-        doc_type = request.form['document_type']
-
-        if file and file.filename:
-            try:
-                result = upload(file, resource_type="auto")
-                file_url = result['secure_url']
-
-                new_doc = HospitalDocument(
-                    hospital_id=current_user.id,
-                    document_type=doc_type,
-                    file_path=file_url
-                )
-                db.session.add(new_doc)
-                db.session.commit()
-                flash('Document uploaded successfully!', 'success')
-            except Exception as e:
-                flash('Upload failed. Please try again.', 'error')
-                print(e)
-
-        return redirect(url_for('hospital_documents'))
-
-    @app.route('/hospital/create-shift', methods=['GET', 'POST'])
-    @login_required
-    def create_shift():
-        if not isinstance(current_user, HospitalUser):
-            return redirect(url_for('dashboard'))
-
-        if request.method == 'POST':
-            shift_date = dt.strptime(request.form['shift_date'], '%Y-%m-%d').date()
-            start_time = dt.strptime(request.form['start_time'], '%H:%M').time()
-            end_time = dt.strptime(request.form['end_time'], '%H:%M').time()
-
-            new_shift = Shift(
-                hospital_id=current_user.id,
-                title=request.form['title'],
-                specialty=request.form['specialty'],
-                shift_date=shift_date,
-                start_time=start_time,
-                end_time=end_time,
-                pay_rate=request.form.get('pay_rate', type=float),
-                pay_type=request.form['pay_type'],
-                location_ward=request.form['location_ward'],
-                requirements=request.form['requirements'],
-                is_urgent='is_urgent' in request.form
-            )
-            db.session.add(new_shift)
-            db.session.commit()
-            flash('Shift posted successfully!', 'success')
-            return redirect(url_for('dashboard'))
-
-        return render_template('hospital/create_shift.html')
-
-    @app.route('/hospital/applications')
-    @login_required
-    def hospital_applications():
-        if not isinstance(current_user, HospitalUser):
-            return redirect(url_for('dashboard'))
-        shifts = Shift.query.filter_by(hospital_id=current_user.id).order_by(Shift.posted_at.desc()).all()
-        return render_template('hospital/applications.html', shifts=shifts)
-
-    # ==============================
-    # DOCTOR ROUTES
-    # ==============================
-
-    @app.route('/doctor/jobs')
-    @login_required
-    def doctor_jobs():
-        if not isinstance(current_user, DoctorUser):
-            return redirect(url_for('dashboard'))
-        shifts = Shift.query.filter_by(status='Open').all()
-        return render_template('doctor/jobs.html', shifts=shifts)
-
-    @app.route('/doctor/apply/<int:shift_id>', methods=['POST'])
-    @login_required
-    def doctor_apply(shift_id):
-        if not isinstance(current_user, DoctorUser):
-            return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-
-        existing = ShiftApplication.query.filter_by(doctor_id=current_user.id, shift_id=shift_id).first()
-        if existing:
-            return jsonify({'success': False, 'message': 'Already applied'})
-
-        app = ShiftApplication(
-            doctor_id=current_user.id,
-            shift_id=shift_id,
-            status='Pending'
-        )
-        db.session.add(app)
-        db.session.commit()
-        return jsonify({'success': True})
-
-    @app.route('/doctor/history')
-    @login_required
-    def doctor_history():
-        if not isinstance(current_user, DoctorUser):
-            return redirect(url_for('dashboard'))
-        return render_template('doctor/history.html')
-
-    @app.route('/doctor/payment')
-    @login_required
-    def doctor_payment():
-        if not isinstance(current_user, DoctorUser):
-            return redirect(url_for('dashboard'))
-        return render_template('doctor/payment.html')
-
-    @app.route('/doctor/profile', methods=['GET', 'POST'])
-    @login_required
-    def doctor_profile():
-        if not isinstance(current_user, DoctorUser):
-            return redirect(url_for('dashboard'))
-
-        profile = current_user.profile or DoctorProfile(doctor_id=current_user.id)
-
-        if request.method == 'POST':
-            profile.phone = request.form['phone']
-            profile.address = request.form['address']
-            profile.city = request.form['city']
-            profile.qualifications = request.form['qualifications']
-            profile.license_number = request.form['license_number']
-
-            if not current_user.profile:
-                db.session.add(profile)
-            db.session.commit()
-            flash('Profile updated successfully!', 'success')
-
-        return render_template('doctor/profile.html', profile=profile)
-
-    @app.route('/doctor/documents')
-    @login_required
-    def doctor_documents():
-        if not isinstance(current_user, DoctorUser):
-            return redirect(url_for('dashboard'))
-        return render_template('doctor/documents.html')
-
-    @app.route('/doctor/upload-document', methods=['POST'])
-    @login_required
-    def doctor_upload_document():
-        if not isinstance(current_user, DoctorUser):
-            return redirect(url_for('dashboard'))
-
-        file = request.files['document_file']
-        doc_type = request.form['document_type']
-
-        if file and file.filename:
-            try:
-                result = upload(file, resource_type="auto")
-                file_url = result['secure_url']
-
-                new_doc = DoctorDocument(
-                    doctor_id=current_user.id,
-                    document_type=doc_type,
-                    file_path=file_url
-                )
-                db.session.add(new_doc)
-                db.session.commit()
-                flash('Document uploaded successfully!', 'success')
-            except Exception as e:
-                flash('Upload failed. Please try again.', 'error')
-                print(e)
-
-        return redirect(url_for('doctor_documents'))
-
-    # Logout
-    @app.route('/logout')
-    @login_required
-    def logout():
-        logout_user()
-        flash('You have been logged out.', 'info')
-        return redirect(url_for('home'))
+            print(f"Rotated {model.__tablename__}")
+
+    @app.cli.command('resume-uploads')
+    def resume_uploads():
+        """Re-queue document uploads left Pending by a restart."""
+        count = get_pipeline().resume(DoctorDocument, HospitalDocument)
+        print(f"Re-queued {count} upload(s)")
+
+    @app.cli.command('backfill-shift-intervals')
+    def backfill_shift_intervals():
+        """Store UTC shift intervals on applications made before double-booking checks existed."""
+        print(f"Updated {backfill_intervals()} application(s)")
+
+    @app.cli.command('rebuild-payment-summaries')
+    def rebuild_payment_summaries():
+        """Recompute payment amounts and the monthly earnings/payout tables from scratch."""
+        print(f"Summarised {rebuild_summaries()} accepted application(s)")
+
+    @app.cli.command('run-shift-lifecycle')
+    def run_shift_lifecycle():
+        """Expire or close past shifts, reject their pending applications and archive old rows (one pass)."""
+        counts = run_lifecycle()
+        print(f"Expired or closed {counts['expired']} past shift(s), rejected {counts['rejected']} application(s), "
+              f"archived {counts['archived_shifts']} shift(s) and {counts['archived_applications']} application(s)")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Refill the FTS5 shift search index from the open shifts."""
+        count = rebuild_index()
+        print("Full-text search is not available on this database" if count is None
+              else f"Indexed {count} open shift(s)")
+
+    @app.cli.command('geocode-hospitals')
+    def geocode_hospitals_command():
+        """Look up coordinates for every hospital profile from its pincode or city."""
+        print(f"Updated coordinates for {geocode_hospitals()} hospital(s)")
+
+    @app.cli.command('send-notifications')
+    def send_notifications():
+        """Send every pending notification now, without waiting out the coalescing window."""
+        print(f"Sent {notifications.drain(wait=False)} notification(s)")
+
+    @app.cli.command('compress-static')
+    def compress_static():
+        """Write gzip (and brotli, if installed) copies of CSS/JS for precompressed serving."""
+        print(f"Wrote {precompress_static(app.static_folder)} compressed file(s)")
+
+    register_blueprints(app)
 
     return app
 
 
-app = create_app()
+def __getattr__(name):
+    # `app.app` (gunicorn app:app, flask --app app) is built on first access,
+    # so importing create_app from here doesn't also build a default app.
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    create_app().run()
\ No newline at end of file
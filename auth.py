@@ -0,0 +1,150 @@
+# auth.py - Home page, sign-in, registration, dashboard and sign-out
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_user, logout_user, login_required, current_user
+
+from models import db, DoctorUser, HospitalUser
+from utils.applications import applicant_counts
+from utils.auth import LoginBusy, get_hasher, get_login_limiter, needs_rehash
+from utils.caching import SHIFTS, cache_page
+from utils.user_cache import invalidate_user
+
+auth = Blueprint('auth', __name__)
+
+
+# Home
+@auth.route('/')
+@cache_page(tags=(SHIFTS,))
+def home():
+    return render_template('homepage.html')
+
+
+# Login
+@auth.route('/login', methods=['GET', 'POST'])
+@cache_page()
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('auth.dashboard'))
+
+    if request.method == 'POST':
+        email = request.form['email'].strip()
+        password = request.form['password']
+        user_type = request.form.get('user_type', 'doctor')
+
+        limiter = get_login_limiter()
+        if not limiter.allow(email, request.remote_addr):
+            flash('Too many login attempts. Please wait a few minutes and try again.', 'error')
+            return render_template('login.html'), 429
+
+        if user_type == 'doctor':
+            user = DoctorUser.query.filter_by(email=email).first()
+        else:
+            user = HospitalUser.query.filter_by(email=email).first()
+
+        try:
+            valid = user is not None and get_hasher().verify(user.password_hash, password)
+        except LoginBusy:
+            flash('Login is busy right now. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503
+
+        if valid:
+            if needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = get_hasher().hash(password)
+                    db.session.commit()
+                except LoginBusy:
+                    pass  # the password is right; rehash on a quieter login
+            limiter.succeeded(email)
+            login_user(user)
+            flash('Login successful!', 'success')
+            return redirect(url_for('auth.dashboard'))
+        else:
+            flash('Invalid email or password.', 'error')
+
+    return render_template('login.html')
+
+
+# Register Doctor
+@auth.route('/register-doctor', methods=['GET', 'POST'])
+@cache_page()
+def register_doctor():
+    if request.method == 'POST':
+        full_name = request.form['fullName']
+        years_exp = request.form.get('yearsOfExperience', 0, type=int)
+        email = request.form['email'].strip()
+        password = request.form['password']
+        confirm = request.form['confirmPassword']
+
+        if password != confirm:
+            flash('Passwords do not match!', 'error')
+            return redirect(url_for('auth.register_doctor'))
+
+        if DoctorUser.query.filter_by(email=email).first():
+            flash('Email already registered!', 'error')
+            return redirect(url_for('auth.register_doctor'))
+
+        new_doctor = DoctorUser(
+            full_name=full_name,
+            years_of_experience=years_exp,
+            email=email
+        )
+        new_doctor.set_password(password)
+        db.session.add(new_doctor)
+        db.session.commit()
+        flash('Doctor account created successfully!', 'success')
+        return redirect(url_for('auth.login'))
+
+    return render_template('register-doctor.html')
+
+
+# Register Hospital
+@auth.route('/register-hospital', methods=['GET', 'POST'])
+@cache_page()
+def register_hospital():
+    if request.method == 'POST':
+        hospital_name = request.form['hospitalName']
+        contact_person = request.form['contactPerson']
+        email = request.form['email'].strip()
+        password = request.form['password']
+        confirm = request.form['confirmPassword']
+
+        if password != confirm:
+            flash('Passwords do not match!', 'error')
+            return redirect(url_for('auth.register_hospital'))
+
+        if HospitalUser.query.filter_by(email=email).first():
+            flash('Email already registered!', 'error')
+            return redirect(url_for('auth.register_hospital'))
+
+        new_hospital = HospitalUser(
+            hospital_name=hospital_name,
+            contact_person=contact_person,
+            email=email
+        )
+        new_hospital.set_password(password)
+        db.session.add(new_hospital)
+        db.session.commit()
+        flash('Hospital account created successfully!', 'success')
+        return redirect(url_for('auth.login'))
+
+    return render_template('register-hospital.html')
+
+
+# Dashboard
+@auth.route('/dashboard')
+@login_required
+def dashboard():
+    if isinstance(current_user, DoctorUser):
+        return render_template('doctor/dashboard.html')
+    else:
+        counts = applicant_counts(shift.id for shift in current_user.shifts)
+        return render_template('hospital/dashboard.html', applications_received=sum(counts.values()))
+
+
+# Logout
+@auth.route('/logout')
+@login_required
+def logout():
+    invalidate_user(current_user)
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('auth.home'))
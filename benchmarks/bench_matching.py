@@ -0,0 +1,62 @@
+# benchmarks/bench_matching.py - build and query the matching index over synthetic doctors
+#
+#   python benchmarks/bench_matching.py [--doctors 100000] [--queries 1000]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.matching import MatchingEngine  # noqa: E402
+from utils.shift_search import SPECIALTIES  # noqa: E402
+
+CITIES = ['Mumbai', 'Delhi', 'Pune', 'Bengaluru', 'Chennai', 'Hyderabad', 'Kolkata', 'Ahmedabad',
+          'Jaipur', 'Lucknow', 'Nagpur', 'Indore', 'Bhopal', 'Patna', 'Kochi']
+QUALIFICATIONS = ['MBBS', 'MBBS, MD General Medicine', 'MBBS, MD Anaesthesia', 'MBBS, MS General Surgery',
+                  'MBBS, DCH Paediatrics', 'MBBS, IDCCM Critical Care', 'MBBS, MS Ortho', 'MBBS, DA']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--doctors', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    today = date.today()
+
+    engine = MatchingEngine()
+    started = time.perf_counter()
+    for doctor_id in range(1, args.doctors + 1):
+        engine.upsert_doctor(doctor_id, name=f'Doctor {doctor_id}', years=rng.randint(0, 35),
+                             city=rng.choice(CITIES), qualifications=rng.choice(QUALIFICATIONS))
+        if rng.random() < 0.2:
+            engine.book(doctor_id, doctor_id, today + timedelta(days=rng.randint(0, 30)))
+    build = time.perf_counter() - started
+
+    timings = []
+    for _ in range(args.queries):
+        specialty = rng.choice(SPECIALTIES)
+        city = rng.choice(CITIES)
+        shift_date = today + timedelta(days=rng.randint(0, 30))
+        started = time.perf_counter()
+        engine.candidates(specialty, city, shift_date, limit=20)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    for doctor_id in range(1, 1001):
+        engine.upsert_doctor(doctor_id, city=rng.choice(CITIES))
+    update = (time.perf_counter() - started) * 1000 / 1000
+
+    timings.sort()
+    print(f"doctors={args.doctors} build={build:.2f}s incremental_update={update * 1000:.1f}us")
+    print(f"candidates: p50={statistics.median(timings):.2f}ms "
+          f"p99={timings[int(len(timings) * 0.99) - 1]:.2f}ms max={timings[-1]:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/bench_micro.py - time Encryptor, load_user and the doctor jobs/apply views in-process
+#
+#   python benchmarks/generate_data.py --preset ci     # once, to create the data
+#   python benchmarks/bench_micro.py [--iterations 1000] [--json results.json]
+#
+# Views are called through Flask's test client, so the numbers include
+# routing, the ORM and template rendering but no network. The apply
+# benchmark writes real applications into the benchmark databases.
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import DEFAULT_DATA_DIR, create_bench_app, report, summarize  # noqa: E402
+
+
+def timed(function, iterations):
+    """Call `function(i)` `iterations` times; returns (timings in ms, wall seconds)."""
+    timings = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        call_started = time.perf_counter()
+        function(index)
+        timings.append((time.perf_counter() - call_started) * 1000)
+    return timings, time.perf_counter() - started
+
+
+def bench_encryptor(iterations):
+    from utils.encryption import Encryptor
+
+    tokens = [Encryptor.encrypt(f'+91 98{index:08d}') for index in range(iterations)]
+    results = []
+    for name, function in (
+        ('encryptor.encrypt', lambda i: Encryptor.encrypt(f'+91 98{i:08d}')),
+        ('encryptor.decrypt', lambda i: Encryptor.decrypt(tokens[i])),
+        ('encryptor.decrypt_many[100]', lambda i: Encryptor.decrypt_many(tokens[i:i + 100])),
+    ):
+        results.append(summarize(name, *timed(function, iterations)))
+    return results
+
+
+def bench_load_user(app, doctors, iterations, rng):
+    from models import db
+    from utils.user_cache import get_user_cache
+
+    load_user = app.login_manager._user_callback
+    user_ids = [f'doctor_{rng.randint(1, doctors)}' for _ in range(iterations)]
+
+    def miss(index):
+        get_user_cache().clear()
+        load_user(user_ids[index])
+        db.session.remove()
+
+    def hit(index):
+        load_user(user_ids[0])
+        db.session.remove()
+
+    return [summarize('load_user.miss', *timed(miss, iterations)),
+            summarize('load_user.hit', *timed(hit, iterations))]
+
+
+def bench_views(app, doctors, iterations, rng):
+    from models import Shift
+
+    client = app.test_client()
+
+    def sign_in(doctor_id):
+        with client.session_transaction() as session:
+            session['_user_id'] = f'doctor_{doctor_id}'
+            session['_fresh'] = True
+
+    sign_in(1)
+    specialties = [None, 'Surgery', 'ICU/CCU', 'Anesthesia']
+
+    def jobs(index):
+        specialty = specialties[index % len(specialties)]
+        response = client.get('/doctor/jobs', query_string={'specialty': specialty} if specialty else None)
+        assert response.status_code == 200, response.status_code
+
+    results = [summarize('view.doctor_jobs', *timed(jobs, iterations))]
+
+    with app.app_context():
+        shift_ids = [shift_id for shift_id, in Shift.query.with_entities(Shift.id)
+                     .filter(Shift.status == 'Open', Shift.shift_date >= date.today())
+                     .order_by(Shift.id).limit(iterations)]
+    outcomes = {}
+
+    def apply(index):
+        sign_in(rng.randint(1, doctors))
+        response = client.post(f'/doctor/apply/{shift_ids[index % len(shift_ids)]}')
+        body = response.get_json() or {}
+        outcome = 'applied' if body.get('success') else body.get('message', str(response.status_code))
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    if shift_ids:
+        result = summarize('view.doctor_apply', *timed(apply, iterations))
+        result['outcomes'] = outcomes
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    app = create_bench_app(args.data_dir)
+    from models import DoctorUser
+
+    with app.app_context():
+        doctors = DoctorUser.query.count()
+        if not doctors:
+            sys.exit(f"No data in {args.data_dir}; run benchmarks/generate_data.py first.")
+        results = bench_encryptor(args.iterations)
+    with app.test_request_context():
+        results += bench_load_user(app, doctors, args.iterations, rng)
+    results += bench_views(app, doctors, args.iterations, rng)
+    report(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
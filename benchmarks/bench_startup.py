@@ -0,0 +1,91 @@
+# benchmarks/bench_startup.py - time a cold worker start: import app, create_app() and the first request
+#
+#   python benchmarks/generate_data.py --preset ci     # once, to create the data
+#   python benchmarks/bench_startup.py [--runs 10] [--json results.json] [--max-create-ms 150]
+#
+# Each run is a fresh Python process, as a gunicorn worker or a test
+# session would be, so nothing is warm from the previous run. The child
+# reports how long each stage took and whether the optional heavy
+# dependencies (cloudinary, cryptography) were imported before they were
+# needed. With --max-create-ms the script exits non-zero when the median
+# create_app() time goes over the budget, so CI can hold the line.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import DEFAULT_DATA_DIR, configure, report, summarize  # noqa: E402
+
+DEFERRED = ('cloudinary', 'cryptography')
+
+
+def child(data_dir):
+    """Run in the fresh process: time each startup stage and print them as JSON."""
+    # No lifecycle or notification passes against the bench data on the first request.
+    os.environ.setdefault('SHIFT_LIFECYCLE_INTERVAL', '0')
+    os.environ.setdefault('NOTIFICATION_POLL_INTERVAL', '0')
+    configure(data_dir)
+    baseline = set(sys.modules)  # anything the harness itself needed is not the app's doing
+    started = time.perf_counter()
+    import app as module
+    imported = time.perf_counter()
+    application = module.create_app()
+    created = time.perf_counter()
+    loaded_early = [name for name in DEFERRED if name in sys.modules and name not in baseline]
+    status = application.test_client().get('/login').status_code
+    served = time.perf_counter()
+    print(json.dumps({
+        'import app': (imported - started) * 1000,
+        'create_app()': (created - imported) * 1000,
+        'first request': (served - created) * 1000,
+        'status': status,
+        'loaded_early': loaded_early,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--max-create-ms', type=float, help='fail if the median create_app() time exceeds this')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.data_dir)
+
+    # Writes the encryption key on the first run, so no child has to import
+    # cryptography to make one.
+    configure(args.data_dir)
+    timings = {}
+    loaded_early = set()
+    errors = 0
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--data-dir', args.data_dir],
+                                capture_output=True, text=True, check=True).stdout
+        process_ms = (time.perf_counter() - started) * 1000
+        stages = json.loads(output.strip().splitlines()[-1])
+        errors += stages.pop('status') != 200
+        loaded_early.update(stages.pop('loaded_early'))
+        stages['process total'] = process_ms
+        for name, value in stages.items():
+            timings.setdefault(name, []).append(value)
+
+    results = [summarize(name, values) for name, values in timings.items()]
+    results[-1]['errors'] = errors
+    report(results, args.json)
+    if loaded_early:
+        print(f"Imported before first use: {', '.join(sorted(loaded_early))}")
+    budget = args.max_create_ms
+    create_p50 = next(result['p50_ms'] for result in results if result['name'] == 'create_app()')
+    if budget is not None and create_p50 > budget:
+        sys.exit(f"create_app() p50 {create_p50}ms is over the {budget}ms budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/common.py - shared setup for the benchmark scripts
+#
+# Every script works on its own set of SQLite files (instance/bench/ by
+# default) so a benchmark run never touches development data. The
+# environment is set here before config.py is imported, because Config
+# reads it at import time.
+import json
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DATA_DIR = os.path.join(ROOT, 'instance', 'bench')
+PASSWORD = 'bench-password'
+CITIES = ['Mumbai', 'Delhi', 'Pune', 'Bengaluru', 'Chennai', 'Hyderabad', 'Kolkata', 'Ahmedabad',
+          'Jaipur', 'Lucknow', 'Nagpur', 'Indore', 'Bhopal', 'Patna', 'Kochi']
+
+
+def doctor_email(index):
+    return f'doctor{index}@bench.local'
+
+
+def hospital_email(index):
+    return f'hospital{index}@bench.local'
+
+
+def configure(data_dir=DEFAULT_DATA_DIR):
+    """Point the app at the benchmark databases, with a fixed encryption key kept alongside them."""
+    os.makedirs(data_dir, exist_ok=True)
+    key_path = os.path.join(data_dir, 'fernet.key')
+    if not os.path.exists(key_path):
+        from cryptography.fernet import Fernet
+        with open(key_path, 'wb') as file:
+            file.write(Fernet.generate_key())
+    with open(key_path) as file:
+        os.environ['ENCRYPTION_KEY'] = file.read().strip()
+    for name, filename in (('DATABASE_URL', 'app.db'), ('DOCTORS_DATABASE_URL', 'doctors.db'),
+                           ('HOSPITALS_DATABASE_URL', 'hospitals.db')):
+        os.environ[name] = 'sqlite:///' + os.path.join(data_dir, filename)
+    os.environ.setdefault('DOCUMENT_STORAGE', 'local')
+    os.environ.setdefault('UPLOAD_WORKERS', '0')
+    # Bench databases are disposable: bring them up to the models on start
+    # (a no-op beyond the version check once they are current).
+    os.environ.setdefault('SCHEMA_AUTO_UPGRADE', '1')
+
+
+def create_bench_app(data_dir=DEFAULT_DATA_DIR):
+    configure(data_dir)
+    from app import create_app
+    app = create_app()
+    # Every virtual user logs in from 127.0.0.1.
+    app.config['LOGIN_RATE_LIMITS'] = {}
+    return app
+
+
+def summarize(name, timings_ms, elapsed=None):
+    """p50/p99/mean (ms) and throughput for one benchmark; `elapsed` is wall time in seconds."""
+    timings = sorted(timings_ms)
+    result = {
+        'name': name,
+        'count': len(timings),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p99_ms': round(timings[max(0, int(len(timings) * 0.99) - 1)], 3) if timings else None,
+        'mean_ms': round(statistics.fmean(timings), 3) if timings else None,
+    }
+    if elapsed:
+        result['per_second'] = round(len(timings) / elapsed, 1)
+    return result
+
+
+def report(results, json_path=None):
+    """Print one line per result and optionally write them all as JSON (for CI comparisons)."""
+    for result in results:
+        extra = f" {result['per_second']}/s" if 'per_second' in result else ''
+        errors = f" errors={result['errors']}" if result.get('errors') else ''
+        if result.get('outcomes'):
+            errors += ' ' + ' '.join(f'{outcome}={count}' for outcome, count in sorted(result['outcomes'].items()))
+        print(f"{result['name']:<28} n={result['count']:<7} p50={result['p50_ms']}ms "
+              f"p99={result['p99_ms']}ms mean={result['mean_ms']}ms{extra}{errors}")
+    if json_path:
+        with open(json_path, 'w') as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,225 @@
+# benchmarks/generate_data.py - fill the benchmark databases with synthetic hospitals, doctors and shifts
+#
+#   python benchmarks/generate_data.py                 # 10k hospitals, 100k doctors, 1M shifts, 1M applications
+#   python benchmarks/generate_data.py --preset ci     # small enough for a CI job
+#   python benchmarks/generate_data.py --doctors 5000 --shifts 50000 --data-dir /tmp/bench
+#
+# The output is deterministic for a given --seed. Existing databases in the
+# data directory are replaced. Every account uses the password in
+# benchmarks/common.py: doctor<N>@bench.local and hospital<N>@bench.local.
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import (CITIES, DEFAULT_DATA_DIR, PASSWORD, create_bench_app, doctor_email,  # noqa: E402
+                    hospital_email)
+
+PRESETS = {
+    'full': {'hospitals': 10000, 'doctors': 100000, 'shifts': 1000000, 'applications': 1000000},
+    'ci': {'hospitals': 200, 'doctors': 2000, 'shifts': 20000, 'applications': 20000},
+}
+BATCH_SIZE = 5000
+
+PINCODE_PREFIXES = {'Mumbai': 400, 'Pune': 411, 'Nagpur': 440, 'Delhi': 110, 'Bengaluru': 560, 'Chennai': 600,
+                    'Hyderabad': 500, 'Kolkata': 700, 'Ahmedabad': 380, 'Jaipur': 302, 'Lucknow': 226, 'Indore': 452,
+                    'Bhopal': 462, 'Patna': 800, 'Kochi': 682}
+STATES = {'Mumbai': 'Maharashtra', 'Pune': 'Maharashtra', 'Nagpur': 'Maharashtra', 'Delhi': 'Delhi',
+          'Bengaluru': 'Karnataka', 'Chennai': 'Tamil Nadu', 'Hyderabad': 'Telangana', 'Kolkata': 'West Bengal',
+          'Ahmedabad': 'Gujarat', 'Jaipur': 'Rajasthan', 'Lucknow': 'Uttar Pradesh', 'Indore': 'Madhya Pradesh',
+          'Bhopal': 'Madhya Pradesh', 'Patna': 'Bihar', 'Kochi': 'Kerala'}
+HOSPITAL_SUFFIXES = ['Memorial', 'City', 'Care', 'Lifeline', 'Sunrise']
+HOSPITAL_TYPES = ['Private', 'Government', 'Trust', 'Clinic', 'Nursing Home']
+QUALIFICATIONS = ['MBBS', 'MBBS, MD General Medicine', 'MBBS, MD Anaesthesia', 'MBBS, MS General Surgery',
+                  'MBBS, DCH Paediatrics', 'MBBS, IDCCM Critical Care', 'MBBS, MS Ortho', 'MBBS, DA',
+                  'MBBS, DM Cardiology', 'GNM Nursing', 'B.Sc Nursing']
+FIRST_NAMES = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rahul', 'Meera',
+               'Karan', 'Divya', 'Sanjay', 'Pooja', 'Nikhil', 'Ishita', 'Aditya', 'Neha', 'Manish', 'Riya']
+LAST_NAMES = ['Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Nair', 'Singh', 'Mehta', 'Rao', 'Das',
+              'Kulkarni', 'Joshi', 'Menon', 'Verma', 'Bose', 'Chopra', 'Pillai', 'Khan', 'Shah', 'Desai']
+WARDS = ['Casualty', 'ICU', 'OT Complex', 'General Ward', 'NICU', 'Cardiac Care', 'OPD', 'Labour Room']
+# (start, end) wall-clock patterns; an end before the start runs overnight
+SHIFT_TIMES = [(dtime(8), dtime(16)), (dtime(16), dtime(0)), (dtime(20), dtime(8)), (dtime(9), dtime(21)),
+               (dtime(0), dtime(8)), (dtime(10), dtime(14))]
+
+
+def batches(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def insert_rows(db, model, rows):
+    from sqlalchemy import insert
+    for batch in batches(rows):
+        db.session.execute(insert(model), batch)
+        db.session.commit()
+
+
+def remove_databases(data_dir):
+    for pattern in ('app.db*', 'doctors.db*', 'hospitals.db*'):
+        for path in glob.glob(os.path.join(data_dir, pattern)):
+            os.remove(path)
+
+
+def generate_hospitals(rng, count, password_hash, encrypt):
+    users, profiles = [], []
+    for index in range(1, count + 1):
+        city = rng.choice(CITIES)
+        name = f'{rng.choice(LAST_NAMES)} {rng.choice(HOSPITAL_SUFFIXES)} Hospital {index}'
+        users.append({'id': index, 'hospital_name': name,
+                      'contact_person': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                      'email': hospital_email(index), 'password_hash': password_hash})
+        profiles.append({'hospital_id': index, 'hospital_type': rng.choice(HOSPITAL_TYPES),
+                         'address_enc': encrypt(f'{rng.randint(1, 400)}, {rng.choice(LAST_NAMES)} Road, {city}'),
+                         'city': city, 'state': STATES[city], 'pincode': f'{PINCODE_PREFIXES[city]}{rng.randint(1, 99):03d}',
+                         'phone_enc': encrypt(f'+91 {rng.randint(7000000000, 9999999999)}'),
+                         'alternate_phone_enc': encrypt(f'+91 {rng.randint(7000000000, 9999999999)}')
+                         if rng.random() < 0.4 else None,
+                         'website': f'https://hospital{index}.example.in', 'number_of_beds': rng.randint(10, 1200),
+                         'about': 'Multi-speciality hospital with 24x7 emergency services.'})
+    return users, profiles
+
+
+def generate_doctors(rng, count, password_hash, encrypt):
+    users, profiles = [], []
+    for index in range(1, count + 1):
+        city = rng.choice(CITIES)
+        users.append({'id': index, 'full_name': f'Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                      'years_of_experience': rng.randint(0, 35), 'email': doctor_email(index),
+                      'password_hash': password_hash})
+        profiles.append({'doctor_id': index, 'phone_enc': encrypt(f'+91 {rng.randint(7000000000, 9999999999)}'),
+                         'address_enc': encrypt(f'Flat {rng.randint(1, 900)}, {rng.choice(LAST_NAMES)} Nagar, {city}'),
+                         'city': city, 'qualifications': rng.choice(QUALIFICATIONS),
+                         'license_number': f'MCI-{rng.randint(10000, 999999)}'})
+    return users, profiles
+
+
+def generate_shifts(rng, count, hospitals, specialties, today):
+    """Shift rows spread from six months back to two months ahead, most of them past."""
+    shifts = []
+    for index in range(1, count + 1):
+        start, end = rng.choice(SHIFT_TIMES)
+        hours = ((datetime.combine(today, end) - datetime.combine(today, start)).seconds / 3600) or 24.0
+        hourly = rng.random() < 0.7
+        specialty = rng.choice(specialties)
+        shift_date = today + timedelta(days=rng.randint(-180, 60))
+        shifts.append({'id': index, 'hospital_id': rng.randint(1, hospitals),
+                       'title': f'{specialty} {"night" if start >= dtime(20) or end <= dtime(8) else "day"} cover',
+                       'specialty': specialty, 'shift_date': shift_date, 'start_time': start, 'end_time': end,
+                       'duration_hours': hours, 'pay_rate': rng.randrange(400, 2500, 50) if hourly
+                       else rng.randrange(4000, 25000, 500),
+                       'pay_type': 'Hourly' if hourly else 'Fixed', 'location_ward': rng.choice(WARDS),
+                       'requirements': 'Valid MCI registration.', 'is_urgent': rng.random() < 0.1,
+                       'capacity': rng.choice([None, 1, 2, 3, 5]), 'applications_count': 0, 'status': 'Open'})
+    return shifts
+
+
+def generate_applications(rng, count, doctors, shifts, today, tz):
+    """Application rows, unique per (doctor, shift), with past shifts accepted and mostly paid.
+
+    A doctor is only accepted for one shift per calendar day (both days for
+    overnight shifts), so the data passes the double-booking checks.
+    """
+    from utils.scheduling import shift_interval
+
+    applications = []
+    seen = set()
+    busy = set()  # (doctor_id, date) with an accepted shift
+    now = datetime.utcnow()
+    attempts = count * 20  # gives up early if the shifts fill up before `count` applications
+    while len(applications) < count and attempts:
+        attempts -= 1
+        shift = shifts[rng.randrange(len(shifts))]
+        if shift['status'] == 'Filled':
+            continue
+        doctor_id = rng.randint(1, doctors)
+        if (doctor_id, shift['id']) in seen:
+            continue
+        seen.add((doctor_id, shift['id']))
+        starts_at, ends_at = shift_interval(shift['shift_date'], shift['start_time'], shift['end_time'], tz)
+        days = {shift['shift_date']}
+        if shift['end_time'] <= shift['start_time']:
+            days.add(shift['shift_date'] + timedelta(days=1))
+
+        status = 'Pending'
+        if shift['shift_date'] < today:
+            status = 'Rejected'
+            if not any((doctor_id, day) in busy for day in days) and rng.random() < 0.7:
+                status = 'Accepted'
+                busy.update((doctor_id, day) for day in days)
+        paid = status == 'Accepted' and shift['shift_date'] < today - timedelta(days=30)
+        applied_at = min(now, datetime.combine(shift['shift_date'], dtime()) - timedelta(hours=rng.randint(1, 240)))
+        applications.append({'doctor_id': doctor_id, 'shift_id': shift['id'], 'applied_at': applied_at,
+                             'updated_at': applied_at, 'status': status, 'payment_status': 'Paid' if paid else 'Pending',
+                             'starts_at': starts_at, 'ends_at': ends_at})
+        if status == 'Accepted':  # only accepted bookings count towards capacity
+            shift['applications_count'] += 1
+            if shift['capacity'] is not None and shift['applications_count'] >= shift['capacity']:
+                shift['status'] = 'Filled'
+    return applications
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='full')
+    parser.add_argument('--hospitals', type=int)
+    parser.add_argument('--doctors', type=int)
+    parser.add_argument('--shifts', type=int)
+    parser.add_argument('--applications', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+    counts = {name: getattr(args, name) or default for name, default in PRESETS[args.preset].items()}
+    rng = random.Random(args.seed)
+
+    remove_databases(args.data_dir)
+    app = create_bench_app(args.data_dir)
+
+    from models import db, DoctorProfile, DoctorUser, HospitalProfile, HospitalUser, Shift, ShiftApplication
+    from utils.auth import hash_password
+    from utils.encryption import Encryptor
+    from utils.geo import geocode_hospitals
+    from utils.payments import rebuild_summaries
+    from utils.shift_search import SPECIALTIES
+
+    with app.app_context():
+        today = date.today()
+        password_hash = hash_password(PASSWORD)  # hashed once; scrypt per user would dominate the run
+        tz = ZoneInfo(app.config['SHIFT_TIMEZONE'])
+        started = time.perf_counter()
+
+        def step(label, model, rows):
+            step_started = time.perf_counter()
+            insert_rows(db, model, rows)
+            print(f"{label:<22} {len(rows):>9} rows {time.perf_counter() - step_started:7.1f}s")
+
+        users, profiles = generate_hospitals(rng, counts['hospitals'], password_hash, Encryptor.encrypt)
+        step('hospitals', HospitalUser, users)
+        step('hospital_profiles', HospitalProfile, profiles)
+        geocode_hospitals()
+        users, profiles = generate_doctors(rng, counts['doctors'], password_hash, Encryptor.encrypt)
+        step('doctors', DoctorUser, users)
+        step('doctor_profiles', DoctorProfile, profiles)
+        del users, profiles
+
+        shifts = generate_shifts(rng, counts['shifts'], counts['hospitals'], SPECIALTIES, today)
+        applications = generate_applications(rng, counts['applications'], counts['doctors'], shifts, today, tz)
+        step('shifts', Shift, shifts)
+        del shifts
+        step('shift_applications', ShiftApplication, applications)
+        del applications
+
+        summary_started = time.perf_counter()
+        accepted = rebuild_summaries()
+        print(f"{'payment summaries':<22} {accepted:>9} accepted {time.perf_counter() - summary_started:4.1f}s")
+        print(f"Generated into {args.data_dir} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/load_test.py - HTTP load scenario against a local server: login -> browse jobs -> apply
+#
+#   python benchmarks/generate_data.py --preset ci     # once, to create the data
+#   python benchmarks/load_test.py [--users 8] [--duration 30] [--json results.json]
+#   python benchmarks/load_test.py --url http://127.0.0.1:8000   # against an already running server
+#
+# Without --url the app is served in-process by werkzeug's threaded server
+# on a free local port, so nothing external is needed. Each virtual user is
+# a thread with its own cookie jar that repeatedly signs in as a random
+# generated doctor, opens the jobs list and the next page, and applies to a
+# shift from it. Latencies are reported per step, plus overall throughput.
+import argparse
+import http.cookiejar
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import DEFAULT_DATA_DIR, PASSWORD, create_bench_app, doctor_email, report, summarize  # noqa: E402
+
+SHIFT_ID = re.compile(r'data-shift-id="(\d+)"')
+NEXT_CURSOR = re.compile(r'[?&]cursor=([^"&]+)')
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, base_url, doctors, deadline, seed, record):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.doctors = doctors
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.record = record
+
+    def request(self, step, path, data=None):
+        """Timed request; returns the body, or None on an error response (counted against the step)."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, data=body, timeout=30) as response:
+                content = response.read().decode()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            content, ok = None, False
+        self.record(step, (time.perf_counter() - started) * 1000, ok)
+        return content
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            self.request('GET /login', '/login')
+            email = doctor_email(self.rng.randint(1, self.doctors))
+            self.request('POST /login', '/login', {'email': email, 'password': PASSWORD, 'user_type': 'doctor'})
+            page = self.request('GET /doctor/jobs', '/doctor/jobs')
+            if page is None:
+                continue
+            cursor = NEXT_CURSOR.search(page)
+            if cursor:
+                page = self.request('GET /doctor/jobs?cursor', '/doctor/jobs?cursor=' + cursor.group(1)) or page
+            shift_ids = SHIFT_ID.findall(page)
+            if shift_ids:
+                self.request('POST /doctor/apply', f'/doctor/apply/{self.rng.choice(shift_ids)}', {})
+
+
+def serve(data_dir):
+    """Start the app on a free local port in a background thread; returns (app, base URL)."""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no access log line per request
+    app = create_bench_app(data_dir)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return app, f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--doctors', type=int, help='number of generated doctors to sign in as (default: all)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--url', help='base URL of a running server instead of an in-process one')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    app = None
+    base_url = args.url
+    if base_url is None:
+        app, base_url = serve(args.data_dir)
+    doctors = args.doctors
+    if doctors is None:
+        from models import DoctorUser
+        app = app or create_bench_app(args.data_dir)
+        with app.app_context():
+            doctors = DoctorUser.query.count()
+    if not doctors:
+        sys.exit(f"No data in {args.data_dir}; run benchmarks/generate_data.py first.")
+
+    timings = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def record(step, elapsed_ms, ok):
+        with lock:
+            timings.setdefault(step, []).append(elapsed_ms)
+            if not ok:
+                errors[step] = errors.get(step, 0) + 1
+
+    started = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    users = [VirtualUser(base_url.rstrip('/'), doctors, deadline, args.seed + index, record)
+             for index in range(args.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for step, values in timings.items():
+        result = summarize(step, values, elapsed)
+        result['errors'] = errors.get(step, 0)
+        results.append(result)
+    total = summarize('all requests', [value for values in timings.values() for value in values], elapsed)
+    total['errors'] = sum(errors.values())
+    results.append(total)
+    print(f"{args.users} users for {elapsed:.1f}s against {base_url}")
+    report(results, args.json)
+
+
+if __name__ == '__main__':
+    main()
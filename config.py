@@ -8,16 +8,176 @@ class Config:
     SECRET_KEY = 'your-super-secret-key-change-in-production-2025'
 
     # Dummy main URI (required by Flask-SQLAlchemy)
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'instance', 'app.db')
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'instance', 'app.db'))
 
-    # Separate databases
+    # Separate databases. Each bind can be pointed at another backend through
+    # the environment; see utils/database.py.
     SQLALCHEMY_BINDS = {
-        'doctors': 'sqlite:///' + os.path.join(basedir, 'instance', 'doctors.db'),
-        'hospitals': 'sqlite:///' + os.path.join(basedir, 'instance', 'hospitals.db')
+        'doctors': os.environ.get(
+            'DOCTORS_DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'instance', 'doctors.db')),
+        'hospitals': os.environ.get(
+            'HOSPITALS_DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'instance', 'hospitals.db'))
+    }
+
+    # Connection pool, per bind and per worker process
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 1800  # seconds; server backends only
+
+    # Applied to every new SQLite connection. WAL lets readers proceed while a
+    # writer commits, busy_timeout makes writers queue instead of failing with
+    # "database is locked", and NORMAL sync is durable under WAL except on power loss.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,       # ms
+        'cache_size': -16000,       # KiB (negative = size, not pages)
+        'mmap_size': 134217728,     # 128 MiB
+        'temp_store': 'MEMORY',
     }
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Schema changes (new tables, columns, indexes) are applied by `flask
+    # upgrade-db` (utils/schema.py). Each worker only checks the recorded
+    # schema version and answers 503 until it is current, unless
+    # SCHEMA_AUTO_UPGRADE asks it to upgrade at startup instead.
+    SCHEMA_AUTO_UPGRADE = os.environ.get('SCHEMA_AUTO_UPGRADE', '').lower() in ('1', 'true', 'yes')
+
+    # Document uploads are spooled to disk and sent to storage by background workers.
+    # DOCUMENT_STORAGE: 'cloudinary' or 'local' (copies into LOCAL_UPLOAD_DIR under static/).
+    # UPLOAD_WORKERS = 0 uploads inline within the request (handy for tests).
+    DOCUMENT_STORAGE = os.environ.get('DOCUMENT_STORAGE', 'cloudinary')
+    LOCAL_UPLOAD_DIR = os.path.join(basedir, 'static', 'uploads', 'docs')
+    UPLOAD_SPOOL_DIR = os.path.join(basedir, 'instance', 'spool')
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 4))
+    UPLOAD_MAX_RETRIES = 3
+    UPLOAD_RETRY_DELAY = 1.0  # seconds, doubled after each failed attempt
+
+    # Password hashing. Changing the method rehashes each user's password on
+    # their next successful login. Checks run on a bounded pool: at most
+    # PASSWORD_HASH_WORKERS at once, PASSWORD_HASH_QUEUE more waiting, the rest
+    # are told to retry (HTTP 503). The bound is per process and only matters
+    # with threaded workers (gunicorn --worker-class gthread --threads N); sync
+    # workers already serve one login at a time.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE = 32
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+
+    # Login attempts allowed per (attempts, window seconds); exceeding either returns HTTP 429.
+    LOGIN_RATE_LIMITS = {
+        'email': (10, 300),
+        'ip': (50, 60),
+    }
+
+    # Authenticated users are cached per worker for this many seconds, so most
+    # requests skip the user SELECT. Entries are dropped on user updates.
+    USER_CACHE_TTL = 60
+    USER_CACHE_MAX_SIZE = 10000
+
+    # Live shift/application events (server-sent events at /api/v1/events).
+    # 'memory' only reaches clients on the same worker; 'database' relays events
+    # through the live_events table so every gunicorn worker sees them. SSE
+    # connections hold a worker thread, so run gunicorn with gthread/gevent workers.
+    EVENT_BROKER = os.environ.get('EVENT_BROKER', 'memory')
+    EVENT_POLL_INTERVAL = 1.0  # seconds, database broker only
+    SSE_HEARTBEAT = 15         # seconds between keep-alive comments
+    SSE_MAX_DURATION = 300     # seconds before the server closes a stream; clients reconnect
+
+    # Rows per page on the doctor job search (capped at 100 per request)
+    SHIFT_PAGE_SIZE = 25
+
+    # Time zone shift dates/times are entered in; they are stored as UTC intervals
+    # on applications for double-booking checks (utils/scheduling.py)
+    SHIFT_TIMEZONE = os.environ.get('SHIFT_TIMEZONE', 'Asia/Kolkata')
+
+    # Shift lifecycle job (utils/lifecycle.py): past Open shifts become Expired
+    # (Closed if some places were booked), Pending applications on started
+    # shifts are rejected, and shifts older than SHIFT_ARCHIVE_AFTER_DAYS move
+    # to the archive tables. Runs in each worker
+    # every SHIFT_LIFECYCLE_INTERVAL seconds (0 = only via `flask run-shift-lifecycle`).
+    SHIFT_LIFECYCLE_INTERVAL = int(os.environ.get('SHIFT_LIFECYCLE_INTERVAL', 3600))
+    SHIFT_LIFECYCLE_BATCH_SIZE = 1000
+    SHIFT_ARCHIVE_AFTER_DAYS = 180
+
+    # Proximity search (utils/geo.py). Hospitals are placed by pincode from
+    # GEO_PINCODE_FILE; searches look at most GEO_MAX_HOSPITALS nearest hospitals.
+    GEO_PINCODE_FILE = os.path.join(basedir, 'data', 'pincodes.csv')
+    GEO_DEFAULT_RADIUS_KM = 15
+    GEO_MAX_RADIUS_KM = 200
+    GEO_MAX_HOSPITALS = 500
+
+    # Notifications (utils/notifications.py) are written to an outbox table in
+    # the same transaction as the change and sent by a dispatcher that polls
+    # every NOTIFICATION_POLL_INTERVAL seconds (0 = only via `flask send-notifications`).
+    # A recipient's notifications within NOTIFICATION_COALESCE_SECONDS of the
+    # first go out as one digest. Transports: 'file' (.eml files) or 'smtp'.
+    NOTIFICATION_TRANSPORT = os.environ.get('NOTIFICATION_TRANSPORT', 'file')
+    NOTIFICATION_FILE_DIR = os.path.join(basedir, 'instance', 'mail')
+    NOTIFICATION_SENDER = os.environ.get('NOTIFICATION_SENDER', 'TheLocum.in <no-reply@thelocum.in>')
+    NOTIFICATION_POLL_INTERVAL = int(os.environ.get('NOTIFICATION_POLL_INTERVAL', 5))
+    NOTIFICATION_BATCH_SIZE = 200       # recipients per dispatch batch
+    NOTIFICATION_COALESCE_SECONDS = 60
+    NOTIFICATION_LEASE_SECONDS = 300    # a claimed batch is retried after this if its worker dies
+    NOTIFICATION_RETRY_DELAY = 30       # seconds, doubled on each failed attempt
+    NOTIFICATION_MAX_ATTEMPTS = 5
+    SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+    SMTP_PORT = int(os.environ.get('SMTP_PORT', 25))
+    SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+    SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+    SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', '').lower() in ('1', 'true', 'yes')
+
+    # Per-process cache of anonymous pages and template fragments (utils/caching.py)
+    RESPONSE_CACHE_TTL = 60      # seconds
+    RESPONSE_CACHE_MAX_SIZE = 1000
+    # url_for('static') appends ?v=<content hash>; such URLs are served with a
+    # one-year immutable Cache-Control. Run `flask compress-static` on deploy
+    # to serve precompressed .gz/.br copies of CSS/JS.
+    STATIC_FINGERPRINT = True
+    STATIC_MAX_AGE = 31536000
+
+    # Rows per page of a doctor's payout history
+    PAYOUT_PAGE_SIZE = 25
+
+    # Valid rows per INSERT/commit when importing a roster file or bulk-creating shifts
+    ROSTER_BATCH_SIZE = 500
+    ROSTER_MAX_ROWS = 5000  # per JSON bulk-create request
+
+    # Instrumentation (utils/metrics.py). /metrics serves Prometheus text
+    # format to requests with "Authorization: Bearer <METRICS_TOKEN>"; while
+    # METRICS_TOKEN is unset it answers 403 to everyone.
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    LOG_JSON = os.environ.get('LOG_JSON', '').lower() in ('1', 'true', 'yes')  # one JSON line per request
+    # With PROFILER_ENABLED, a request carrying an X-Profile header and the
+    # metrics token (or to an endpoint in PROFILE_ENDPOINTS) is run under
+    # cProfile and dumped to PROFILE_DIR.
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILE_ENDPOINTS = ()
+    PROFILE_DIR = os.path.join(basedir, 'instance', 'profiles')
+
+    # Per-view SQL query budgets, checked when QUERY_BUDGET_ENABLED (default: debug/testing).
+    # Exceeding one raises under TESTING and logs a warning otherwise.
+    QUERY_BUDGET_ENABLED = None
+    QUERY_BUDGETS = {
+        'doctor.doctor_jobs': 6,     # user (uncached), [hospitals near ?near=], shift page, [its NULL tail on
+                                     # the last page], hospitals, hospital profiles
+        'hospital.hospital_applications': 5,  # user (uncached), shifts, applications + doctors, doctor profiles,
+                                              # accepted bookings (first request per process)
+        'doctor.doctor_history': 3,  # user (uncached), applications, shifts + hospitals
+        'doctor.doctor_payment': 4,  # user (uncached), monthly summary, payout page, shifts + hospitals
+        'hospital.hospital_payments': 2,  # user (uncached), monthly summary
+        'api.shifts': 6,
+        'api.applications': 6,
+        'api.me': 1,
+    }
+
     # Encryption key for sensitive data (change this in production!)
-    ENCRYPTION_KEY = b'your-32-byte-long-fernet-key-here=='  # 32 url-safe base64-encoded bytes
-    # Generate with: from cryptography.fernet import Fernet; Fernet.generate_key()
\ No newline at end of file
+    ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY', b'your-32-byte-long-fernet-key-here==')  # 32 url-safe base64-encoded bytes
+    # Generate with: from cryptography.fernet import Fernet; Fernet.generate_key()
+
+    # Key rotation: comma-separated keys, newest first. The first key encrypts,
+    # all of them decrypt; overrides ENCRYPTION_KEY when set.
+    ENCRYPTION_KEYS = [key for key in os.environ.get('ENCRYPTION_KEYS', '').split(',') if key]
\ No newline at end of file
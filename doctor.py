@@ -0,0 +1,128 @@
+# doctor.py - Doctor pages: job search, applications, earnings, profile and documents
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, jsonify, \
+    stream_with_context
+from flask_login import login_required, current_user
+
+from models import db, DoctorUser, DoctorProfile, DoctorDocument, DoctorMonthlyEarnings
+from utils.applications import APPLIED, APPLY_MESSAGES, NOT_FOUND, apply_to_shift, history_rows
+from utils.events import publish_application
+from utils.loading import load_shift_hospitals
+from utils.payments import csv_lines, iter_doctor_payouts, monthly_summary, payout_history
+from utils.shift_search import ShiftSearch, SPECIALTIES
+from utils.uploads import get_pipeline
+from utils.user_cache import invalidate_user
+
+doctor = Blueprint('doctor', __name__)
+
+
+@doctor.route('/doctor/jobs')
+@login_required
+def doctor_jobs():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+    search = ShiftSearch.from_args(request.args, page_size=current_app.config['SHIFT_PAGE_SIZE'])
+    shifts, next_cursor = search.page()
+    load_shift_hospitals(shifts)
+    return render_template('doctor/jobs.html', shifts=shifts, search=search,
+                           next_cursor=next_cursor, specialties=SPECIALTIES)
+
+
+@doctor.route('/doctor/apply/<int:shift_id>', methods=['POST'])
+@login_required
+def doctor_apply(shift_id):
+    if not isinstance(current_user, DoctorUser):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+
+    result = apply_to_shift(current_user.id, shift_id)
+    if result == APPLIED:
+        publish_application(current_user.id, shift_id, 'Pending')
+        return jsonify({'success': True})
+    if result == NOT_FOUND:
+        return jsonify({'success': False, 'message': APPLY_MESSAGES[result]}), 404
+    return jsonify({'success': False, 'message': APPLY_MESSAGES[result]})
+
+
+@doctor.route('/doctor/history')
+@login_required
+def doctor_history():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+    return render_template('doctor/history.html', rows=history_rows(current_user.id))
+
+
+@doctor.route('/doctor/payment')
+@login_required
+def doctor_payment():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+    months = monthly_summary(DoctorMonthlyEarnings, current_user.id)
+    rows, next_cursor = payout_history(current_user.id, request.args.get('cursor'),
+                                       page_size=current_app.config['PAYOUT_PAGE_SIZE'])
+    return render_template('doctor/payment.html', months=months, rows=rows, next_cursor=next_cursor)
+
+
+@doctor.route('/doctor/payment.csv')
+@login_required
+def doctor_payment_export():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+    rows = ((row.shift.shift_date if row.shift else '', row.shift.title if row.shift else '',
+             row.shift.hospital.hospital_name if row.shift and row.shift.hospital else '',
+             row.application.payment_amount, row.application.payment_status)
+            for row in iter_doctor_payouts(current_user.id))
+    lines = csv_lines(('Shift date', 'Shift', 'Hospital', 'Amount', 'Payment status'), rows)
+    return Response(stream_with_context(lines), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=earnings.csv'})
+
+
+@doctor.route('/doctor/profile', methods=['GET', 'POST'])
+@login_required
+def doctor_profile():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+
+    profile = current_user.profile or DoctorProfile(doctor_id=current_user.id)
+
+    if request.method == 'POST':
+        profile.phone = request.form['phone']
+        profile.address = request.form['address']
+        profile.city = request.form['city']
+        profile.qualifications = request.form['qualifications']
+        profile.license_number = request.form['license_number']
+
+        if not current_user.profile:
+            db.session.add(profile)
+        db.session.commit()
+        invalidate_user(current_user)
+        flash('Profile updated successfully!', 'success')
+
+    return render_template('doctor/profile.html', profile=profile)
+
+
+@doctor.route('/doctor/documents')
+@login_required
+def doctor_documents():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+    return render_template('doctor/documents.html')
+
+
+@doctor.route('/doctor/upload-document', methods=['POST'])
+@login_required
+def doctor_upload_document():
+    if not isinstance(current_user, DoctorUser):
+        return redirect(url_for('auth.dashboard'))
+
+    file = request.files['document_file']
+    doc_type = request.form['document_type']
+
+    if file and file.filename:
+        try:
+            get_pipeline().accept(DoctorDocument, 'doctor_id', current_user.id, doc_type, file)
+            flash('Document received! It will appear once the upload finishes.', 'success')
+        except Exception:
+            db.session.rollback()
+            flash('Upload failed. Please try again.', 'error')
+            current_app.logger.exception("Could not accept document upload")
+
+    return redirect(url_for('doctor.doctor_documents'))
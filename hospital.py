@@ -0,0 +1,197 @@
+# hospital.py - Hospital pages: profile, documents, shifts, applications and payouts
+import csv
+
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, \
+    stream_with_context
+from flask_login import login_required, current_user
+
+from models import db, HospitalUser, HospitalProfile, HospitalDocument, Shift, ShiftApplication, HospitalMonthlyPayouts
+from utils.applications import DECIDED, DECISION_MESSAGES, applicants_by_shift, decide_application, flag_conflicts
+from utils.encryption import Encryptor
+from utils.events import SHIFT_FILLED, SHIFT_NEW, publish_application, publish_shift
+from utils.loading import attach_hospital
+from utils.payments import csv_lines, iter_hospital_payouts, mark_paid, monthly_summary
+from utils.roster import RosterImport, parse_shift_row, read_rows
+from utils.uploads import get_pipeline
+from utils.user_cache import invalidate_user
+
+hospital = Blueprint('hospital', __name__)
+
+
+@hospital.route('/hospital/account', methods=['GET', 'POST'])
+@login_required
+def hospital_account():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+
+    profile = current_user.profile or HospitalProfile(hospital_id=current_user.id)
+
+    if request.method == 'POST':
+        profile.hospital_type = request.form['hospital_type']
+        profile.address = request.form['address']
+        profile.city = request.form['city']
+        profile.state = request.form['state']
+        profile.pincode = request.form['pincode']
+        profile.phone = request.form['phone']
+        profile.alternate_phone = request.form['alternate_phone']
+        profile.website = request.form['website']
+        profile.number_of_beds = request.form.get('number_of_beds', type=int)
+        profile.about = request.form['about']
+
+        if not current_user.profile:
+            db.session.add(profile)
+        db.session.commit()
+        invalidate_user(current_user)
+        flash('Profile updated successfully!', 'success')
+
+    return render_template('hospital/account.html', profile=profile)
+
+
+@hospital.route('/hospital/documents')
+@login_required
+def hospital_documents():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+    return render_template('hospital/documents.html')
+
+
+@hospital.route('/upload-document', methods=['POST'])
+@login_required
+def upload_document():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+
+    file = request.files['document_file']
+    doc_type = request.form['document_type']
+
+    if file and file.filename:
+        try:
+            get_pipeline().accept(HospitalDocument, 'hospital_id', current_user.id, doc_type, file)
+            flash('Document received! It will appear once the upload finishes.', 'success')
+        except Exception:
+            db.session.rollback()
+            flash('Upload failed. Please try again.', 'error')
+            current_app.logger.exception("Could not accept document upload")
+
+    return redirect(url_for('hospital.hospital_documents'))
+
+
+@hospital.route('/hospital/create-shift', methods=['GET', 'POST'])
+@login_required
+def create_shift():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+
+    if request.method == 'POST':
+        values, errors = parse_shift_row(request.form.to_dict())
+        if errors:
+            for error in errors:
+                flash(error, 'error')
+            return render_template('hospital/create_shift.html'), 400
+
+        new_shift = Shift(hospital_id=current_user.id, **values)
+        db.session.add(new_shift)
+        db.session.commit()
+        publish_shift(SHIFT_NEW, new_shift, city=current_user.profile.city if current_user.profile else None)
+        flash('Shift posted successfully!', 'success')
+        return redirect(url_for('auth.dashboard'))
+
+    return render_template('hospital/create_shift.html')
+
+
+@hospital.route('/hospital/import-shifts', methods=['GET', 'POST'])
+@login_required
+def import_shifts():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+
+    report = None
+    if request.method == 'POST':
+        file = request.files.get('roster_file')
+        if not file or not file.filename:
+            flash('Please choose a CSV or JSON file.', 'error')
+        else:
+            roster = RosterImport(current_user.id, batch_size=current_app.config['ROSTER_BATCH_SIZE'])
+            try:
+                report = roster.run(read_rows(file))
+            except (ValueError, csv.Error) as e:
+                roster.flush()
+                report = roster.report()
+                flash(f'Could not read the file: {e}', 'error')
+            if report['created']:
+                flash(f"{report['created']} shift(s) imported.", 'success')
+
+    return render_template('hospital/import_shifts.html', report=report)
+
+
+@hospital.route('/hospital/applications')
+@login_required
+def hospital_applications():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+    shifts = Shift.query.filter_by(hospital_id=current_user.id).order_by(Shift.posted_at.desc()).all()
+    attach_hospital(shifts, current_user)
+    entries = flag_conflicts(applicants_by_shift(shifts))
+    Encryptor.prime({row.doctor.profile for entry in entries for row in entry.rows
+                     if row.doctor and row.doctor.profile}, 'phone')
+    return render_template('hospital/applications.html', shifts=entries)
+
+
+@hospital.route('/hospital/applications/<int:application_id>/<decision>', methods=['POST'])
+@login_required
+def decide_hospital_application(application_id, decision):
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+    status = {'accept': 'Accepted', 'reject': 'Rejected'}.get(decision)
+    application = db.session.get(ShiftApplication, application_id)
+    shift = application and Shift.query.filter_by(id=application.shift_id, hospital_id=current_user.id).first()
+    if status is None or shift is None:
+        flash('Application not found.', 'error')
+        return redirect(url_for('hospital.hospital_applications'))
+
+    doctor_id = application.doctor_id
+    result = decide_application(application, shift, status)
+    if result != DECIDED:
+        flash(DECISION_MESSAGES[result], 'error')
+    else:
+        publish_application(doctor_id, shift.id, status)
+        if shift.status == 'Filled':
+            publish_shift(SHIFT_FILLED, shift, city=current_user.profile.city if current_user.profile else None)
+        flash(f'Application {status.lower()}.', 'success')
+    return redirect(url_for('hospital.hospital_applications'))
+
+
+@hospital.route('/hospital/applications/<int:application_id>/paid', methods=['POST'])
+@login_required
+def mark_application_paid(application_id):
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+    application = db.session.get(ShiftApplication, application_id)
+    shift = application and Shift.query.filter_by(id=application.shift_id, hospital_id=current_user.id).first()
+    if shift is None or not mark_paid(application):
+        flash('Nothing to pay for this application.', 'error')
+    else:
+        flash('Payment recorded.', 'success')
+    return redirect(url_for('hospital.hospital_applications'))
+
+
+@hospital.route('/hospital/payments')
+@login_required
+def hospital_payments():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+    months = monthly_summary(HospitalMonthlyPayouts, current_user.id)
+    return render_template('hospital/payments.html', months=months)
+
+
+@hospital.route('/hospital/payments.csv')
+@login_required
+def hospital_payments_export():
+    if not isinstance(current_user, HospitalUser):
+        return redirect(url_for('auth.dashboard'))
+    rows = ((row.shift.shift_date, row.shift.title, row.doctor.full_name if row.doctor else '',
+             row.application.payment_amount, row.application.payment_status)
+            for row in iter_hospital_payouts(current_user.id))
+    lines = csv_lines(('Shift date', 'Shift', 'Doctor', 'Amount', 'Payment status'), rows)
+    return Response(stream_with_context(lines), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=payouts.csv'})
@@ -1,9 +1,10 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from datetime import datetime
-from utils.encryption import Encryptor
+from utils.auth import hash_password
+from utils.encryption import EncryptedField
 
 db = SQLAlchemy()
 
@@ -30,7 +31,7 @@ class DoctorUser(UserMixin, db.Model):
         return f"doctor_{self.id}"
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -47,21 +48,8 @@ class DoctorProfile(db.Model):
     qualifications = db.Column(db.Text)
     license_number = db.Column(db.String(100))
 
-    @property
-    def phone(self):
-        return Encryptor.decrypt(self.phone_enc)
-
-    @phone.setter
-    def phone(self, value):
-        self.phone_enc = Encryptor.encrypt(value)
-
-    @property
-    def address(self):
-        return Encryptor.decrypt(self.address_enc)
-
-    @address.setter
-    def address(self, value):
-        self.address_enc = Encryptor.encrypt(value)
+    phone = EncryptedField('phone_enc')
+    address = EncryptedField('address_enc')
 
 class DoctorDocument(db.Model):
     __bind_key__ = 'doctors'
@@ -72,10 +60,18 @@ class DoctorDocument(db.Model):
     document_type = db.Column(db.String(100))
     file_path = db.Column(db.String(300))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='Uploaded')  # Pending / Uploaded / Failed
 
 class ShiftApplication(db.Model):
     __bind_key__ = 'doctors'
     __tablename__ = 'shift_applications'
+    __table_args__ = (
+        db.Index('uq_shift_applications_doctor_shift', 'doctor_id', 'shift_id', unique=True),
+        db.Index('ix_shift_applications_shift_status', 'shift_id', 'status'),
+        db.Index('ix_shift_applications_doctor_applied', 'doctor_id', 'applied_at'),
+        db.Index('ix_shift_applications_doctor_status_starts', 'doctor_id', 'status', 'starts_at'),
+        db.Index('ix_shift_applications_status_starts', 'status', 'starts_at'),  # lifecycle job: started Pending rows
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'))
@@ -83,7 +79,78 @@ class ShiftApplication(db.Model):
     applied_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='Pending')  # Pending, Accepted, Rejected
     payment_amount = db.Column(db.Float)
-    payment_status = db.Column(db.String(20), default='Pending')
+    payment_status = db.Column(db.String(20), default='Pending')  # Pending, Paid
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Copy of the shift's time span in UTC (utils/scheduling.py), so overlap
+    # checks need not reach into hospitals.db
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+
+
+class DoctorMonthlyEarnings(db.Model):
+    """Per doctor and month of the shift: accepted shifts, their earnings and the part paid (utils/payments.py)."""
+    __bind_key__ = 'doctors'
+    __tablename__ = 'doctor_monthly_earnings'
+    __table_args__ = (
+        db.Index('uq_doctor_monthly_earnings', 'doctor_id', 'month', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Date, nullable=False)  # first day of the month
+    shifts = db.Column(db.Integer, default=0, nullable=False)
+    earned = db.Column(db.Float, default=0, nullable=False)
+    paid = db.Column(db.Float, default=0, nullable=False)
+
+
+class ShiftApplicationArchive(db.Model):
+    """Applications moved out of shift_applications by the shift lifecycle job (utils/lifecycle.py)."""
+    __bind_key__ = 'doctors'
+    __tablename__ = 'shift_applications_archive'
+    __table_args__ = (
+        db.Index('ix_shift_applications_archive_doctor', 'doctor_id', 'applied_at'),
+        db.Index('ix_shift_applications_archive_shift', 'shift_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # same id as in shift_applications
+    doctor_id = db.Column(db.Integer)
+    shift_id = db.Column(db.Integer)
+    applied_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20))
+    payment_amount = db.Column(db.Float)
+    payment_status = db.Column(db.String(20))
+    updated_at = db.Column(db.DateTime)
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class OutboxMixin:
+    """Columns of a notification outbox (utils/notifications.py).
+
+    Each bind has its own outbox so a notification is committed in the same
+    transaction as the change it announces.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_type = db.Column(db.String(20), nullable=False)  # doctor / hospital
+    recipient_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), default='Pending', nullable=False)  # Pending / Sent / Failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # also the claim lease
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+
+class DoctorOutbox(OutboxMixin, db.Model):
+    """Notifications about changes to doctors.db rows: new applicants (to hospitals) and decisions (to doctors)."""
+    __bind_key__ = 'doctors'
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_doctor_outbox_pending', 'status', 'recipient_type', 'recipient_id', 'next_attempt_at'),
+    )
 
 
 # ========================
@@ -110,7 +177,7 @@ class HospitalUser(UserMixin, db.Model):
         return f"hospital_{self.id}"
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -118,12 +185,15 @@ class HospitalUser(UserMixin, db.Model):
 class HospitalProfile(db.Model):
     __bind_key__ = 'hospitals'
     __tablename__ = 'hospital_profiles'
+    __table_args__ = (
+        db.Index('ix_hospital_profiles_lat_lon', 'latitude', 'longitude'),  # bounding boxes without R*Tree
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospitals.id'), unique=True)
     hospital_type = db.Column(db.String(50))  # Govt, Private etc.
     address_enc = db.Column(db.Text)
-    city = db.Column(db.String(100))
+    city = db.Column(db.String(100), index=True)
     state = db.Column(db.String(100))
     pincode = db.Column(db.String(20))
     phone_enc = db.Column(db.Text)
@@ -131,30 +201,13 @@ class HospitalProfile(db.Model):
     website = db.Column(db.String(200))
     number_of_beds = db.Column(db.Integer)
     about = db.Column(db.Text)
+    # Looked up from the pincode (or city) in data/pincodes.csv; see utils/geo.py
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
 
-    @property
-    def address(self):
-        return Encryptor.decrypt(self.address_enc)
-
-    @address.setter
-    def address(self, value):
-        self.address_enc = Encryptor.encrypt(value)
-
-    @property
-    def phone(self):
-        return Encryptor.decrypt(self.phone_enc)
-
-    @phone.setter
-    def phone(self, value):
-        self.phone_enc = Encryptor.encrypt(value)
-
-    @property
-    def alternate_phone(self):
-        return Encryptor.decrypt(self.alternate_phone_enc)
-
-    @alternate_phone.setter
-    def alternate_phone(self, value):
-        self.alternate_phone_enc = Encryptor.encrypt(value)
+    address = EncryptedField('address_enc')
+    phone = EncryptedField('phone_enc')
+    alternate_phone = EncryptedField('alternate_phone_enc')
 
 class HospitalDocument(db.Model):
     __bind_key__ = 'hospitals'
@@ -165,11 +218,23 @@ class HospitalDocument(db.Model):
     document_type = db.Column(db.String(100))  # Registration, NABH etc.
     file_path = db.Column(db.String(300))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='Uploaded')  # Uploaded / Verified / Rejected
+    status = db.Column(db.String(20), default='Uploaded')  # Pending / Failed while uploading, then Uploaded / Verified / Rejected
 
 class Shift(db.Model):
     __bind_key__ = 'hospitals'
     __tablename__ = 'shifts'
+    # Composite indexes backing the doctor job search (utils/shift_search.py).
+    # Every index ends in `id` so keyset pagination can seek on (sort key, id).
+    __table_args__ = (
+        db.Index('ix_shifts_status_date', 'status', 'shift_date', 'id'),
+        db.Index('ix_shifts_status_specialty_pay', 'status', 'specialty', 'pay_rate', 'id'),
+        db.Index('ix_shifts_status_specialty_date', 'status', 'specialty', 'shift_date', 'id'),
+        db.Index('ix_shifts_status_pay', 'status', 'pay_rate', 'id'),
+        db.Index('ix_shifts_status_urgent_date', 'status', 'is_urgent', 'shift_date', 'id'),
+        db.Index('ix_shifts_status_posted', 'status', 'posted_at', 'id'),
+        db.Index('ix_shifts_hospital_posted', 'hospital_id', 'posted_at'),
+        db.Index('ix_shifts_hospital_status_date', 'hospital_id', 'status', 'shift_date', 'id'),  # near-me search
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospitals.id'))
@@ -184,5 +249,75 @@ class Shift(db.Model):
     location_ward = db.Column(db.String(100))
     requirements = db.Column(db.Text)
     is_urgent = db.Column(db.Boolean, default=False)
-    status = db.Column(db.String(20), default='Open')  # Open / Filled / Cancelled
-    posted_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    status = db.Column(db.String(20), default='Open')  # Open / Filled / Cancelled / Expired (past, nobody booked) / Closed (past, partly booked)
+    capacity = db.Column(db.Integer)  # doctors needed: accepted bookings before the shift is Filled; None = unlimited
+    applications_count = db.Column(db.Integer, default=0)  # accepted bookings claimed against capacity
+    posted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # row version for API ETags
+
+class LiveEvent(db.Model):
+    """Shift/application events shared between workers by the database event broker (utils/events.py)."""
+    __bind_key__ = 'hospitals'
+    __tablename__ = 'live_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    specialty = db.Column(db.String(100))
+    city = db.Column(db.String(100))
+    doctor_id = db.Column(db.Integer)  # set on application events only
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class HospitalMonthlyPayouts(db.Model):
+    """Per hospital and month of the shift: accepted shifts, amounts owed and the part paid (utils/payments.py)."""
+    __bind_key__ = 'hospitals'
+    __tablename__ = 'hospital_monthly_payouts'
+    __table_args__ = (
+        db.Index('uq_hospital_monthly_payouts', 'hospital_id', 'month', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    hospital_id = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Date, nullable=False)  # first day of the month
+    shifts = db.Column(db.Integer, default=0, nullable=False)
+    earned = db.Column(db.Float, default=0, nullable=False)
+    paid = db.Column(db.Float, default=0, nullable=False)
+
+
+class HospitalOutbox(OutboxMixin, db.Model):
+    """Notifications about changes to hospitals.db rows (expired shifts)."""
+    __bind_key__ = 'hospitals'
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_hospital_outbox_pending', 'status', 'recipient_type', 'recipient_id', 'next_attempt_at'),
+    )
+
+
+class ShiftArchive(db.Model):
+    """Past shifts moved out of shifts by the shift lifecycle job (utils/lifecycle.py)."""
+    __bind_key__ = 'hospitals'
+    __tablename__ = 'shifts_archive'
+    __table_args__ = (
+        db.Index('ix_shifts_archive_hospital_date', 'hospital_id', 'shift_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # same id as in shifts
+    hospital_id = db.Column(db.Integer)
+    title = db.Column(db.String(200), nullable=False)
+    specialty = db.Column(db.String(100))
+    shift_date = db.Column(db.Date)
+    start_time = db.Column(db.Time)
+    end_time = db.Column(db.Time)
+    duration_hours = db.Column(db.Float)
+    pay_rate = db.Column(db.Float)
+    pay_type = db.Column(db.String(20))
+    location_ward = db.Column(db.String(100))
+    requirements = db.Column(db.Text)
+    is_urgent = db.Column(db.Boolean)
+    status = db.Column(db.String(20))
+    capacity = db.Column(db.Integer)
+    applications_count = db.Column(db.Integer)
+    posted_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -47,32 +47,55 @@ document.addEventListener('DOMContentLoaded', function () {
         }, 5000);
     }
 
-    // 3. Filters (Specialty, Pay Range) - Client side filtering
-    const filterSpecialty = document.getElementById('filter-specialty');
-    const filterPay = document.getElementById('filter-pay');
-    const jobRows = document.querySelectorAll('.job-row');
+    // 3. Filters (Specialty, Pay, Date, City, Urgent, Sort) - applied server-side,
+    //    dropdowns and checkboxes re-run the search as soon as they change
+    const filterForm = document.getElementById('job-filters');
 
-    if (filterSpecialty || filterPay) {
-        function filterJobs() {
-            const specialty = filterSpecialty ? filterSpecialty.value.toLowerCase() : '';
-            const minPay = filterPay ? parseFloat(filterPay.value) || 0 : 0;
-
-            jobRows.forEach(row => {
-                const rowSpecialty = row.dataset.specialty.toLowerCase();
-                const rowPay = parseFloat(row.dataset.pay);
-
-                const matchesSpecialty = specialty === '' || rowSpecialty.includes(specialty);
-                const matchesPay = rowPay >= minPay;
+    if (filterForm) {
+        filterForm.querySelectorAll('select, input[type="checkbox"]').forEach(field => {
+            field.addEventListener('change', () => filterForm.submit());
+        });
+    }
 
-                row.style.display = matchesSpecialty && matchesPay ? '' : 'none';
-            });
-        }
+    // 4. Live updates (server-sent events) - new urgent/matching shifts and
+    //    application status changes arrive without reloading the page
+    if (filterForm && window.EventSource) {
+        const params = new URLSearchParams();
+        const specialty = document.getElementById('filter-specialty').value;
+        const city = document.getElementById('filter-city').value;
+        if (specialty) params.set('specialty', specialty);
+        if (city) params.set('city', city);
+        const source = new EventSource(`/api/v1/events?${params.toString()}`);
 
-        if (filterSpecialty) filterSpecialty.addEventListener('change', filterJobs);
-        if (filterPay) filterPay.addEventListener('input', filterJobs);
+        source.addEventListener('shift.new', e => {
+            const shift = JSON.parse(e.data);
+            showAlert(`New ${shift.is_urgent ? 'urgent ' : ''}shift posted: ${shift.title}. Refresh to see it.`, 'success');
+        });
+        source.addEventListener('shift.filled', e => {
+            const shift = JSON.parse(e.data);
+            const button = document.querySelector(`.apply-btn[data-shift-id="${shift.id}"]`);
+            if (button && !button.disabled) {
+                button.textContent = 'Filled';
+                button.disabled = true;
+            }
+        });
+        source.addEventListener('shift.updated', e => {
+            const shift = JSON.parse(e.data);
+            const button = document.querySelector(`.apply-btn[data-shift-id="${shift.id}"]`);
+            if (button && !button.disabled && shift.status !== 'Open') {
+                button.textContent = shift.status;
+                button.disabled = true;
+            }
+        });
+        source.addEventListener('application.status', e => {
+            const application = JSON.parse(e.data);
+            if (application.status !== 'Pending') {
+                showAlert(`Your application was ${application.status.toLowerCase()}.`, 'success');
+            }
+        });
     }
 
-    // 4. Success message fade out (from flash)
+    // 5. Success message fade out (from flash)
     const flashAlerts = document.querySelectorAll('.alert-success, .alert-error');
     flashAlerts.forEach(alert => {
         setTimeout(() => {
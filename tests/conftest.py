@@ -0,0 +1,88 @@
+# tests/conftest.py - an app on temporary SQLite files, plus small data factories
+#
+# The factories need an app context; tests set data up inside
+# `with app.app_context():` and make requests outside it, so every request
+# gets its own context, session and query count as it would in production.
+import os
+import sys
+from datetime import date, time, timedelta
+
+import pytest
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, DoctorProfile, DoctorUser, HospitalProfile, HospitalUser, Shift  # noqa: E402
+
+
+def create_test_app(tmp_path, **overrides):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'SQLALCHEMY_BINDS': {
+            'doctors': f"sqlite:///{tmp_path / 'doctors.db'}",
+            'hospitals': f"sqlite:///{tmp_path / 'hospitals.db'}",
+        },
+        'SCHEMA_AUTO_UPGRADE': True,
+        'ENCRYPTION_KEY': Fernet.generate_key(),
+        'ENCRYPTION_KEYS': [],
+        'DOCUMENT_STORAGE': 'local',
+        'UPLOAD_WORKERS': 0,
+        'UPLOAD_SPOOL_DIR': str(tmp_path / 'spool'),
+        'NOTIFICATION_FILE_DIR': str(tmp_path / 'mail'),
+        'NOTIFICATION_POLL_INTERVAL': 0,
+        'SHIFT_LIFECYCLE_INTERVAL': 0,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        **overrides,
+    })
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_test_app(tmp_path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, user_id):
+    """Sign in as `user_id` (a user's get_id(), e.g. 'doctor_3') without going through the login form."""
+    with client.session_transaction() as session:
+        session['_user_id'] = user_id
+        session['_fresh'] = True
+
+
+def make_hospital(name='City Hospital', city='Pune', pincode='411001'):
+    hospital = HospitalUser(hospital_name=name, contact_person='Admin', email=f'{name.lower().replace(" ", ".")}@test')
+    hospital.set_password('password')
+    db.session.add(hospital)
+    db.session.flush()
+    db.session.add(HospitalProfile(hospital_id=hospital.id, city=city, pincode=pincode, address='1 Main Road'))
+    db.session.commit()
+    return hospital
+
+
+def make_doctor(name='Dr. Test', qualifications='MBBS, MD (Medicine)'):
+    doctor = DoctorUser(full_name=name, years_of_experience=5,
+                        email=f'{name.lower().replace(" ", "").replace(".", "")}@test')
+    doctor.set_password('password')
+    db.session.add(doctor)
+    db.session.flush()
+    db.session.add(DoctorProfile(doctor_id=doctor.id, city='Pune', phone='9999999999',
+                                 qualifications=qualifications))
+    db.session.commit()
+    return doctor
+
+
+def make_shift(hospital, days_ahead=3, start=time(9), end=time(17), capacity=None, **values):
+    shift = Shift(hospital_id=hospital.id, title=values.pop('title', 'Day cover'),
+                  specialty=values.pop('specialty', 'General Medicine'),
+                  shift_date=date.today() + timedelta(days=days_ahead), start_time=start, end_time=end,
+                  pay_rate=values.pop('pay_rate', 5000), pay_type=values.pop('pay_type', 'Fixed'),
+                  capacity=capacity, applications_count=0, status='Open', **values)
+    db.session.add(shift)
+    db.session.commit()
+    return shift
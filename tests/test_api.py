@@ -0,0 +1,24 @@
+# tests/test_api.py - list endpoints revalidate on the ETag alone
+from models import db, Shift
+from tests.conftest import login, make_doctor, make_hospital, make_shift
+
+
+def test_shift_list_etag_sees_removals(app, client):
+    with app.app_context():
+        hospital = make_hospital()
+        shift_ids = [make_shift(hospital, days_ahead=n + 1).id for n in range(3)]
+        doctor_id = make_doctor().get_id()
+    login(client, doctor_id)
+
+    first = client.get('/api/v1/shifts')
+    assert first.status_code == 200
+    assert 'Last-Modified' not in first.headers
+    assert client.get('/api/v1/shifts', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    # The newest row is untouched, but one shift leaves the list.
+    with app.app_context():
+        db.session.get(Shift, shift_ids[0]).status = 'Cancelled'
+        db.session.commit()
+    second = client.get('/api/v1/shifts', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert len(second.get_json()['items']) == 2
@@ -0,0 +1,145 @@
+# tests/test_applications.py - applying and deciding under concurrency, what capacity counts, and cross-database joins
+import threading
+
+from models import db, DoctorOutbox, HospitalOutbox, Shift, ShiftApplication
+from tests.conftest import make_doctor, make_hospital, make_shift
+from utils.applications import APPLIED, CLOSED, DECIDED, NOT_PENDING, applicant_counts, applicants_by_shift, \
+    apply_to_shift, decide_application, history_rows
+from utils.notifications import DOCTOR, HOSPITAL, NEW_APPLICANT
+
+APPLICANTS = 8
+
+
+def run_concurrently(app, target, args_list):
+    """Run target(*args) in one thread per entry, each in its own app context; returns the results in order."""
+    results = [None] * len(args_list)
+    barrier = threading.Barrier(len(args_list))
+
+    def worker(index, args):
+        with app.app_context():
+            barrier.wait()
+            try:
+                results[index] = target(*args)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(index, args)) for index, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def setup_shift(app, capacity):
+    with app.app_context():
+        shift = make_shift(make_hospital(), capacity=capacity)
+        doctors = [make_doctor(f'Dr. Applicant {n}') for n in range(APPLICANTS)]
+        return shift.id, [doctor.id for doctor in doctors]
+
+
+def decide(shift_id, doctor_id, status):
+    application = ShiftApplication.query.filter_by(shift_id=shift_id, doctor_id=doctor_id).one()
+    return decide_application(application, db.session.get(Shift, shift_id), status)
+
+
+def test_concurrent_applicants_all_apply_to_a_single_place(app):
+    shift_id, doctor_ids = setup_shift(app, capacity=1)
+
+    results = run_concurrently(app, apply_to_shift, [(doctor_id, shift_id) for doctor_id in doctor_ids])
+
+    assert results == [APPLIED] * APPLICANTS
+    with app.app_context():
+        shift = db.session.get(Shift, shift_id)
+        # Pending applicants take no place: the shift stays Open until someone is accepted.
+        assert (shift.status, shift.applications_count) == ('Open', 0)
+        assert ShiftApplication.query.filter_by(shift_id=shift_id, status='Pending').count() == APPLICANTS
+
+
+def test_new_applicant_notice_is_committed_with_the_application(app):
+    shift_id, doctor_ids = setup_shift(app, capacity=1)
+    with app.app_context():
+        assert apply_to_shift(doctor_ids[0], shift_id) == APPLIED
+        hospital_id = db.session.get(Shift, shift_id).hospital_id
+        # doctors.db holds both the application and its notice.
+        notices = DoctorOutbox.query.filter_by(recipient_type=HOSPITAL, kind=NEW_APPLICANT).all()
+        assert [notice.recipient_id for notice in notices] == [hospital_id]
+        assert HospitalOutbox.query.count() == 0
+
+
+def test_concurrent_acceptances_never_overbook(app):
+    shift_id, doctor_ids = setup_shift(app, capacity=2)
+    with app.app_context():
+        for doctor_id in doctor_ids:
+            assert apply_to_shift(doctor_id, shift_id) == APPLIED
+
+    results = run_concurrently(app, decide, [(shift_id, doctor_id, 'Accepted') for doctor_id in doctor_ids])
+
+    assert sorted(results) == sorted([DECIDED] * 2 + [CLOSED] * (APPLICANTS - 2))
+    with app.app_context():
+        shift = db.session.get(Shift, shift_id)
+        assert (shift.status, shift.applications_count) == ('Filled', 2)
+        assert ShiftApplication.query.filter_by(shift_id=shift_id, status='Accepted').count() == 2
+        assert ShiftApplication.query.filter_by(shift_id=shift_id, status='Pending').count() == APPLICANTS - 2
+
+
+def test_applying_to_a_filled_shift_is_closed(app):
+    shift_id, doctor_ids = setup_shift(app, capacity=1)
+    with app.app_context():
+        assert apply_to_shift(doctor_ids[0], shift_id) == APPLIED
+        assert decide(shift_id, doctor_ids[0], 'Accepted') == DECIDED
+        assert apply_to_shift(doctor_ids[1], shift_id) == CLOSED
+        assert ShiftApplication.query.filter_by(doctor_id=doctor_ids[1]).count() == 0
+
+
+def test_only_pending_applications_are_decided(app):
+    shift_id, doctor_ids = setup_shift(app, capacity=1)
+    with app.app_context():
+        assert apply_to_shift(doctor_ids[0], shift_id) == APPLIED
+        assert decide(shift_id, doctor_ids[0], 'Accepted') == DECIDED
+        assert decide(shift_id, doctor_ids[0], 'Rejected') == NOT_PENDING
+        assert decide(shift_id, doctor_ids[0], 'Accepted') == NOT_PENDING
+
+        application = ShiftApplication.query.filter_by(shift_id=shift_id, doctor_id=doctor_ids[0]).one()
+        assert application.status == 'Accepted'
+        assert db.session.get(Shift, shift_id).applications_count == 1
+        assert DoctorOutbox.query.filter_by(recipient_type=DOCTOR, recipient_id=doctor_ids[0]).count() == 1
+
+
+def test_concurrent_decisions_on_one_application(app):
+    shift_id, doctor_ids = setup_shift(app, capacity=None)
+    with app.app_context():
+        assert apply_to_shift(doctor_ids[0], shift_id) == APPLIED
+
+    decisions = ['Accepted', 'Rejected'] * (APPLICANTS // 2)
+    results = run_concurrently(app, decide, [(shift_id, doctor_ids[0], status) for status in decisions])
+
+    assert sorted(results) == sorted([DECIDED] + [NOT_PENDING] * (len(decisions) - 1))
+    with app.app_context():
+        status = ShiftApplication.query.filter_by(shift_id=shift_id, doctor_id=doctor_ids[0]).one().status
+        assert status == decisions[results.index(DECIDED)]
+        assert db.session.get(Shift, shift_id).applications_count == (1 if status == 'Accepted' else 0)
+        assert DoctorOutbox.query.filter_by(recipient_type=DOCTOR, recipient_id=doctor_ids[0]).count() == 1
+
+
+def test_applications_are_joined_to_shifts_and_doctors_across_databases(app):
+    with app.app_context():
+        first, second = make_shift(make_hospital('North Hospital')), make_shift(make_hospital('South Hospital'))
+        doctor, other = make_doctor('Dr. Joined'), make_doctor('Dr. Other')
+        for shift_id, doctor_id in [(first.id, doctor.id), (second.id, doctor.id), (second.id, other.id)]:
+            assert apply_to_shift(doctor_id, shift_id) == APPLIED
+        gone = ShiftApplication(doctor_id=doctor.id, shift_id=9999, status='Rejected')  # its shift was archived
+        db.session.add(gone)
+        db.session.commit()
+
+        rows = history_rows(doctor.id)
+        assert [(row.application.shift_id, row.shift and row.shift.hospital.hospital_name) for row in rows] == [
+            (9999, None), (second.id, 'South Hospital'), (first.id, 'North Hospital')]
+
+        entries = applicants_by_shift([second, first])
+        assert [[row.doctor.full_name for row in entry.rows] for entry in entries] == [['Dr. Joined', 'Dr. Other'],
+                                                                                       ['Dr. Joined']]
+        assert entries[0].rows[0].doctor.profile.city == 'Pune'
+        assert entries[0].pending_count == 2
+        assert applicant_counts([first.id, second.id, 9999], status='Pending') == {first.id: 1, second.id: 2}
+        assert applicant_counts([first.id, second.id], status='Accepted') == {}
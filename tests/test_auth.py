@@ -0,0 +1,64 @@
+# tests/test_auth.py - the password hasher's slots follow the hashes, not the callers; rehashing on login
+import threading
+
+import pytest
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+
+from models import db, DoctorUser
+from tests.conftest import make_doctor
+from utils import auth
+from utils.auth import LoginBusy, PasswordHasher, hash_password, needs_rehash
+
+
+def test_slot_is_held_until_a_timed_out_hash_finishes(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(auth, 'check_password_hash', lambda password_hash, password: release.wait(5))
+    hasher = PasswordHasher(workers=1, queue_size=0, timeout=0.05)
+
+    with pytest.raises(LoginBusy):
+        hasher.verify('hash', 'password')  # gives up waiting; the hash keeps running
+    with pytest.raises(LoginBusy):
+        hasher.verify('hash', 'password')  # its slot is still taken
+
+    release.set()
+    hasher.executor.submit(lambda: None).result()  # the running hash has finished
+    assert hasher.verify('hash', 'password') is True
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'scrypt:32768:8:1', 'pbkdf2', 'pbkdf2:sha256',
+                                    f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}', 'pbkdf2:sha256:1000'])
+def test_a_hash_made_with_the_configured_method_needs_no_rehash(app, method):
+    with app.app_context():
+        app.config['PASSWORD_HASH_METHOD'] = method
+        assert not needs_rehash(hash_password('password'))
+
+
+def test_changed_parameters_need_a_rehash(app):
+    with app.app_context():
+        app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+        password_hash = hash_password('password')
+        for method in ('pbkdf2', 'pbkdf2:sha256:2000', 'pbkdf2:sha512:1000', 'scrypt'):
+            app.config['PASSWORD_HASH_METHOD'] = method
+            assert needs_rehash(password_hash), method
+
+
+def test_login_rehashes_on_the_hasher_pool(app, client, monkeypatch):
+    with app.app_context():
+        doctor = make_doctor()
+        doctor.password_hash = generate_password_hash('password', method='pbkdf2:sha256:500')
+        db.session.commit()
+        doctor_id, email = doctor.id, doctor.email
+
+    threads = []
+
+    def generate_in(password, method):
+        threads.append(threading.current_thread().name)
+        return generate_password_hash(password, method=method)
+
+    monkeypatch.setattr(auth, 'generate_password_hash', generate_in)
+    response = client.post('/login', data={'email': email, 'password': 'password', 'user_type': 'doctor'})
+    assert response.status_code == 302
+
+    with app.app_context():
+        assert db.session.get(DoctorUser, doctor_id).password_hash.startswith('pbkdf2:sha256:1000$')
+    assert len(threads) == 1 and threads[0].startswith('hash')
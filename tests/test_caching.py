@@ -0,0 +1,75 @@
+# tests/test_caching.py - cached anonymous pages and fragments, dropped when shifts change
+from sqlalchemy import update
+
+from models import db, Shift
+from tests.conftest import login, make_doctor, make_hospital, make_shift
+from utils.caching import ResponseCache
+
+
+def test_tags_expiry_and_eviction(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('utils.caching.time.monotonic', lambda: clock[0])
+    cache = ResponseCache(ttl=10, max_size=2)
+
+    cache.set('a', 1, tags=('shifts', 'home'))
+    cache.set('b', 2, tags=('shifts',))
+    cache.invalidate_tag('shifts')
+    assert (cache.get('a'), cache.get('b')) == (None, None)
+    cache.set('c', 3, tags=('home',))
+    cache.invalidate_tag('home')  # 'a' must not linger under its other tag
+    assert cache.get('c') is None
+
+    cache.set('d', 4)
+    cache.set('e', 5, ttl=20)
+    assert cache.get('d') == 4   # now the most recently used
+    cache.set('f', 6)            # evicts 'e'
+    assert (cache.get('d'), cache.get('e'), cache.get('f')) == (4, None, 6)
+    clock[0] += 11
+    assert cache.get('d') is None and cache.stats()['size'] == 1
+
+
+def test_home_page_is_cached_until_a_shift_change_commits(app, client):
+    with app.app_context():
+        hospital = make_hospital()
+        make_shift(hospital)
+
+    response = client.get('/')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert b'1 open shifts right now' in response.data
+    assert client.get('/').headers['X-Cache'] == 'HIT'
+
+    with app.app_context():
+        make_shift(db.session.merge(hospital))
+    response = client.get('/')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert b'2 open shifts right now' in response.data
+
+    with app.app_context():
+        db.session.execute(update(Shift).values(status='Cancelled'))
+        db.session.rollback()
+    assert client.get('/').headers['X-Cache'] == 'HIT'
+
+    with app.app_context():
+        db.session.execute(update(Shift).values(status='Cancelled'))  # bulk statements count too
+        db.session.commit()
+    response = client.get('/')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert b'0 open shifts right now' in response.data
+
+
+def test_untagged_pages_survive_shift_changes(app, client):
+    assert client.get('/login').headers['X-Cache'] == 'MISS'
+    with app.app_context():
+        make_shift(make_hospital())
+    assert client.get('/login').headers['X-Cache'] == 'HIT'
+    assert client.get('/login?next=/').headers['X-Cache'] == 'MISS'  # keyed on the query string too
+
+
+def test_signed_in_users_are_not_served_from_the_cache(app, client):
+    with app.app_context():
+        doctor_id = make_doctor().get_id()
+    client.get('/')
+    login(client, doctor_id)
+    response = client.get('/')
+    assert response.status_code == 200
+    assert 'X-Cache' not in response.headers
@@ -0,0 +1,29 @@
+# tests/test_database.py - every bind gets its engine options, and SQLite connections the pragmas
+from sqlalchemy import text
+
+from models import db
+from utils.database import engine_options
+
+CONFIG = {'DB_POOL_SIZE': 3, 'DB_MAX_OVERFLOW': 4, 'DB_POOL_TIMEOUT': 5, 'DB_POOL_RECYCLE': 60}
+
+
+def pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_pragmas_on_every_bind(app):
+    with app.app_context():
+        for key in (None, 'doctors', 'hospitals'):
+            with db.engines[key].connect() as conn:
+                assert pragma(conn, 'journal_mode') == 'wal'
+                assert pragma(conn, 'busy_timeout') == 5000
+                assert pragma(conn, 'synchronous') == 1  # NORMAL
+                assert pragma(conn, 'temp_store') == 2   # MEMORY
+            assert db.engines[key].pool.size() == app.config['DB_POOL_SIZE']
+
+
+def test_engine_options_by_backend():
+    assert engine_options('sqlite://', CONFIG) == engine_options('sqlite:///:memory:', CONFIG) == {}
+    assert engine_options('sqlite:////tmp/app.db', CONFIG) == {'pool_size': 3, 'max_overflow': 4, 'pool_timeout': 5}
+    assert engine_options('postgresql://db/locum', CONFIG) == {'pool_size': 3, 'max_overflow': 4, 'pool_timeout': 5,
+                                                               'pool_recycle': 60, 'pool_pre_ping': True}
@@ -0,0 +1,39 @@
+# tests/test_encryption.py - list views decrypt each applicant's phone once, in bulk
+from models import db, ShiftApplication
+from tests.conftest import login, make_doctor, make_hospital, make_shift
+from utils.encryption import operation_counts
+
+
+def test_applicants_page_primes_phones(app, client):
+    with app.app_context():
+        hospital = make_hospital()
+        doctors = [make_doctor(f'Dr. Phone {n}') for n in range(3)]
+        for n in range(2):
+            shift = make_shift(hospital, days_ahead=n + 1)
+            for doctor in doctors:
+                db.session.add(ShiftApplication(doctor_id=doctor.id, shift_id=shift.id, status='Pending'))
+        db.session.commit()
+        hospital_id = hospital.get_id()
+
+    login(client, hospital_id)
+    before = operation_counts()['decrypt']
+    response = client.get('/hospital/applications')
+    assert response.status_code == 200
+    assert response.data.count(b'9999999999') == 6
+    # Three doctors, each listed under two shifts: three decrypts.
+    assert operation_counts()['decrypt'] - before == 3
+
+
+def test_api_applications_doctor_phone(app, client):
+    with app.app_context():
+        hospital = make_hospital()
+        doctor = make_doctor()
+        shift = make_shift(hospital)
+        db.session.add(ShiftApplication(doctor_id=doctor.id, shift_id=shift.id, status='Pending'))
+        db.session.commit()
+        hospital_id = hospital.get_id()
+
+    login(client, hospital_id)
+    items = client.get('/api/v1/applications?fields=id,doctor_phone').get_json()['items']
+    assert items[0]['doctor_phone'] == '9999999999'
+    assert 'doctor_phone' not in client.get('/api/v1/applications').get_json()['items'][0]
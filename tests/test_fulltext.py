@@ -0,0 +1,87 @@
+# tests/test_fulltext.py - the FTS5 shift index follows every write; LIKE filters stand in without it
+from sqlalchemy import delete, text, update
+
+from models import db, HospitalProfile, Shift
+from tests.conftest import make_hospital, make_shift
+from utils.fulltext import FTS_TABLE
+from utils.shift_search import ShiftSearch
+
+
+def search(q, **args):
+    return ShiftSearch(q=q, **args).page()[0]
+
+
+def titles(q, **args):
+    return [shift.title for shift in search(q, **args)]
+
+
+def indexed():
+    return db.session.execute(text(f"SELECT count(*) FROM {FTS_TABLE}"),
+                              bind_arguments={'bind': db.engines['hospitals']}).scalar()
+
+
+def test_triggers_keep_the_index_in_step(app):
+    with app.app_context():
+        assert app.extensions['fulltext']
+        hospital = make_hospital('Sahyadri Hospital')
+        shift = make_shift(hospital, title='Night cover', requirements='ICU experience')
+        assert titles('icu') == titles('sahyadri') == titles('pun') == ['Night cover']
+
+        shift.title = 'Weekend cover'
+        db.session.commit()
+        assert (titles('night'), titles('weekend')) == ([], ['Weekend cover'])
+
+        hospital.hospital_name = 'Ruby Hall'
+        HospitalProfile.query.filter_by(hospital_id=hospital.id).one().city = 'Nashik'
+        db.session.commit()
+        assert titles('sahyadri') == titles('pune') == []
+        assert titles('ruby nashik') == ['Weekend cover']
+
+        db.session.execute(update(Shift).values(title='Bulk cover'))  # bulk statements too
+        db.session.commit()
+        assert titles('bulk') == ['Bulk cover']
+
+        shift.status = 'Cancelled'
+        db.session.commit()
+        assert (titles('bulk'), indexed()) == ([], 0)
+        shift.status = 'Open'
+        db.session.commit()
+        assert titles('bulk') == ['Bulk cover']
+
+        db.session.execute(delete(Shift))
+        db.session.commit()
+        assert indexed() == 0
+
+
+def test_relevance_prefers_title_matches(app):
+    with app.app_context():
+        hospital = make_hospital()
+        make_shift(hospital, title='Clinic', requirements='A cardiology background helps')
+        make_shift(hospital, title='Cardiology clinic', days_ahead=5)
+        assert titles('cardio', sort='relevance') == ['Cardiology clinic', 'Clinic']
+        assert titles('cardio') == ['Clinic', 'Cardiology clinic']  # date order
+
+
+def test_snippets_are_escaped(app):
+    with app.app_context():
+        make_shift(make_hospital(), requirements='<script>alert(1)</script> ICU nights & weekends')
+        shift, = search('icu')
+        assert '&lt;script&gt;' in shift.search_snippet and '<script>' not in shift.search_snippet
+        assert '<mark>ICU</mark>' in shift.search_snippet and '&amp;' in shift.search_snippet
+        # Query syntax is not passed through to MATCH.
+        assert titles('"icu*') == titles('icu) ^-') == ['Day cover']
+
+
+def test_like_fallback_without_the_index(app):
+    with app.app_context():
+        app.extensions['fulltext'] = False
+        hospital = make_hospital('Sahyadri Hospital', city='Nashik')
+        make_shift(hospital, title='Night cover', requirements='<b>ICU</b> experience')
+        make_shift(make_hospital('Ruby Hall'), title='Day cover')
+
+        assert titles('sahyadri') == titles('nashik') == titles('night icu') == ['Night cover']
+        assert titles('night ruby') == []
+        fallback = ShiftSearch(q='icu', sort='relevance')
+        assert (fallback.fulltext, fallback.sort) == (False, 'date')
+        shift, = fallback.page()[0]
+        assert shift.search_snippet == '&lt;b&gt;<mark>ICU</mark>&lt;/b&gt; experience'
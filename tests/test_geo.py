@@ -0,0 +1,79 @@
+# tests/test_geo.py - hospitals are placed by pincode on flush and found through the R*Tree or a bounding box
+import pytest
+from sqlalchemy import delete, text, update
+
+from models import db, HospitalProfile
+from tests.conftest import make_hospital
+from utils.geo import GEO_TABLE, geocode_hospitals, hospitals_near
+
+DELHI = (28.6139, 77.2090)
+PUNE = (18.5204, 73.8567)
+
+
+def profile(hospital):
+    return HospitalProfile.query.filter_by(hospital_id=hospital.id).one()
+
+
+def indexed():
+    return dict(db.session.execute(text(f"SELECT id, min_lat FROM {GEO_TABLE}"),
+                                   bind_arguments={'bind': db.engines['hospitals']}).all())
+
+
+def test_profiles_are_geocoded_on_flush(app):
+    with app.app_context():
+        hospital = make_hospital(city='Delhi', pincode='110 001')
+        assert (profile(hospital).latitude, profile(hospital).longitude) == DELHI
+
+        profile(hospital).pincode = '411038'
+        db.session.commit()
+        assert (profile(hospital).latitude, profile(hospital).longitude) == PUNE
+
+        profile(hospital).pincode = '999999'  # unknown: falls back to the city
+        db.session.commit()
+        assert (profile(hospital).latitude, profile(hospital).longitude) == DELHI
+
+        profile(hospital).city = 'Atlantis'
+        db.session.commit()
+        assert (profile(hospital).latitude, profile(hospital).longitude) == (None, None)
+
+
+def test_triggers_keep_the_rtree_in_step(app):
+    with app.app_context():
+        assert app.extensions['geo_rtree']
+        delhi, pune = make_hospital('Delhi Hospital', city='Delhi', pincode='110001'), make_hospital()
+        assert indexed() == {delhi.id: pytest.approx(DELHI[0]), pune.id: pytest.approx(PUNE[0])}
+
+        profile(pune).pincode = '110001'
+        db.session.commit()
+        assert indexed()[pune.id] == pytest.approx(DELHI[0])
+
+        # Bulk statements go through the triggers too.
+        db.session.execute(update(HospitalProfile).where(HospitalProfile.hospital_id == pune.id)
+                           .values(latitude=None, longitude=None))
+        db.session.commit()
+        assert set(indexed()) == {delhi.id}
+        assert geocode_hospitals() == 1
+        assert set(indexed()) == {delhi.id, pune.id}
+
+        db.session.execute(delete(HospitalProfile).where(HospitalProfile.hospital_id == delhi.id))
+        db.session.commit()
+        assert set(indexed()) == {pune.id}
+
+
+@pytest.mark.parametrize('rtree', [True, False])
+def test_hospitals_near(app, rtree):
+    with app.app_context():
+        app.extensions['geo_rtree'] = rtree
+        places = {city: make_hospital(f'{city} Hospital', city=city, pincode=pincode).id
+                  for city, pincode in [('Delhi', '110001'), ('Noida', '201301'), ('Gurugram', '122001'),
+                                        ('Faridabad', '121001'), ('Pune', '411001')]}
+        if not rtree:
+            db.session.execute(text(f"DELETE FROM {GEO_TABLE}"), bind_arguments={'bind': db.engines['hospitals']})
+            db.session.commit()
+
+        # Faridabad (25.2 km) is inside the bounding box but outside the circle.
+        found = hospitals_near(*DELHI, 25)
+        assert [hospital_id for hospital_id, _ in found] == [places['Delhi'], places['Noida'], places['Gurugram']]
+        assert [distance for _, distance in found] == [0.0, 19.8, 24.74]
+        assert hospitals_near(*DELHI, 30, limit=2) == found[:2]
+        assert hospitals_near(*PUNE, 1) == [(places['Pune'], 0.0)]
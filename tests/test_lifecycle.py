@@ -0,0 +1,118 @@
+# tests/test_lifecycle.py - expiring past shifts updates the live job lists, once per shift
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import db, DoctorOutbox, HospitalOutbox, Shift, ShiftApplication
+from tests.conftest import make_doctor, make_hospital, make_shift
+from utils import lifecycle
+from utils.events import SHIFT_UPDATED, get_broker
+from utils.lifecycle import CLOSED, EXPIRED, expire_shifts
+from utils.notifications import APPLICATION_EXPIRED, SHIFT_CLOSED, SHIFT_EXPIRED
+
+
+def test_expired_shifts_are_published(app):
+    with app.app_context():
+        hospital = make_hospital(city='Pune')
+        past = make_shift(hospital, days_ahead=-2, specialty='Cardiology')
+        make_shift(hospital, days_ahead=2)
+        subscription = get_broker().subscribe(city='pune')
+
+        assert expire_shifts() == 1
+
+        event = subscription.get(timeout=1)
+        assert event['type'] == SHIFT_UPDATED
+        assert event['data']['id'] == past.id
+        assert (event['data']['status'], event['specialty'], event['city']) == (EXPIRED, 'Cardiology', 'Pune')
+        assert subscription.get(timeout=0.1) is None
+        assert db.session.get(Shift, past.id).status == EXPIRED
+
+
+def overlap_once(monkeypatch, other_pass):
+    """Make the next lifecycle SELECT run `other_pass` (as another worker would) before returning its rows."""
+    select_rows = lifecycle._rows
+
+    def rows_then_overlap(query, batch_size):
+        rows = select_rows(query, batch_size)
+        monkeypatch.setattr(lifecycle, '_rows', select_rows)
+        other_pass()
+        return rows
+
+    monkeypatch.setattr(lifecycle, '_rows', rows_then_overlap)
+
+
+def test_overlapping_passes_notify_once(app, monkeypatch):
+    """Rows another pass changed between this pass's SELECT and UPDATE are not notified or published again."""
+    with app.app_context():
+        hospital = make_hospital()
+        for n in range(3):
+            make_shift(hospital, days_ahead=-1 - n)
+        doctor = make_doctor()
+        shift = make_shift(hospital)
+        db.session.add(ShiftApplication(doctor_id=doctor.id, shift_id=shift.id, status='Pending',
+                                        starts_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.commit()
+        subscription = get_broker().subscribe()
+
+        overlap_once(monkeypatch, lambda: lifecycle.expire_shifts())
+        assert lifecycle.expire_shifts() == 0
+        overlap_once(monkeypatch, lambda: lifecycle.reject_started_applications())
+        assert lifecycle.reject_started_applications() == 0
+
+        assert HospitalOutbox.query.filter_by(kind=SHIFT_EXPIRED).count() == 3
+        assert DoctorOutbox.query.filter_by(kind=APPLICATION_EXPIRED).count() == 1
+        events = [subscription.get(timeout=0.1) for _ in range(4)]
+        assert len([event for event in events if event is not None]) == 3
+
+
+def test_past_shifts_with_bookings_are_closed_not_expired(app):
+    with app.app_context():
+        hospital = make_hospital()
+        unbooked = make_shift(hospital, days_ahead=-1, capacity=2)
+        booked = make_shift(hospital, days_ahead=-1, capacity=2)
+        booked.applications_count = 1  # one accepted booking, one place left
+        db.session.commit()
+
+        assert expire_shifts() == 2
+
+        assert db.session.get(Shift, unbooked.id).status == EXPIRED
+        assert db.session.get(Shift, booked.id).status == CLOSED
+        kinds = dict(HospitalOutbox.query.with_entities(HospitalOutbox.kind, HospitalOutbox.payload))
+        assert set(kinds) == {SHIFT_EXPIRED, SHIFT_CLOSED}
+        assert json.loads(kinds[SHIFT_CLOSED])['booked'] == 1
+
+
+def test_archive_skips_booked_shifts_in_sql_and_archives_their_rejections(app):
+    with app.app_context():
+        hospital = make_hospital()
+        doctors = [make_doctor(f'Dr. Archive {n}') for n in range(2)]
+        unbooked = make_shift(hospital, days_ahead=-200)
+        booked = make_shift(hospital, days_ahead=-200)
+        for shift in (unbooked, booked):
+            shift.status = CLOSED
+        booked.applications_count = 1
+        started = datetime.utcnow() - timedelta(days=200)
+        db.session.add_all([
+            ShiftApplication(doctor_id=doctors[0].id, shift_id=unbooked.id, status='Rejected', starts_at=started),
+            ShiftApplication(doctor_id=doctors[0].id, shift_id=booked.id, status='Accepted', starts_at=started),
+            ShiftApplication(doctor_id=doctors[1].id, shift_id=booked.id, status='Rejected', starts_at=started),
+        ])
+        db.session.commit()
+
+        assert lifecycle.archive_shifts(180) == (1, 2)
+        assert [shift.id for shift in Shift.query] == [booked.id]
+        assert [(a.shift_id, a.status) for a in ShiftApplication.query] == [(booked.id, 'Accepted')]
+
+        statements = []
+
+        def listen(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engines['hospitals'], 'before_cursor_execute', listen)
+        try:
+            assert lifecycle.archive_shifts(180) == (0, 0)
+        finally:
+            event.remove(db.engines['hospitals'], 'before_cursor_execute', listen)
+        # The booked shift is filtered out by the query, not read and skipped.
+        assert len(statements) == 1
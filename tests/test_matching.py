@@ -0,0 +1,48 @@
+# tests/test_matching.py - specialty inference and keeping the candidate index current
+from models import db, DoctorProfile, DoctorUser, ShiftApplication
+from tests.conftest import create_test_app, make_doctor, make_hospital, make_shift
+from utils.matching import get_matching_engine, infer_specialties
+
+
+def test_basic_degrees_only_mean_general_medicine_on_their_own():
+    assert infer_specialties('MBBS') == {'General Medicine'}
+    assert infer_specialties('MBBS, MD (Medicine)') == {'General Medicine'}
+    assert infer_specialties('MBBS, MD Anaesthesia') == {'Anesthesia'}
+    assert infer_specialties('MBBS, DCH') == {'Pediatrics'}
+    assert infer_specialties('MBBS, MD Internal Medicine, DM Cardiology') == {'General Medicine', 'Cardiology'}
+
+
+def test_deleted_doctors_leave_the_index(app):
+    with app.app_context():
+        hospital = make_hospital(city='Pune')
+        shift = make_shift(hospital, specialty='General Medicine')
+        kept, deleted = make_doctor('Dr. Kept'), make_doctor('Dr. Deleted')
+        db.session.add(ShiftApplication(doctor_id=deleted.id, shift_id=shift.id, status='Accepted'))
+        db.session.commit()
+        engine = get_matching_engine()
+        assert deleted.id in engine.doctors and deleted.id in engine.bookings
+
+        ShiftApplication.query.filter_by(doctor_id=deleted.id).delete()
+        db.session.delete(DoctorProfile.query.filter_by(doctor_id=deleted.id).one())
+        db.session.delete(db.session.get(DoctorUser, deleted.id))
+        db.session.commit()
+
+        engine = get_matching_engine()
+        assert deleted.id not in engine.doctors
+        assert deleted.id not in engine.bookings
+        assert [record.id for _, record in engine.candidates_for_shift(shift)] == [kept.id]
+
+
+def test_pending_bookings_belong_to_each_app(app, tmp_path_factory):
+    other = create_test_app(tmp_path_factory.mktemp('other'))
+    with app.app_context():
+        hospital = make_hospital()
+        shift = make_shift(hospital)
+        doctor = make_doctor()
+        engine = get_matching_engine()
+        db.session.add(ShiftApplication(doctor_id=doctor.id, shift_id=shift.id, status='Accepted'))
+        db.session.commit()
+        with other.app_context():
+            get_matching_engine()  # another app's lookup does not consume this app's changes
+        assert get_matching_engine() is engine
+        assert engine.bookings[doctor.id] == {shift.id: shift.shift_date}
@@ -0,0 +1,34 @@
+# tests/test_metrics.py - /metrics and on-demand profiling need the metrics token
+import os
+
+from tests.conftest import create_test_app
+
+TOKEN = 'metrics-secret'
+
+
+def test_metrics_are_refused_without_a_configured_token(app, client):
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 403
+
+
+def test_metrics_need_the_token(tmp_path):
+    client = create_test_app(tmp_path, METRICS_TOKEN=TOKEN).test_client()
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'})
+    assert response.status_code == 200
+    assert b'# TYPE' in response.data
+
+
+def test_profile_header_needs_the_token(tmp_path):
+    profiles = tmp_path / 'profiles'
+    client = create_test_app(tmp_path, METRICS_TOKEN=TOKEN, PROFILER_ENABLED=True,
+                             PROFILE_DIR=str(profiles)).test_client()
+
+    response = client.get('/login', headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    assert 'X-Profile-File' not in response.headers
+    assert not profiles.exists()
+
+    response = client.get('/login', headers={'X-Profile': '1', 'Authorization': f'Bearer {TOKEN}'})
+    assert os.listdir(profiles) == [response.headers['X-Profile-File']]
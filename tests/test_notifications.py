@@ -0,0 +1,28 @@
+# tests/test_notifications.py - file transport output and the shared background worker
+import os
+import threading
+
+from models import db, HospitalOutbox
+from tests.conftest import make_hospital
+from utils.background import run_periodically
+from utils.notifications import HOSPITAL, SHIFT_EXPIRED, get_dispatcher, notify
+
+
+def test_mail_directory_is_created_on_first_message(app):
+    mail_dir = app.config['NOTIFICATION_FILE_DIR']
+    assert not os.path.exists(mail_dir)
+    with app.app_context():
+        hospital = make_hospital()
+        notify(HospitalOutbox, HOSPITAL, hospital.id, SHIFT_EXPIRED, shift_id=1, shift_title='Night cover',
+               shift_date='2026-01-01')
+        db.session.commit()
+        assert get_dispatcher().drain(wait=False) == 1
+    assert len(os.listdir(mail_dir)) == 1
+
+
+def test_periodic_job_starts_with_the_first_request(app, client):
+    ran = threading.Event()
+    run_periodically(app, 'test-job', 60, ran.set)
+    assert not ran.wait(0.1)
+    client.get('/login')
+    assert ran.wait(2)
@@ -0,0 +1,83 @@
+# tests/test_query_budgets.py - the budgeted views stay within QUERY_BUDGETS as the data grows
+#
+# Each view is requested with several hospitals, shifts and applicants, so an
+# N+1 (one query per row) would blow the budget. Under TESTING an overrun
+# raises QueryBudgetExceeded from the request itself.
+import pytest
+
+from models import db, HospitalUser, ShiftApplication
+from tests.conftest import login, make_doctor, make_hospital, make_shift
+
+ROWS = 4
+
+
+@pytest.fixture
+def data(app):
+    """Hospitals with two shifts each, every doctor applied to every shift; returns their login ids."""
+    with app.app_context():
+        hospitals = [make_hospital(f'Hospital {n}', city='Pune') for n in range(ROWS)]
+        doctors = [make_doctor(f'Dr. Doctor {n}') for n in range(ROWS)]
+        shifts = [make_shift(hospital, days_ahead=n + 1, title=f'Shift {n}')
+                  for n, hospital in enumerate(hospitals) for _ in range(2)]
+        for shift in shifts:
+            for doctor in doctors:
+                db.session.add(ShiftApplication(doctor_id=doctor.id, shift_id=shift.id, status='Pending',
+                                                payment_amount=shift.pay_rate))
+        db.session.commit()
+        # A few accepted bookings per doctor for the earnings pages.
+        for doctor in doctors:
+            for application in ShiftApplication.query.filter_by(doctor_id=doctor.id).limit(3):
+                application.status = 'Accepted'
+            db.session.commit()
+        return [hospital.get_id() for hospital in hospitals], [doctor.get_id() for doctor in doctors]
+
+
+def within_budget(app, response, endpoint):
+    assert response.status_code == 200, response.data[:500]
+    count = int(response.headers['X-Query-Count'])
+    assert count <= app.config['QUERY_BUDGETS'][endpoint], f'{endpoint} ran {count} queries'
+    return count
+
+
+@pytest.mark.parametrize('path, endpoint', [
+    ('/doctor/jobs', 'doctor.doctor_jobs'),
+    ('/doctor/history', 'doctor.doctor_history'),
+    ('/doctor/payment', 'doctor.doctor_payment'),
+    ('/api/v1/shifts?fields=id,hospital_name,city,title', 'api.shifts'),
+    ('/api/v1/applications?fields=id,doctor_name,shift&shift_fields=hospital_name', 'api.applications'),
+    ('/api/v1/me', 'api.me'),
+])
+def test_doctor_views_within_budget(app, client, data, path, endpoint):
+    hospitals, doctors = data
+    login(client, doctors[0])
+    within_budget(app, client.get(path), endpoint)
+
+
+@pytest.mark.parametrize('path, endpoint', [
+    ('/hospital/applications', 'hospital.hospital_applications'),
+    ('/hospital/payments', 'hospital.hospital_payments'),
+    ('/api/v1/applications?fields=id,doctor_name,status', 'api.applications'),
+    ('/api/v1/me', 'api.me'),
+])
+def test_hospital_views_within_budget(app, client, data, path, endpoint):
+    hospitals, doctors = data
+    login(client, hospitals[0])
+    within_budget(app, client.get(path), endpoint)
+
+
+def test_applicants_do_not_scale_queries(app, client, data):
+    """More shifts and applicants on the page cost no extra queries."""
+    hospitals, doctors = data
+    login(client, hospitals[0])
+    before = within_budget(app, client.get('/hospital/applications'), 'hospital.hospital_applications')
+
+    with app.app_context():
+        hospital = db.session.get(HospitalUser, int(hospitals[0].split('_')[1]))
+        for n in range(ROWS):
+            shift = make_shift(hospital, days_ahead=9, title=f'Extra {n}')
+            for doctor in [make_doctor(f'Dr. Extra {n} {m}') for m in range(ROWS)]:
+                db.session.add(ShiftApplication(doctor_id=doctor.id, shift_id=shift.id, status='Pending'))
+        db.session.commit()
+
+    after = within_budget(app, client.get('/hospital/applications'), 'hospital.hospital_applications')
+    assert after <= before
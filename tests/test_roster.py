@@ -0,0 +1,138 @@
+# tests/test_roster.py - importing rosters: row validation and booking assigned doctors
+import io
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import OperationalError
+from werkzeug.datastructures import FileStorage
+
+from models import db, Shift, ShiftApplication
+from tests.conftest import make_doctor, make_hospital
+from utils.roster import RosterImport, parse_shift_row, read_rows
+from utils.scheduling import get_scheduler, interval_for
+
+DAY = (date.today() + timedelta(days=5)).isoformat()
+
+
+def roster_row(**values):
+    return {'title': 'Night cover', 'specialty': 'Surgery', 'shift_date': DAY, 'start_time': '20:00',
+            'end_time': '08:00', 'pay_rate': '4000', **values}
+
+
+def test_assigned_doctor_booked_by_another_worker_is_rejected(app):
+    with app.app_context():
+        hospital = make_hospital()
+        doctor = make_doctor()
+        get_scheduler()  # built now, so it never sees the booking below
+        starts_at, ends_at = interval_for(parse_shift_row(roster_row())[0])
+        # Committed by another process: the scheduler listeners here never see it.
+        with db.engines['doctors'].begin() as conn:
+            conn.execute(insert(ShiftApplication.__table__).values(
+                doctor_id=doctor.id, shift_id=999, status='Accepted', starts_at=starts_at, ends_at=ends_at))
+
+        report = RosterImport(hospital.id).run([roster_row(doctor_id=doctor.id)])
+
+        assert report['created'] == 0
+        assert report['errors'] == [{'row': 1, 'errors': [f"doctor {doctor.id} is already booked for an "
+                                                          "overlapping shift"]}]
+        assert Shift.query.count() == 0
+
+
+def test_failed_bookings_remove_their_shifts_so_a_reimport_is_safe(app):
+    with app.app_context():
+        hospital = make_hospital()
+        doctor = make_doctor()
+        rows = [roster_row(title='Unassigned'), roster_row(title='Assigned', doctor_id=doctor.id)]
+
+        def locked(conn, cursor, statement, *args):
+            if statement.startswith('INSERT INTO shift_applications'):
+                raise OperationalError(statement, {}, Exception('database is locked'))
+
+        event.listen(db.engines['doctors'], 'before_cursor_execute', locked)
+        try:
+            report = RosterImport(hospital.id).run(rows)
+        finally:
+            event.remove(db.engines['doctors'], 'before_cursor_execute', locked)
+
+        assert report['created'] == 1
+        assert report['errors'] == [{'row': 2, 'errors': [f"could not book doctor {doctor.id}: database is locked"]}]
+        assert [shift.title for shift in Shift.query] == ['Unassigned']
+
+        report = RosterImport(hospital.id).run(rows[1:])
+        assert (report['created'], report['failed']) == (1, 0)
+        assert sorted(shift.title for shift in Shift.query) == ['Assigned', 'Unassigned']
+        assert ShiftApplication.query.filter_by(doctor_id=doctor.id, status='Accepted').count() == 1
+
+
+def upload(name, text):
+    return FileStorage(io.BytesIO(text.encode()), filename=name)
+
+
+def test_malformed_rows_are_reported_and_valid_rows_created(app):
+    rows = [
+        roster_row(),
+        roster_row(title='', specialty='Astrology'),
+        roster_row(shift_date='05/01/2030', start_time='8pm', pay_rate='-5'),
+        roster_row(capacity='0', pay_type='Weekly', doctor_id='abc'),
+        'not an object',
+    ]
+    with app.app_context():
+        report = RosterImport(make_hospital().id).run(rows)
+
+        assert (report['created'], report['failed']) == (1, 4)
+        errors = {error['row']: error['errors'] for error in report['errors']}
+        assert errors[2][0] == 'title is required' and errors[2][1].startswith('specialty must be one of')
+        assert errors[3] == ['shift_date must look like YYYY-MM-DD', 'start_time must look like HH:MM',
+                             'pay_rate must be a positive number']
+        assert errors[4] == ['pay_type must be one of: Fixed, Hourly',
+                             'capacity must be a whole number of at least 1', 'doctor_id must be a whole number']
+        assert errors[5] == ['row must be an object']
+        shift = Shift.query.one()
+        assert (shift.status, shift.duration_hours, shift.applications_count) == ('Open', 12, 0)
+
+
+def test_csv_and_json_lines_uploads(app):
+    csv_file = upload('roster.csv', 'title,specialty,shift_date,start_time,end_time,pay_rate\n'
+                                    f'Day,Surgery,{DAY},09:00,17:00,3000\n'
+                                    f'Bad,Surgery,{DAY},9 am,17:00,3000\n')
+    jsonl_file = upload('roster.jsonl', json.dumps(roster_row()) + '\n{"title": \n\n' + json.dumps(roster_row()))
+    with app.app_context():
+        hospital = make_hospital()
+        report = RosterImport(hospital.id).run(read_rows(csv_file))
+        assert (report['created'], [error['row'] for error in report['errors']]) == (1, [2])
+
+        report = RosterImport(hospital.id).run(read_rows(jsonl_file))
+        assert report['created'] == 2
+        assert report['errors'][0]['row'] == 2 and report['errors'][0]['errors'][0].startswith('invalid JSON')
+
+
+def test_duplicate_and_overlapping_assignments(app):
+    with app.app_context():
+        hospital = make_hospital()
+        doctor, other = make_doctor('Dr. Roster'), make_doctor('Dr. Other')
+        rows = [
+            roster_row(doctor_id=doctor.id, capacity='1'),
+            roster_row(doctor_id=doctor.id),                    # the same booking again
+            roster_row(doctor_id=doctor.id, start_time='23:00', end_time='03:00'),  # overlaps row 1
+            roster_row(doctor_id=other.id),                     # a different doctor at the same time
+            roster_row(doctor_id=12345),
+        ]
+        report = RosterImport(hospital.id, batch_size=2).run(rows)
+
+        assert report['created'] == 2
+        assert report['errors'] == [
+            {'row': 2, 'errors': [f"doctor {doctor.id} is also booked on overlapping row 1"]},
+            {'row': 3, 'errors': [f"doctor {doctor.id} is already booked for an overlapping shift"]},
+            {'row': 5, 'errors': ["doctor 12345 does not exist"]},
+        ]
+        bookings = {application.doctor_id: application for application in ShiftApplication.query}
+        assert set(bookings) == {doctor.id, other.id}
+        assert all(application.status == 'Accepted' for application in bookings.values())
+        assert db.session.get(Shift, bookings[doctor.id].shift_id).status == 'Filled'
+        assert db.session.get(Shift, bookings[other.id].shift_id).status == 'Open'
+
+        # Rows of a later import are checked against the bookings just made.
+        report = RosterImport(hospital.id).run([roster_row(doctor_id=other.id, start_time='21:00')])
+        assert report['errors'] == [{'row': 1, 'errors': [f"doctor {other.id} is already booked for an "
+                                                          "overlapping shift"]}]
@@ -0,0 +1,72 @@
+# tests/test_schema.py - an out-of-date database is refused until `flask upgrade-db` runs, and the upgrade never
+# records a version it did not reach
+from sqlalchemy import text
+
+from models import db, ShiftApplication
+from tests.conftest import create_test_app, make_doctor, make_hospital, make_shift
+from utils.applications import DUPLICATE, apply_to_shift
+from utils.schema import outdated_binds
+
+
+def test_outdated_schema_is_served_as_503_until_upgraded(tmp_path):
+    app = create_test_app(tmp_path, SCHEMA_AUTO_UPGRADE=False)
+    client = app.test_client()
+
+    response = client.get('/login')
+    assert response.status_code == 503
+    assert b'flask upgrade-db' in response.data
+    assert app.extensions['fulltext'] is False
+
+    # As if run from a shell: another app instance on the same databases.
+    result = create_test_app(tmp_path, SCHEMA_AUTO_UPGRADE=False).test_cli_runner().invoke(args=['upgrade-db'])
+    assert result.exit_code == 0, result.output
+    assert app.extensions['fulltext'] is False
+
+    assert client.get('/login').status_code == 200
+    assert app.extensions['fulltext'] is True
+    assert app.extensions['geo_rtree'] is True
+
+
+def test_upgrade_removes_duplicate_applications_before_the_unique_index(tmp_path):
+    app = create_test_app(tmp_path)
+    with app.app_context():
+        shift = make_shift(make_hospital())
+        doctor = make_doctor()
+        shift_id, doctor_id = shift.id, doctor.id
+        # A legacy doctors.db: no unique index, the same pair applied twice.
+        engine = db.engines['doctors']
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX uq_shift_applications_doctor_shift"))
+            conn.execute(text("DELETE FROM schema_version"))
+            for status in ('Pending', 'Accepted', 'Pending'):
+                conn.execute(text("INSERT INTO shift_applications (doctor_id, shift_id, status) "
+                                  "VALUES (:doctor_id, :shift_id, :status)"),
+                             {'doctor_id': doctor_id, 'shift_id': shift_id, 'status': status})
+        assert outdated_binds() == ['doctors']
+
+    result = create_test_app(tmp_path, SCHEMA_AUTO_UPGRADE=False).test_cli_runner().invoke(args=['upgrade-db'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        assert outdated_binds() == []
+        statuses = [status for status, in db.session.query(ShiftApplication.status).filter_by(shift_id=shift_id)]
+        assert statuses == ['Accepted']
+        assert apply_to_shift(doctor_id, shift_id) == DUPLICATE
+        assert ShiftApplication.query.filter_by(shift_id=shift_id).count() == 1
+
+
+def test_upgrade_fails_without_recording_the_version_when_an_index_cannot_be_built(tmp_path):
+    app = create_test_app(tmp_path)
+    with app.app_context():
+        with db.engines['doctors'].begin() as conn:
+            conn.execute(text("DROP INDEX uq_doctor_monthly_earnings"))
+            conn.execute(text("DELETE FROM schema_version"))
+            for _ in range(2):
+                conn.execute(text("INSERT INTO doctor_monthly_earnings (doctor_id, month, shifts, earned, paid) "
+                                  "VALUES (1, '2025-01-01', 1, 100, 0)"))
+
+    result = create_test_app(tmp_path, SCHEMA_AUTO_UPGRADE=False).test_cli_runner().invoke(args=['upgrade-db'])
+    assert result.exit_code != 0
+    assert 'uq_doctor_monthly_earnings' in result.output
+    with app.app_context():
+        assert outdated_binds() == ['doctors']
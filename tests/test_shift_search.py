@@ -0,0 +1,109 @@
+# tests/test_shift_search.py - keyset pagination of the job search walks every shift once, in order
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from models import db
+from tests.conftest import make_hospital, make_shift
+from utils.shift_search import ShiftSearch, decode_cursor, encode_cursor
+
+PAGE_SIZE = 2
+
+
+def walk(app, **args):
+    """Ids of every shift the search lists, following next cursors page by page."""
+    ids = []
+    cursor = None
+    with app.test_request_context():
+        while True:
+            query = MultiDict({**args, 'page_size': PAGE_SIZE, **({'cursor': cursor} if cursor else {})})
+            shifts, cursor = ShiftSearch.from_args(query).page()
+            assert len(shifts) <= PAGE_SIZE
+            ids.extend(shift.id for shift in shifts)
+            if cursor is None:
+                return ids
+
+
+@pytest.fixture
+def shifts(app):
+    """Seven open shifts with tied and missing pay rates; returns {name: shift values}."""
+    with app.app_context():
+        hospital = make_hospital()
+        specs = {
+            'a': dict(days_ahead=3, pay_rate=5000, title='Cardiac night cover'),
+            'b': dict(days_ahead=1, pay_rate=None, title='Ward round'),
+            'c': dict(days_ahead=2, pay_rate=5000, title='Cardiac day cover'),
+            'd': dict(days_ahead=2, pay_rate=7000, title='Emergency'),
+            'e': dict(days_ahead=5, pay_rate=None, title='Cardiac clinic'),
+            'f': dict(days_ahead=4, pay_rate=3000, title='Clinic'),
+            'g': dict(days_ahead=1, pay_rate=None, title='Night cover'),
+        }
+        created = {}
+        for n, (name, values) in enumerate(specs.items()):
+            shift = make_shift(hospital, **values)
+            shift.posted_at = datetime(2030, 1, 1) + timedelta(hours=n % 3)  # ties on posted_at too
+            created[name] = shift
+        db.session.commit()
+        return {name: (shift.id, shift.shift_date, shift.pay_rate, shift.posted_at) for name, shift in created.items()}
+
+
+def expected(shifts, key, descending):
+    """Ids ordered by (key, id) in the given direction, shifts without a key value last by id."""
+    present = sorted((values for values in shifts.values() if key(values) is not None),
+                     key=lambda values: (key(values), values[0]), reverse=descending)
+    missing = sorted((values for values in shifts.values() if key(values) is None),
+                     key=lambda values: values[0], reverse=descending)
+    return [values[0] for values in present + missing]
+
+
+@pytest.mark.parametrize('sort, key, descending', [
+    ('date', lambda values: values[1], False),
+    ('pay', lambda values: values[2], True),
+    ('newest', lambda values: values[3], True),
+])
+def test_every_sort_lists_each_shift_once_in_order(app, shifts, sort, key, descending):
+    assert walk(app, sort=sort) == expected(shifts, key, descending)
+
+
+def test_pay_sort_keeps_shifts_without_a_pay_rate(app, shifts):
+    ids = walk(app, sort='pay')
+    assert len(ids) == len(shifts)
+    assert ids[-3:] == sorted([shifts[name][0] for name in 'beg'], reverse=True)
+
+
+def test_relevance_walks_text_matches(app, shifts):
+    ids = walk(app, q='cardiac', sort='relevance')
+    assert sorted(ids) == sorted(shifts[name][0] for name in 'ace')
+
+
+def test_distance_walks_nearest_hospitals_first(app):
+    with app.app_context():
+        ids = []
+        for name, pincode in (('Noida', '201301'), ('Delhi', '110001'), ('Gurugram', '122001')):
+            hospital = make_hospital(f'{name} Hospital', city=name, pincode=pincode)
+            ids.append([make_shift(hospital, days_ahead=n + 1).id for n in range(2)])
+    listed = walk(app, near='110001', radius='50', sort='distance')
+    assert listed == ids[1] + ids[0] + ids[2]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'{"not": "a list"}').decode(),
+    base64.urlsafe_b64encode(b'["2030-01-01"]').decode(),
+    encode_cursor('yesterday', 1),
+    encode_cursor('2030-01-01', 'x'),
+])
+def test_malformed_cursors_restart_from_the_first_page(app, shifts, cursor):
+    assert decode_cursor(cursor, 'date') is None
+    with app.test_request_context():
+        first, _ = ShiftSearch.from_args(MultiDict({'sort': 'date', 'page_size': PAGE_SIZE})).page()
+        page, _ = ShiftSearch.from_args(MultiDict({'sort': 'date', 'page_size': PAGE_SIZE, 'cursor': cursor})).page()
+    assert [shift.id for shift in page] == [shift.id for shift in first]
+
+
+def test_null_cursors_only_for_sorts_with_a_null_tail():
+    assert decode_cursor(encode_cursor(None, 4), 'pay') == (None, 4)
+    assert decode_cursor(encode_cursor(None, 4), 'distance') is None
+    assert decode_cursor(encode_cursor('abc', 4), 'pay') is None
@@ -0,0 +1,90 @@
+# tests/test_uploads.py - the upload pipeline: placeholders while pending, spool files cleaned up
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from models import db, DoctorDocument
+from tests.conftest import make_doctor
+from utils.uploads import get_pipeline
+
+
+def upload(name='licence.pdf'):
+    return FileStorage(io.BytesIO(b'%PDF-1.4 test'), filename=name)
+
+
+def spooled(app):
+    directory = app.config['UPLOAD_SPOOL_DIR']
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+
+class FlakyStorage:
+    def __init__(self, failures):
+        self.failures = failures
+        self.pending_paths = []
+
+    def save(self, path):
+        document = DoctorDocument.query.one()
+        self.pending_paths.append((document.status, document.file_path))
+        if self.failures:
+            self.failures -= 1
+            raise OSError('storage unavailable')
+        return 'https://storage.test/licence.pdf'
+
+
+@pytest.fixture
+def pipeline(app):
+    with app.app_context():
+        pipeline = get_pipeline()
+        pipeline.retry_delay = 0
+        yield pipeline
+
+
+def test_pending_row_holds_no_server_path_and_the_spool_file_goes_after_upload(app, pipeline):
+    pipeline.storage = storage = FlakyStorage(failures=1)
+    document = pipeline.accept(DoctorDocument, 'doctor_id', make_doctor().id, 'Licence', upload())
+
+    assert storage.pending_paths == [('Pending', None), ('Pending', None)]
+    db.session.expire_all()  # the transfer ran in its own app context and session
+    document = db.session.get(DoctorDocument, document.id)
+    assert (document.status, document.file_path) == ('Uploaded', 'https://storage.test/licence.pdf')
+    assert spooled(app) == []
+
+
+def test_failed_upload_removes_its_spool_file(app, pipeline):
+    pipeline.storage = FlakyStorage(failures=pipeline.max_retries + 1)
+    document = pipeline.accept(DoctorDocument, 'doctor_id', make_doctor().id, 'Licence', upload())
+
+    db.session.expire_all()  # the transfer ran in its own app context and session
+    document = db.session.get(DoctorDocument, document.id)
+    assert (document.status, document.file_path) == ('Failed', None)
+    assert spooled(app) == []
+
+
+def test_a_spool_failure_leaves_no_row(app, pipeline, monkeypatch):
+    doctor_id = make_doctor().id
+
+    def disk_full(path):
+        raise OSError('No space left on device')
+
+    file = upload()
+    monkeypatch.setattr(file, 'save', disk_full)
+    with pytest.raises(OSError):
+        pipeline.accept(DoctorDocument, 'doctor_id', doctor_id, 'Licence', file)
+    assert DoctorDocument.query.count() == 0
+
+
+def test_resume_requeues_pending_rows_from_their_spool_files(app, pipeline):
+    pipeline.storage = FlakyStorage(failures=0)
+    document = DoctorDocument(doctor_id=make_doctor().id, document_type='Licence', status='Pending')
+    db.session.add(document)
+    db.session.commit()
+    pipeline.spool(upload(), DoctorDocument, document.id)
+    os.makedirs(pipeline.spool_dir, exist_ok=True)
+    open(os.path.join(pipeline.spool_dir, 'stray-file'), 'w').close()
+
+    assert pipeline.resume(DoctorDocument) == 1
+    db.session.expire_all()
+    assert db.session.get(DoctorDocument, document.id).status == 'Uploaded'
+    assert spooled(app) == ['stray-file']
@@ -0,0 +1,36 @@
+# tests/test_upsert.py - the shared INSERT helpers, with and without ON CONFLICT support
+from datetime import date
+
+import pytest
+
+from models import db, DoctorMonthlyEarnings, ShiftApplication
+from utils import upsert as upserts
+from utils.upsert import insert_ignore, upsert
+
+
+@pytest.fixture(params=['on_conflict', 'fallback'])
+def dialect(request, monkeypatch):
+    if request.param == 'fallback':
+        monkeypatch.setattr(upserts, 'dialect_insert', lambda session, model: None)
+    return request.param
+
+
+def test_upsert_adds_to_the_existing_row(app, dialect):
+    month = date(2026, 1, 1)
+    with app.app_context():
+        for earned in (100, 250):
+            upsert(db.session, DoctorMonthlyEarnings,
+                   {'doctor_id': 7, 'month': month, 'shifts': 1, 'earned': earned, 'paid': 0},
+                   keys=('doctor_id', 'month'), add=('shifts', 'earned', 'paid'))
+        db.session.commit()
+        row = DoctorMonthlyEarnings.query.filter_by(doctor_id=7, month=month).one()
+        assert (row.shifts, row.earned, row.paid) == (2, 350, 0)
+
+
+def test_insert_ignore_skips_duplicates(app, dialect):
+    with app.app_context():
+        values = {'doctor_id': 3, 'shift_id': 5, 'status': 'Pending'}
+        assert insert_ignore(db.session, ShiftApplication, values) is True
+        assert insert_ignore(db.session, ShiftApplication, values) is False
+        db.session.commit()
+        assert ShiftApplication.query.filter_by(doctor_id=3, shift_id=5).count() == 1
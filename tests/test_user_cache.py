@@ -0,0 +1,77 @@
+# tests/test_user_cache.py - signed-in users come from the cache until their row changes
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from models import db, DoctorUser
+from tests.conftest import login, make_doctor
+
+
+@contextmanager
+def doctor_queries(app):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engines['doctors']
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def me(client):
+    return client.get('/api/v1/me').get_json()
+
+
+def test_cached_user_skips_the_query_but_keeps_relationships(app, client):
+    with app.app_context():
+        doctor_id = make_doctor().id
+    login(client, f'doctor_{doctor_id}')
+
+    assert me(client)['full_name'] == 'Dr. Test'
+    with doctor_queries(app) as statements:
+        assert me(client)['full_name'] == 'Dr. Test'
+    assert statements == []
+    assert app.extensions['user_cache'].stats()['hits'] == 1
+
+    response = client.get('/doctor/profile')  # lazy-loads current_user.profile
+    assert response.status_code == 200 and b'9999999999' in response.data
+
+
+def test_updates_and_deletes_invalidate(app, client):
+    with app.app_context():
+        doctor_id = make_doctor().id
+    login(client, f'doctor_{doctor_id}')
+    me(client)
+
+    with app.app_context():
+        db.session.get(DoctorUser, doctor_id).full_name = 'Dr. Renamed'
+        db.session.commit()
+    assert me(client)['full_name'] == 'Dr. Renamed'
+    assert app.extensions['user_cache'].stats()['invalidations'] == 1
+
+    with app.app_context():
+        db.session.delete(db.session.get(DoctorUser, doctor_id))
+        db.session.commit()
+    assert client.get('/api/v1/me').status_code == 401
+
+
+def test_entries_expire(app, client, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('utils.user_cache.time.monotonic', lambda: clock[0])
+    with app.app_context():
+        doctor_id = make_doctor().id
+    login(client, f'doctor_{doctor_id}')
+    me(client)
+
+    with app.app_context():
+        # Bulk statements skip the ORM events, as would a change made by another worker.
+        db.session.query(DoctorUser).filter_by(id=doctor_id).update({'full_name': 'Dr. Elsewhere'})
+        db.session.commit()
+    assert me(client)['full_name'] == 'Dr. Test'
+    clock[0] += app.config['USER_CACHE_TTL'] + 1
+    assert me(client)['full_name'] == 'Dr. Elsewhere'
@@ -0,0 +1,335 @@
+# utils/applications.py
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.orm import joinedload
+
+from models import db, DoctorOutbox, DoctorUser, Shift, ShiftApplication
+from utils.notifications import (APPLICATION_ACCEPTED, APPLICATION_REJECTED, DOCTOR, HOSPITAL, NEW_APPLICANT,
+                                 notify)
+from utils.batching import CHUNK_SIZE, chunked
+from utils.scheduling import get_scheduler, interval_for
+from utils.upsert import insert_ignore
+
+# ShiftApplication (doctors.db) and Shift (hospitals.db) live on different
+# binds, so they cannot be joined in SQL. Everything here resolves one side
+# in bulk with `IN` queries, chunked to stay under SQLite's bound-parameter
+# limit, and stitches the rows together in Python.
+
+APPLIED = 'applied'
+DECIDED = 'decided'
+DUPLICATE = 'duplicate'
+CLOSED = 'closed'
+NOT_FOUND = 'not_found'
+CONFLICT = 'conflict'
+NOT_PENDING = 'not_pending'
+
+APPLY_MESSAGES = {
+    DUPLICATE: 'Already applied',
+    CONFLICT: 'You are already booked for a shift at that time',
+    CLOSED: 'This shift is no longer accepting applications',
+    NOT_FOUND: 'Shift not found',
+}
+
+DECISION_MESSAGES = {
+    CONFLICT: 'This doctor is already booked for an overlapping shift.',
+    CLOSED: 'This shift already has all the doctors it needs.',
+    NOT_PENDING: 'This application has already been decided.',
+}
+
+# How far an application got, most advanced first; keeps the right row when
+# duplicates are removed.
+STATUS_PROGRESS = ('Accepted', 'Rejected', 'Pending')
+
+
+class ApplicationRow:
+    __slots__ = ('application', 'shift', 'doctor', 'conflicts')
+
+    def __init__(self, application, shift=None, doctor=None):
+        self.application = application
+        self.shift = shift
+        self.doctor = doctor
+        self.conflicts = ()
+
+
+class ShiftApplicants:
+    __slots__ = ('shift', 'rows')
+
+    def __init__(self, shift, rows):
+        self.shift = shift
+        self.rows = rows
+
+    @property
+    def count(self):
+        return len(self.rows)
+
+    @property
+    def pending_count(self):
+        return sum(1 for row in self.rows if row.application.status == 'Pending')
+
+
+def load_shifts(shift_ids):
+    """Return {shift_id: Shift} with each shift's hospital loaded in the same query."""
+    shifts = {}
+    for chunk in chunked({shift_id for shift_id in shift_ids if shift_id is not None}):
+        query = Shift.query.options(joinedload(Shift.hospital)).filter(Shift.id.in_(chunk))
+        shifts.update((shift.id, shift) for shift in query)
+    return shifts
+
+
+def history_rows(doctor_id):
+    """A doctor's applications, newest first, each paired with its shift and hospital."""
+    applications = (
+        ShiftApplication.query
+        .filter_by(doctor_id=doctor_id)
+        .order_by(ShiftApplication.applied_at.desc(), ShiftApplication.id.desc())
+        .all()
+    )
+    shifts = load_shifts(application.shift_id for application in applications)
+    return [ApplicationRow(application, shift=shifts.get(application.shift_id)) for application in applications]
+
+
+def applicants_by_shift(shifts):
+    """Group the applications for `shifts` under each shift, with applicant and profile loaded."""
+    by_shift = {shift.id: [] for shift in shifts}
+    for chunk in chunked(by_shift):
+        query = (
+            ShiftApplication.query
+            .options(joinedload(ShiftApplication.doctor).selectinload(DoctorUser.profile))
+            .filter(ShiftApplication.shift_id.in_(chunk))
+            .order_by(ShiftApplication.applied_at.asc(), ShiftApplication.id.asc())
+        )
+        for application in query:
+            by_shift[application.shift_id].append(ApplicationRow(application, doctor=application.doctor))
+    return [ShiftApplicants(shift, by_shift[shift.id]) for shift in shifts]
+
+
+def flag_conflicts(entries):
+    """Mark pending applicants who are already booked elsewhere at the time of the shift."""
+    scheduler = get_scheduler()
+    for entry in entries:
+        for row in entry.rows:
+            application = row.application
+            if application.status == 'Pending' and application.starts_at is not None:
+                row.conflicts = scheduler.conflicts(application.doctor_id, application.starts_at,
+                                                    application.ends_at, exclude=application.shift_id)
+    return entries
+
+
+def applicant_counts(shift_ids, status=None):
+    """Return {shift_id: number of applications} using one grouped query per chunk."""
+    counts = {}
+    for chunk in chunked(shift_ids):
+        query = (
+            db.session.query(ShiftApplication.shift_id, func.count(ShiftApplication.id))
+            .filter(ShiftApplication.shift_id.in_(chunk))
+        )
+        if status:
+            query = query.filter(ShiftApplication.status == status)
+        counts.update(query.group_by(ShiftApplication.shift_id))
+    return counts
+
+
+def apply_to_shift(doctor_id, shift_id):
+    """Apply a doctor to an Open shift without check-then-insert races.
+
+    The unique (doctor_id, shift_id) index turns a concurrent double click
+    into a no-op instead of a duplicate row. Applying does not take a place
+    on the shift: capacity counts accepted bookings, claimed by
+    `decide_application`, so a shift stays Open for applicants until the
+    hospital has accepted enough of them. A doctor already accepted for an
+    overlapping shift is turned away. The hospital's new-applicant
+    notification goes in the doctors.db outbox, so it is committed in the
+    same transaction as the application.
+    Returns APPLIED, DUPLICATE, CLOSED, CONFLICT or NOT_FOUND.
+    """
+    shift = db.session.get(Shift, shift_id)
+    if shift is None:
+        return NOT_FOUND
+    if shift.status != 'Open':
+        return CLOSED
+    starts_at, ends_at = interval_for(shift) or (None, None)
+    if starts_at is not None and get_scheduler().conflicts(doctor_id, starts_at, ends_at, exclude=shift_id):
+        return CONFLICT
+
+    if not insert_ignore(db.session, ShiftApplication, {'doctor_id': doctor_id, 'shift_id': shift_id,
+                                                        'status': 'Pending', 'starts_at': starts_at, 'ends_at': ends_at}):
+        db.session.rollback()
+        return DUPLICATE
+    doctor = db.session.get(DoctorUser, doctor_id)
+    notify(DoctorOutbox, HOSPITAL, shift.hospital_id, NEW_APPLICANT,
+           doctor_name=doctor.full_name if doctor else None,
+           shift_id=shift_id, shift_title=shift.title, shift_date=shift.shift_date)
+    db.session.commit()
+    return APPLIED
+
+
+def claim_booking(shift_id):
+    """Take one place on the shift for an accepted booking; returns False if it is no longer Open or is full.
+
+    One conditional UPDATE checks and increments applications_count, and
+    flips the shift to Filled when the last place goes, so concurrent
+    acceptances are serialised by the database and a shift can never be
+    over-booked.
+    """
+    return db.session.execute(
+        update(Shift)
+        .where(
+            Shift.id == shift_id,
+            Shift.status == 'Open',
+            or_(Shift.capacity.is_(None), func.coalesce(Shift.applications_count, 0) < Shift.capacity),
+        )
+        .values(
+            applications_count=func.coalesce(Shift.applications_count, 0) + 1,
+            status=case(
+                (and_(Shift.capacity.isnot(None), func.coalesce(Shift.applications_count, 0) + 1 >= Shift.capacity),
+                 'Filled'),
+                else_=Shift.status,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def booked_overlaps(doctor_id, starts_at, ends_at, exclude_application_id=None):
+    """Shift ids of the doctor's accepted applications overlapping [starts_at, ends_at), from the database."""
+    query = (
+        db.session.query(ShiftApplication.shift_id)
+        .filter(
+            ShiftApplication.doctor_id == doctor_id,
+            ShiftApplication.status == 'Accepted',
+            ShiftApplication.starts_at < ends_at,
+            ShiftApplication.ends_at > starts_at,
+        )
+    )
+    if exclude_application_id is not None:
+        query = query.filter(ShiftApplication.id != exclude_application_id)
+    return [shift_id for shift_id, in query]
+
+
+def booked_overlaps_batch(bookings):
+    """Check (doctor_id, starts_at, ends_at, key) bookings against accepted applications in the database.
+
+    The batch form of `booked_overlaps`: one query per chunk of doctors,
+    bounded by the bookings' overall time span. Returns {key: [shift ids]}
+    for the bookings that overlap one.
+    """
+    if not bookings:
+        return {}
+    by_doctor = {}
+    for booking in bookings:
+        by_doctor.setdefault(booking[0], []).append(booking)
+    first = min(starts_at for _, starts_at, _, _ in bookings)
+    last = max(ends_at for _, _, ends_at, _ in bookings)
+    overlaps = {}
+    for chunk in chunked(by_doctor):
+        query = (
+            db.session.query(ShiftApplication.doctor_id, ShiftApplication.shift_id,
+                             ShiftApplication.starts_at, ShiftApplication.ends_at)
+            .filter(
+                ShiftApplication.doctor_id.in_(chunk),
+                ShiftApplication.status == 'Accepted',
+                ShiftApplication.starts_at < last,
+                ShiftApplication.ends_at > first,
+            )
+        )
+        for doctor_id, shift_id, booked_start, booked_end in query:
+            for _, starts_at, ends_at, key in by_doctor[doctor_id]:
+                if booked_start < ends_at and booked_end > starts_at:
+                    overlaps.setdefault(key, []).append(shift_id)
+    return overlaps
+
+
+def decide_application(application, shift, status):
+    """Move a Pending application to Accepted or Rejected; returns DECIDED, NOT_PENDING, CONFLICT or CLOSED.
+
+    Only Pending applications can be decided, so a repeated or concurrent
+    decision is refused (NOT_PENDING) instead of flipping the outcome and
+    notifying the doctor again. A conditional UPDATE takes the application
+    first, so of two racing decisions only one gets past it.
+
+    Accepting checks the doctor's other bookings in the in-process index,
+    then again in SQL under the write lock taken above, so an acceptance
+    committed by another worker is also caught (CONFLICT). Finally a place
+    is claimed on the shift (CLOSED when it is already full). Rejecting
+    gives nothing back: a Pending application holds no place. The doctor's
+    notification is committed with the new status.
+    """
+    if application.status != 'Pending':
+        return NOT_PENDING
+    taken = db.session.execute(
+        update(ShiftApplication)
+        .where(ShiftApplication.id == application.id, ShiftApplication.status == 'Pending')
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    if not taken:
+        db.session.rollback()
+        return NOT_PENDING
+
+    if status == 'Accepted':
+        interval = interval_for(shift)
+        if interval is not None:
+            application.starts_at, application.ends_at = interval
+            if get_scheduler().conflicts(application.doctor_id, *interval, exclude=shift.id):
+                db.session.rollback()
+                return CONFLICT
+            if booked_overlaps(application.doctor_id, *interval, exclude_application_id=application.id):
+                db.session.rollback()
+                return CONFLICT
+        if not claim_booking(shift.id):
+            db.session.rollback()
+            return CLOSED
+    # Also set through the ORM (the row already holds it) so the scheduler,
+    # matching and payment listeners see the change.
+    application.status = status
+    notify(DoctorOutbox, DOCTOR, application.doctor_id,
+           APPLICATION_ACCEPTED if status == 'Accepted' else APPLICATION_REJECTED,
+           shift_id=shift.id, shift_title=shift.title, shift_date=shift.shift_date,
+           hospital_name=shift.hospital.hospital_name if shift.hospital else None)
+    db.session.commit()
+    return DECIDED
+
+
+def remove_duplicate_applications(conn):
+    """Delete all but one row per (doctor_id, shift_id); returns the number of rows removed.
+
+    Rows from before the unique index existed can hold the same pair twice.
+    The row that got furthest (Accepted, then Rejected, then Pending) is
+    kept, the oldest of those on a tie, so the unique index can be built.
+    """
+    ranked = select(
+        ShiftApplication.id,
+        func.row_number().over(
+            partition_by=(ShiftApplication.doctor_id, ShiftApplication.shift_id),
+            order_by=(case({status: rank for rank, status in enumerate(STATUS_PROGRESS)},
+                           value=ShiftApplication.status, else_=len(STATUS_PROGRESS)),
+                      ShiftApplication.id),
+        ).label('rank'),
+    ).subquery()
+    return conn.execute(
+        delete(ShiftApplication).where(ShiftApplication.id.in_(select(ranked.c.id).where(ranked.c.rank > 1)))
+    ).rowcount
+
+
+def backfill_intervals():
+    """Store the UTC interval on applications created before intervals were recorded."""
+    count = 0
+    last_id = 0
+    while True:
+        applications = (
+            ShiftApplication.query
+            .filter(ShiftApplication.starts_at.is_(None), ShiftApplication.id > last_id)
+            .order_by(ShiftApplication.id)
+            .limit(CHUNK_SIZE)
+            .all()
+        )
+        if not applications:
+            return count
+        shifts = load_shifts(application.shift_id for application in applications)
+        for application in applications:
+            shift = shifts.get(application.shift_id)
+            interval = interval_for(shift) if shift else None
+            if interval is not None:
+                application.starts_at, application.ends_at = interval
+                count += 1
+        last_id = applications[-1].id
+        db.session.commit()
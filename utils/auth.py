@@ -0,0 +1,152 @@
+# utils/auth.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+
+class LoginBusy(Exception):
+    """Raised when the hashing queue is full; the caller should ask the user to retry."""
+
+
+def hash_method():
+    if has_app_context():
+        return current_app.config['PASSWORD_HASH_METHOD']
+    return DEFAULT_HASH_METHOD
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+@lru_cache(maxsize=16)
+def full_method(method):
+    """`method` with Werkzeug's defaults filled in, as it is written into a hash ('scrypt' -> 'scrypt:32768:8:1')."""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        args = ['32768', '8', '1']
+    elif name == 'pbkdf2':
+        args = (args or ['sha256'])[:2]
+        if len(args) == 1:
+            args.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ':'.join([name, *args])
+
+
+def needs_rehash(password_hash):
+    """True if the stored hash was made with different parameters than PASSWORD_HASH_METHOD."""
+    return full_method(password_hash.split('$', 1)[0]) != full_method(hash_method())
+
+
+class PasswordHasher:
+    """Runs password checks on a small, bounded thread pool.
+
+    At most `workers` hashes run at once and at most `queue_size` more wait
+    for a slot. Beyond that `verify` raises LoginBusy immediately, so a burst
+    of logins queues briefly or is turned away instead of pinning every
+    worker on scrypt and starving other routes. A slot is held until its
+    hash finishes, even when the caller has given up waiting on it.
+
+    The bound only helps when a worker process serves requests on several
+    threads (e.g. gunicorn's gthread worker, or the threaded dev server).
+    With sync or one-thread workers each process handles one login at a
+    time anyway, and the process count is the only limit.
+    """
+
+    def __init__(self, workers=2, queue_size=32, timeout=10.0):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash')
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.timeout = timeout
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def hash(self, password):
+        """Hash `password` with PASSWORD_HASH_METHOD in the pool (for rehashing on login)."""
+        return self._run(generate_password_hash, password, method=hash_method())
+
+    def _run(self, function, *args, **kwargs):
+        if not self.slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            future = self.executor.submit(function, *args, **kwargs)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise LoginBusy()
+
+
+class MemoryRateStore:
+    """In-process fixed-window counters. Any object with the same `hit`/`reset`
+    methods (e.g. backed by Redis INCR + EXPIRE) can replace it to share
+    limits across workers."""
+
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, window):
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._windows.get(key, (now, 0))
+            if now - started >= window:
+                started, count = now, 0
+            count += 1
+            self._windows[key] = (started, count)
+            if len(self._windows) > 100000:
+                self._prune(now, window)
+            return count
+
+    def reset(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def _prune(self, now, window):
+        for key in [key for key, (started, _) in self._windows.items() if now - started >= window]:
+            del self._windows[key]
+
+
+class LoginRateLimiter:
+    """Per-email and per-IP login attempt limits from LOGIN_RATE_LIMITS = {'email': (attempts, seconds), 'ip': ...}."""
+
+    def __init__(self, limits, store=None):
+        self.limits = limits
+        self.store = store or MemoryRateStore()
+
+    def allow(self, email, ip):
+        allowed = True
+        for scope, value in (('email', email.lower()), ('ip', ip)):
+            if scope not in self.limits or not value:
+                continue
+            attempts, window = self.limits[scope]
+            if self.store.hit(f"login:{scope}:{value}", window) > attempts:
+                allowed = False
+        return allowed
+
+    def succeeded(self, email):
+        self.store.reset(f"login:email:{email.lower()}")
+
+
+def init_auth(app, store=None):
+    app.extensions['password_hasher'] = PasswordHasher(
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_size=app.config['PASSWORD_HASH_QUEUE'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+    app.extensions['login_limiter'] = LoginRateLimiter(app.config['LOGIN_RATE_LIMITS'], store=store)
+
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
+
+
+def get_login_limiter():
+    return current_app.extensions['login_limiter']
@@ -0,0 +1,30 @@
+# utils/background.py
+import threading
+import time
+
+
+def run_periodically(app, name, interval, task):
+    """Call task() inside an app context every `interval` seconds on a daemon thread.
+
+    The thread starts with the first request, so CLI commands don't start
+    it, and once per process. A failing pass is logged and the next one
+    runs on schedule. A falsy `interval` disables the job.
+    """
+    if not interval:
+        return
+    started = threading.Event()
+
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    task()
+            except Exception:
+                app.logger.exception("Background job %s failed", name)
+            time.sleep(interval)
+
+    @app.before_request
+    def start_worker():
+        if not started.is_set():
+            started.set()
+            threading.Thread(target=loop, name=name, daemon=True).start()
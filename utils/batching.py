@@ -0,0 +1,8 @@
+# utils/batching.py
+CHUNK_SIZE = 500  # ids per IN query, under SQLite's bound-parameter limit
+
+
+def chunked(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
@@ -0,0 +1,278 @@
+# utils/caching.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, has_app_context, request, send_from_directory, session
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional; .br files are only written when it is installed
+    brotli = None
+
+SHIFTS = 'shifts'  # tag for anything showing open-shift numbers
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class ResponseCache:
+    """In-process TTL cache for rendered pages and template fragments.
+
+    Entries can carry tags; `invalidate_tag` drops every entry with that tag
+    (e.g. everything showing open-shift numbers when a shift changes). Like
+    the user cache, other workers only notice an invalidation when their
+    own entry expires, so TTLs stay short.
+    """
+
+    def __init__(self, ttl=60, max_size=1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (expires, value, tags)
+        self._tags = {}                # tag -> {key}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None, tags=()):
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_set(self, key, build, ttl=None, tags=()):
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.set(key, value, ttl, tags)
+        return value
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for tag in entry[2]:
+                self._tags.get(tag, set()).discard(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in self._tags.pop(tag, ()):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    for other in entry[2]:
+                        if other != tag:
+                            self._tags.get(other, set()).discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def init_caching(app):
+    cache = ResponseCache(ttl=app.config['RESPONSE_CACHE_TTL'], max_size=app.config['RESPONSE_CACHE_MAX_SIZE'])
+    app.extensions['response_cache'] = cache
+    app.add_template_global(cached_fragment)
+    init_static(app)
+    return cache
+
+
+def get_response_cache():
+    return current_app.extensions['response_cache']
+
+
+def cached_fragment(key, ttl=None, tags=(), caller=None):
+    """Template helper: `{% call cached_fragment('key', tags=['shifts']) %}...{% endcall %}`.
+
+    The body of the call block is only rendered on a miss.
+    """
+    return Markup(get_response_cache().get_or_set('fragment:' + key, caller, ttl, tags))
+
+
+def cache_page(ttl=None, tags=()):
+    """Serve a view's GET response from the cache for anonymous visitors.
+
+    Signed-in users, requests with flashed messages waiting and non-200
+    responses always go through the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or current_user.is_authenticated or '_flashes' in session:
+                return view(*args, **kwargs)
+            cache = get_response_cache()
+            key = 'page:' + request.full_path
+            cached = cache.get(key)
+            if cached is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                cache.set(key, (response.get_data(), response.mimetype), ttl, tags)
+                response.headers['X-Cache'] = 'MISS'
+            else:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+            response.cache_control.public = True
+            response.cache_control.max_age = ttl or cache.ttl
+            response.vary.add('Cookie')
+            return response
+        return wrapped
+    return decorator
+
+
+# Tag invalidation from ORM writes. Both unit-of-work flushes and bulk
+# ORM-enabled statements (insert(Shift), update(Shift)...) mark their
+# model's tag; the matching entries are dropped once the transaction commits.
+_model_tags = {}
+
+
+def invalidate_on_change(model, tag):
+    _model_tags[model] = tag
+
+
+def _pending_tags(session):
+    return session.info.setdefault('cache_tags', set())
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        tag = _model_tags.get(mapper.class_) if mapper is not None else None
+        if tag:
+            _pending_tags(orm_execute_state.session).add(tag)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tag = _model_tags.get(type(instance))
+        if tag:
+            _pending_tags(session).add(tag)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    tags = session.info.pop('cache_tags', None)
+    if not tags or not has_app_context():
+        return
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        for tag in tags:
+            cache.invalidate_tag(tag)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_tags(session):
+    session.info.pop('cache_tags', None)
+
+
+# Static files: `url_for('static', ...)` gets a ?v=<content hash> fingerprint,
+# fingerprinted requests are cacheable for a year, and precompressed .br/.gz
+# siblings (see precompress_static) are served to clients that accept them.
+
+def init_static(app):
+    fingerprints = {}  # filename -> (mtime, hash)
+
+    def fingerprint(filename):
+        try:
+            path = safe_join(app.static_folder, filename)
+            mtime = os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
+        cached = fingerprints.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as file:
+                cached = fingerprints[filename] = (mtime, hashlib.sha256(file.read()).hexdigest()[:12])
+        return cached[1]
+
+    @app.url_defaults
+    def add_fingerprint(endpoint, values):
+        if endpoint == 'static' and app.config['STATIC_FINGERPRINT'] and 'v' not in values:
+            version = fingerprint(values.get('filename'))
+            if version:
+                values['v'] = version
+
+    def static(filename):
+        response = None
+        if filename.endswith(COMPRESSIBLE):
+            path = safe_join(app.static_folder, filename)
+            for encoding, suffix in ENCODINGS:
+                if path and request.accept_encodings[encoding] and _fresh(path, path + suffix):
+                    response = send_from_directory(app.static_folder, filename + suffix,
+                                                   mimetype=mimetypes.guess_type(filename)[0])
+                    response.content_encoding = encoding
+                    break
+            response = response or app.send_static_file(filename)
+            response.vary.add('Accept-Encoding')
+        else:
+            response = app.send_static_file(filename)
+        if app.config['STATIC_FINGERPRINT'] and request.args.get('v') == fingerprint(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+
+
+def _fresh(source, compressed):
+    try:
+        return os.path.getmtime(compressed) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def precompress_static(folder):
+    """Write .gz (and .br, when brotli is installed) next to each CSS/JS/SVG file that changed.
+
+    Returns the number of files written.
+    """
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as file:
+                data = file.read()
+            outputs = [('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                outputs.append(('.br', lambda: brotli.compress(data, quality=11)))
+            for suffix, compress in outputs:
+                if _fresh(path, path + suffix):
+                    continue
+                with open(path + suffix, 'wb') as file:
+                    file.write(compress())
+                written += 1
+    return written
@@ -0,0 +1,81 @@
+# utils/database.py
+"""Engine configuration for the default, doctors and hospitals binds.
+
+Every bind is an SQLite file by default. Each one can be moved to another
+server independently by setting its URL in the environment, without any
+change to models.py:
+
+    DATABASE_URL=postgresql://user:pass@db/locum_app
+    DOCTORS_DATABASE_URL=postgresql://user:pass@db/locum_doctors
+    HOSPITALS_DATABASE_URL=postgresql://user:pass@db/locum_hospitals
+
+(PostgreSQL also needs a driver such as psycopg2-binary installed.)
+SQLite binds get WAL journalling and the SQLITE_PRAGMAS from config.py on
+every new connection. Server binds get a pre-pinged, recycled QueuePool
+sized by DB_POOL_SIZE / DB_MAX_OVERFLOW.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from models import db
+
+
+def engine_options(url, config):
+    """Engine options for one bind, depending on its backend."""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            # Flask-SQLAlchemy gives in-memory databases a StaticPool already.
+            return {}
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+        }
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+
+def configure_engine_options(app):
+    """Expand the default URI and every bind into per-bind engine options.
+
+    Must run before `db.init_app(app)`, which creates the engines.
+    """
+    config = app.config
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.update(engine_options(config['SQLALCHEMY_DATABASE_URI'], config))
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    binds = {}
+    for key, value in (config.get('SQLALCHEMY_BINDS') or {}).items():
+        bind = dict(value) if isinstance(value, dict) else {'url': value}
+        for option, setting in engine_options(bind['url'], config).items():
+            bind.setdefault(option, setting)
+        binds[key] = bind
+    config['SQLALCHEMY_BINDS'] = binds
+
+
+def _sqlite_pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_pragmas
+
+
+def install_sqlite_pragmas(app):
+    """Apply SQLITE_PRAGMAS to each new connection of every SQLite engine.
+
+    Must run after `db.init_app(app)` and before the first connection is made.
+    """
+    listener = _sqlite_pragma_listener(app.config['SQLITE_PRAGMAS'])
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', listener)
@@ -1,18 +1,144 @@
 # utils/encryption.py
-from cryptography.fernet import Fernet
-from flask import current_app
+import threading
+
+from flask import current_app, g, has_request_context
+
+# Built ciphers, keyed by the tuple of keys they were built from. Fernet
+# objects are stateless after construction, so one per key set is shared
+# by every request and thread instead of being rebuilt on each call.
+# cryptography is imported when the first one is built, not at startup.
+_ciphers = {}
+
+# Fernet operations performed by this process, exported by utils/metrics.py.
+_operations = {'encrypt': 0, 'decrypt': 0, 'rotate': 0}
+_operations_lock = threading.Lock()
+
+
+def _record(operation, count=1):
+    with _operations_lock:
+        _operations[operation] += count
+    if has_request_context():
+        g.encryption_ops = g.get('encryption_ops', 0) + count
+
+
+def operation_counts():
+    with _operations_lock:
+        return dict(_operations)
+
+
+def _configured_keys():
+    keys = current_app.config.get('ENCRYPTION_KEYS') or [current_app.config['ENCRYPTION_KEY']]
+    return tuple(key.encode() if isinstance(key, str) else key for key in keys)
+
 
 class Encryptor:
+    @staticmethod
+    def cipher():
+        """Fernet for the configured key, or MultiFernet when ENCRYPTION_KEYS lists several.
+
+        With MultiFernet the first key encrypts and every key is tried on
+        decrypt, so old keys can stay listed until `rotate` has re-encrypted
+        existing rows.
+        """
+        keys = _configured_keys()
+        cipher = _ciphers.get(keys)
+        if cipher is None:
+            from cryptography.fernet import Fernet, MultiFernet
+            fernets = [Fernet(key) for key in keys]
+            cipher = fernets[0] if len(fernets) == 1 else MultiFernet(fernets)
+            _ciphers[keys] = cipher
+        return cipher
+
     @staticmethod
     def encrypt(data: str) -> str:
         if not data:
             return ''
-        f = Fernet(current_app.config['ENCRYPTION_KEY'])
-        return f.encrypt(data.encode()).decode()
+        _record('encrypt')
+        return Encryptor.cipher().encrypt(data.encode()).decode()
 
     @staticmethod
     def decrypt(token: str) -> str:
         if not token:
             return ''
-        f = Fernet(current_app.config['ENCRYPTION_KEY'])
-        return f.decrypt(token.encode()).decode()
\ No newline at end of file
+        _record('decrypt')
+        return Encryptor.cipher().decrypt(token.encode()).decode()
+
+    @staticmethod
+    def decrypt_many(tokens) -> dict:
+        """Decrypt a batch of tokens, returning {token: plaintext}; repeated tokens are decrypted once."""
+        cipher = Encryptor.cipher()
+        tokens = set(tokens)
+        _record('decrypt', sum(1 for token in tokens if token))
+        return {token: cipher.decrypt(token.encode()).decode() if token else '' for token in tokens}
+
+    @staticmethod
+    def rotate(token: str) -> str:
+        """Re-encrypt a token under the newest key (requires ENCRYPTION_KEYS)."""
+        if not token:
+            return ''
+        cipher = Encryptor.cipher()
+        if not hasattr(cipher, 'rotate'):  # a single Fernet: nothing to rotate to
+            return token
+        _record('rotate')
+        return cipher.rotate(token.encode()).decode()
+
+    @staticmethod
+    def prime(objects, *fields):
+        """Bulk-decrypt `fields` (EncryptedField names) on every object for list views.
+
+        Each distinct token is decrypted once and the plaintext memoised on
+        its object, so templates can read the fields freely afterwards.
+        """
+        objects = list(objects)
+        pending = []
+        for obj in objects:
+            for field in fields:
+                descriptor = getattr(type(obj), field)
+                if not descriptor.is_cached(obj):
+                    pending.append((obj, descriptor, getattr(obj, descriptor.column)))
+        plaintexts = Encryptor.decrypt_many(token for _, _, token in pending)
+        for obj, descriptor, token in pending:
+            descriptor.remember(obj, token, plaintexts[token])
+        return objects
+
+
+class EncryptedField:
+    """Model attribute that reads and writes an encrypted `<name>_enc` column.
+
+    The decrypted value is memoised on the instance together with the token
+    it came from, so repeated reads (e.g. in templates) decrypt once, and a
+    new token - from the setter, a refresh or a raw column write - is never
+    served a stale plaintext.
+    """
+
+    def __init__(self, column):
+        self.column = column
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def _memo(self, obj):
+        return obj.__dict__.setdefault('_decrypted', {})
+
+    def is_cached(self, obj):
+        cached = self._memo(obj).get(self.name)
+        return cached is not None and cached[0] == getattr(obj, self.column)
+
+    def remember(self, obj, token, plaintext):
+        self._memo(obj)[self.name] = (token, plaintext)
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        token = getattr(obj, self.column)
+        cached = self._memo(obj).get(self.name)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        plaintext = Encryptor.decrypt(token)
+        self.remember(obj, token, plaintext)
+        return plaintext
+
+    def __set__(self, obj, value):
+        token = Encryptor.encrypt(value)
+        setattr(obj, self.column, token)
+        self.remember(obj, token, value or '')
@@ -0,0 +1,201 @@
+# utils/events.py
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert, select
+
+from models import db, LiveEvent
+
+SHIFT_NEW = 'shift.new'
+SHIFT_UPDATED = 'shift.updated'
+SHIFT_FILLED = 'shift.filled'
+APPLICATION_STATUS = 'application.status'
+
+
+class Subscription:
+    """One SSE client's view of the broker: a bounded queue of matching events.
+
+    Shift events are filtered by specialty and city; application events are
+    only delivered to the doctor they belong to. A client that falls
+    `maxsize` events behind is closed, and its EventSource reconnects with
+    Last-Event-ID to catch up from the broker's history.
+    """
+
+    def __init__(self, broker, specialty=None, city=None, doctor_id=None, maxsize=100):
+        self.broker = broker
+        self.specialty = specialty or None
+        self.city = (city or '').strip().lower() or None
+        self.doctor_id = doctor_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def matches(self, event):
+        if event['type'] == APPLICATION_STATUS:
+            return self.doctor_id is not None and event['doctor_id'] == self.doctor_id
+        if self.specialty and event['specialty'] != self.specialty:
+            return False
+        if self.city and (event['city'] or '').lower() != self.city:
+            return False
+        return True
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.closed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.closed = True
+        self.broker.unsubscribe(self)
+
+
+class MemoryBroker:
+    """In-process pub/sub. Only clients connected to the same worker see an event."""
+
+    def __init__(self, history=200):
+        self._subscriptions = set()
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publish(self, type, data, specialty=None, city=None, doctor_id=None):
+        event = {'id': next(self._ids), 'type': type, 'data': data,
+                 'specialty': specialty, 'city': city, 'doctor_id': doctor_id}
+        self.dispatch(event)
+
+    def dispatch(self, event):
+        with self._lock:
+            self._history.append(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def subscribe(self, last_event_id=None, **filters):
+        subscription = Subscription(self, **filters)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            missed = [event for event in self._history if last_event_id is not None and event['id'] > last_event_id]
+        for event in missed:
+            if subscription.matches(event):
+                subscription.offer(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+class DatabaseBroker(MemoryBroker):
+    """Stand-in for a shared broker across gunicorn workers, using the live_events table.
+
+    `publish` inserts a row; each worker polls for rows newer than the last
+    one it saw (only while it has subscribers) and fans them out to its own
+    clients. Event ids are the row ids, so Last-Event-ID works across workers.
+    """
+
+    def __init__(self, app, poll_interval=1.0, retention=timedelta(minutes=30), history=200):
+        super().__init__(history=history)
+        self.app = app
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._last_id = None
+        self._poller = None
+
+    def _engine(self):
+        return db.engines[LiveEvent.__bind_key__]
+
+    def publish(self, type, data, specialty=None, city=None, doctor_id=None):
+        with self._engine().begin() as conn:
+            conn.execute(insert(LiveEvent.__table__).values(
+                type=type, payload=json.dumps(data), specialty=specialty, city=city,
+                doctor_id=doctor_id, created_at=datetime.utcnow()))
+
+    def subscribe(self, last_event_id=None, **filters):
+        self._ensure_poller()
+        return super().subscribe(last_event_id=last_event_id, **filters)
+
+    def _ensure_poller(self):
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_forever, name='event-poller', daemon=True)
+                self._poller.start()
+
+    def _poll_forever(self):
+        table = LiveEvent.__table__
+        with self.app.app_context():
+            engine = self._engine()
+            with engine.connect() as conn:
+                if self._last_id is None:
+                    self._last_id = conn.execute(select(table.c.id).order_by(table.c.id.desc()).limit(1)).scalar() or 0
+            last_prune = 0.0
+            while True:
+                with self._lock:
+                    if not self._subscriptions:
+                        self._poller = None
+                        return
+                with engine.connect() as conn:
+                    rows = conn.execute(select(table).where(table.c.id > self._last_id).order_by(table.c.id)).all()
+                for row in rows:
+                    self._last_id = row.id
+                    self.dispatch({'id': row.id, 'type': row.type, 'data': json.loads(row.payload),
+                                   'specialty': row.specialty, 'city': row.city, 'doctor_id': row.doctor_id})
+                if time.monotonic() - last_prune > 60:
+                    with engine.begin() as conn:
+                        conn.execute(delete(table).where(table.c.created_at < datetime.utcnow() - self.retention))
+                    last_prune = time.monotonic()
+                time.sleep(self.poll_interval)
+
+
+def init_events(app):
+    backend = app.config['EVENT_BROKER']
+    if backend == 'memory':
+        broker = MemoryBroker()
+    elif backend == 'database':
+        broker = DatabaseBroker(app, poll_interval=app.config['EVENT_POLL_INTERVAL'])
+    else:
+        raise ValueError(f"Unknown EVENT_BROKER backend: {backend}")
+    app.extensions['event_broker'] = broker
+    return broker
+
+
+def get_broker():
+    return current_app.extensions['event_broker']
+
+
+def shift_payload(shift, city=None):
+    return {
+        'id': shift.id,
+        'title': shift.title,
+        'specialty': shift.specialty,
+        'city': city,
+        'shift_date': shift.shift_date.isoformat() if shift.shift_date else None,
+        'pay_rate': shift.pay_rate,
+        'pay_type': shift.pay_type,
+        'is_urgent': shift.is_urgent,
+        'status': shift.status,
+    }
+
+
+def publish_shift(type, shift, city=None):
+    get_broker().publish(type, shift_payload(shift, city), specialty=shift.specialty, city=city)
+
+
+def publish_application(doctor_id, shift_id, status):
+    get_broker().publish(APPLICATION_STATUS, {'shift_id': shift_id, 'status': status}, doctor_id=doctor_id)
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,195 @@
+# utils/fulltext.py
+import re
+
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import Float, Integer, String, and_, column, or_, select, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, HospitalProfile, HospitalUser, Shift
+
+FTS_TABLE = 'shift_fts'
+# Columns of the index, in order; the weights give bm25() a preference for
+# matches in the title and specialty over the long free-text fields.
+FTS_COLUMNS = ('title', 'specialty', 'location_ward', 'requirements', 'hospital_name', 'city', 'about')
+FTS_WEIGHTS = (10.0, 8.0, 4.0, 2.0, 3.0, 5.0, 1.0)
+SNIPPET_TOKENS = 12
+MAX_TERMS = 8
+
+# Highlight markers written by snippet(); control characters can't occur in
+# form input, so after escaping the text they are swapped for <mark> tags.
+_OPEN, _CLOSE = '\x02', '\x03'
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+_SOURCE = f"""
+    SELECT s.id, s.title, s.specialty, s.location_ward, s.requirements, h.hospital_name, p.city, p.about
+    FROM shifts s
+    LEFT JOIN hospitals h ON h.id = s.hospital_id
+    LEFT JOIN hospital_profiles p ON p.hospital_id = s.hospital_id
+"""
+_INDEX_SHIFT = f"""
+    INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)})
+    SELECT new.id, new.title, new.specialty, new.location_ward, new.requirements, h.hospital_name, p.city, p.about
+    FROM (SELECT 1) LEFT JOIN hospitals h ON h.id = new.hospital_id
+    LEFT JOIN hospital_profiles p ON p.hospital_id = new.hospital_id
+    WHERE new.status = 'Open';
+"""
+
+# Only Open shifts are indexed, which is all the job search ever shows, so
+# the index stays the size of the live listing rather than the history.
+# Triggers keep it in step with every write, including bulk statements that
+# ORM events would not see (roster imports, the lifecycle job).
+TRIGGERS = {
+    'shift_fts_insert': f"""
+        CREATE TRIGGER shift_fts_insert AFTER INSERT ON shifts BEGIN
+            {_INDEX_SHIFT}
+        END""",
+    'shift_fts_update': f"""
+        CREATE TRIGGER shift_fts_update
+        AFTER UPDATE OF title, specialty, location_ward, requirements, hospital_id, status ON shifts BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            {_INDEX_SHIFT}
+        END""",
+    'shift_fts_delete': f"""
+        CREATE TRIGGER shift_fts_delete AFTER DELETE ON shifts BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END""",
+    'shift_fts_profile': f"""
+        CREATE TRIGGER shift_fts_profile AFTER UPDATE OF city, about ON hospital_profiles BEGIN
+            UPDATE {FTS_TABLE} SET city = new.city, about = new.about
+            WHERE rowid IN (SELECT id FROM shifts WHERE hospital_id = new.hospital_id AND status = 'Open');
+        END""",
+    'shift_fts_profile_insert': f"""
+        CREATE TRIGGER shift_fts_profile_insert AFTER INSERT ON hospital_profiles BEGIN
+            UPDATE {FTS_TABLE} SET city = new.city, about = new.about
+            WHERE rowid IN (SELECT id FROM shifts WHERE hospital_id = new.hospital_id AND status = 'Open');
+        END""",
+    'shift_fts_hospital': f"""
+        CREATE TRIGGER shift_fts_hospital AFTER UPDATE OF hospital_name ON hospitals BEGIN
+            UPDATE {FTS_TABLE} SET hospital_name = new.hospital_name
+            WHERE rowid IN (SELECT id FROM shifts WHERE hospital_id = new.id AND status = 'Open');
+        END""",
+}
+
+
+def init_fulltext(app):
+    """Set app.extensions['fulltext'] to whether hospitals.db has the FTS5 index.
+
+    The index is created by `flask upgrade-db` (ensure_fulltext). Without
+    it, on other backends or on SQLite builds without FTS5, ShiftSearch
+    falls back to LIKE filters without ranking.
+    """
+    with app.app_context():
+        engine = db.engines['hospitals']
+        available = engine.dialect.name == 'sqlite' and _has_index(engine)
+    app.extensions['fulltext'] = available
+    return available
+
+
+def _has_index(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                            {'name': FTS_TABLE}).first() is not None
+
+
+def ensure_fulltext():
+    """Create the FTS5 index and its triggers in hospitals.db if missing; returns whether it is available."""
+    available = False
+    engine = db.engines['hospitals']
+    if engine.dialect.name == 'sqlite':
+        try:
+            available = _ensure_index(engine)
+        except OperationalError as error:
+            current_app.logger.warning("Full-text search unavailable, using LIKE fallback: %s", error)
+    current_app.extensions['fulltext'] = available
+    return available
+
+
+def _ensure_index(engine):
+    with engine.begin() as conn:
+        existing = {name for name, in conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))}
+        if FTS_TABLE not in existing:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)}, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"))
+            _fill(conn)
+        for name, ddl in TRIGGERS.items():
+            if name not in existing:
+                conn.execute(text(ddl))
+    return True
+
+
+def _fill(conn):
+    conn.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) {_SOURCE} WHERE s.status = 'Open'"))
+
+
+def rebuild_index():
+    """Refill the FTS5 index from the Open shifts; returns the number of rows indexed (None without FTS5)."""
+    if not fulltext_enabled():
+        return None
+    with db.engines['hospitals'].begin() as conn:
+        conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        _fill(conn)
+        conn.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+        return conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+
+
+def fulltext_enabled():
+    return bool(current_app.extensions.get('fulltext'))
+
+
+def search_terms(query):
+    """Words of a free-text query, lower-cased, at most MAX_TERMS of them."""
+    return [word.lower() for word in _WORD.findall(query or '')][:MAX_TERMS]
+
+
+def match_expression(terms):
+    """FTS5 MATCH string requiring every term, each as a prefix: `"night"* AND "icu"*`."""
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def fts_matches(terms):
+    """Subquery of (rowid, rank, snippet) for the shifts matching every term, best first by bm25."""
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    statement = text(
+        f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+        f"snippet({FTS_TABLE}, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    ).bindparams(match=match_expression(terms), open=_OPEN, close=_CLOSE)
+    return statement.columns(column('rowid', Integer), column('rank', Float), column('snippet', String)).subquery('fts')
+
+
+def like_filter(terms):
+    """Fallback filter: every term appears in a shift text column or its hospital's name, city or about."""
+    conditions = []
+    for term in terms:
+        pattern = f'%{term}%'
+        hospitals = select(HospitalProfile.hospital_id).where(
+            or_(HospitalProfile.city.ilike(pattern), HospitalProfile.about.ilike(pattern)))
+        named = select(HospitalUser.id).where(HospitalUser.hospital_name.ilike(pattern))
+        conditions.append(or_(Shift.title.ilike(pattern), Shift.specialty.ilike(pattern),
+                              Shift.location_ward.ilike(pattern), Shift.requirements.ilike(pattern),
+                              Shift.hospital_id.in_(hospitals), Shift.hospital_id.in_(named)))
+    return and_(*conditions)
+
+
+def render_snippet(snippet):
+    """Escape an FTS5 snippet and turn its match markers into <mark> tags."""
+    if not snippet:
+        return None
+    return Markup(str(escape(snippet)).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+def highlight(value, terms, width=80):
+    """Fallback snippet: a window of `value` around the first term, with every term marked."""
+    if not value or not terms:
+        return None
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    found = pattern.search(value)
+    if found is None:
+        return None
+    start = max(0, found.start() - width // 2)
+    excerpt = value[start:start + width]
+    marked = pattern.sub(lambda match: _OPEN + match.group(0) + _CLOSE, excerpt)
+    return render_snippet(('…' if start else '') + marked + ('…' if start + width < len(value) else ''))
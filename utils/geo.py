@@ -0,0 +1,227 @@
+# utils/geo.py
+import csv
+import math
+import re
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models import db, HospitalProfile
+
+EARTH_RADIUS_KM = 6371.0088
+GEO_TABLE = 'hospital_geo'
+_PINCODE = re.compile(r'^\d{6}$')
+
+# R*Tree of hospital coordinates (one point per hospital, id = hospital_id),
+# maintained by triggers on hospital_profiles so bulk writes are covered.
+TRIGGERS = {
+    'hospital_geo_insert': f"""
+        CREATE TRIGGER hospital_geo_insert AFTER INSERT ON hospital_profiles
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+            INSERT OR REPLACE INTO {GEO_TABLE} VALUES
+                (new.hospital_id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END""",
+    'hospital_geo_update': f"""
+        CREATE TRIGGER hospital_geo_update AFTER UPDATE OF latitude, longitude, hospital_id ON hospital_profiles BEGIN
+            DELETE FROM {GEO_TABLE} WHERE id = old.hospital_id;
+            INSERT OR REPLACE INTO {GEO_TABLE}
+                SELECT new.hospital_id, new.latitude, new.latitude, new.longitude, new.longitude
+                WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END""",
+    'hospital_geo_delete': f"""
+        CREATE TRIGGER hospital_geo_delete AFTER DELETE ON hospital_profiles BEGIN
+            DELETE FROM {GEO_TABLE} WHERE id = old.hospital_id;
+        END""",
+}
+
+
+class Places:
+    """Pincode and place-name coordinates from the bundled CSV (data/pincodes.csv).
+
+    Rows are `pincode,latitude,longitude,place`; the pincode is either a full
+    six-digit code or a three-digit sorting-district prefix.
+    """
+
+    def __init__(self, path):
+        self.by_pincode = {}
+        self.by_place = {}
+        with open(path, newline='') as file:
+            rows = csv.reader(line for line in file if line.strip() and not line.startswith('#'))
+            for pincode, latitude, longitude, place in rows:
+                point = (float(latitude), float(longitude))
+                if pincode.strip():
+                    self.by_pincode.setdefault(pincode.strip(), point)
+                if place.strip():
+                    self.by_place.setdefault(place.strip().lower(), point)
+
+    def locate(self, pincode=None, place=None):
+        """(latitude, longitude) for a pincode (full, then its district prefix) or else a place name; or None."""
+        pincode = re.sub(r'\s', '', pincode or '')
+        if _PINCODE.match(pincode):
+            point = self.by_pincode.get(pincode) or self.by_pincode.get(pincode[:3])
+            if point:
+                return point
+        return self.by_place.get((place or '').strip().lower())
+
+    def resolve(self, query):
+        """Coordinates for user input that is either a pincode or a place name."""
+        query = (query or '').strip()
+        return self.locate(pincode=query) or self.locate(place=query)
+
+
+def search_origin(args):
+    """(origin, radius_km) for a search from ?near=<pincode or place> (else ?lat=&lon=) and ?radius= in km.
+
+    origin is None when no location was asked for or it could not be found.
+    """
+    config = current_app.config
+    radius = args.get('radius', config['GEO_DEFAULT_RADIUS_KM'], type=float)
+    radius = max(1.0, min(radius, config['GEO_MAX_RADIUS_KM']))
+    if args.get('near'):
+        return get_places().resolve(args['near']), radius
+    latitude, longitude = args.get('lat', type=float), args.get('lon', type=float)
+    if latitude is not None and longitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return (latitude, longitude), radius
+    return None, radius
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(south, north, west, east) enclosing the circle; padded a little for the R*Tree's float32 storage."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM) + 1e-4
+    delta_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(latitude)), 1e-6))) + 1e-4
+    return latitude - delta_lat, latitude + delta_lat, longitude - delta_lon, longitude + delta_lon
+
+
+def init_geo(app):
+    """Load the pincode table and note whether hospitals.db has the R*Tree index.
+
+    The index is created by `flask upgrade-db` (ensure_geo). Without it,
+    on other backends or on SQLite without R*Tree, app.extensions['geo_rtree']
+    is False and hospitals_near uses a bounding-box query on the indexed
+    latitude/longitude columns instead.
+    """
+    app.extensions['geo_places'] = Places(app.config['GEO_PINCODE_FILE'])
+    return detect_rtree(app)
+
+
+def detect_rtree(app):
+    """Set app.extensions['geo_rtree'] to whether hospitals.db has the R*Tree index."""
+    with app.app_context():
+        engine = db.engines['hospitals']
+        available = engine.dialect.name == 'sqlite' and _has_rtree(engine)
+    app.extensions['geo_rtree'] = available
+    return available
+
+
+def _has_rtree(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                            {'name': GEO_TABLE}).first() is not None
+
+
+def ensure_geo():
+    """Create the R*Tree index and its triggers in hospitals.db if missing; returns whether it is available."""
+    available = False
+    engine = db.engines['hospitals']
+    if engine.dialect.name == 'sqlite':
+        try:
+            available = _ensure_rtree(engine)
+        except OperationalError as error:
+            current_app.logger.warning("R*Tree unavailable, using bounding-box queries: %s", error)
+    current_app.extensions['geo_rtree'] = available
+    return available
+
+
+def _ensure_rtree(engine):
+    with engine.begin() as conn:
+        existing = {name for name, in conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))}
+        if GEO_TABLE not in existing:
+            conn.execute(text(f"CREATE VIRTUAL TABLE {GEO_TABLE} USING rtree(id, min_lat, max_lat, min_lon, max_lon)"))
+            conn.execute(text(
+                f"INSERT INTO {GEO_TABLE} SELECT hospital_id, latitude, latitude, longitude, longitude "
+                "FROM hospital_profiles WHERE hospital_id IS NOT NULL AND latitude IS NOT NULL AND longitude IS NOT NULL"))
+        for name, ddl in TRIGGERS.items():
+            if name not in existing:
+                conn.execute(text(ddl))
+    return True
+
+
+def get_places():
+    return current_app.extensions['geo_places']
+
+
+def hospitals_near(latitude, longitude, radius_km, limit=None):
+    """[(hospital_id, distance_km)] within `radius_km`, nearest first (at most `limit`).
+
+    The index narrows the search to the enclosing box in one query; exact
+    great-circle distances are then computed for those candidates only.
+    """
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    if current_app.extensions.get('geo_rtree'):
+        rows = db.session.execute(
+            text(f"SELECT id, min_lat, min_lon FROM {GEO_TABLE} "
+                 "WHERE max_lat >= :south AND min_lat <= :north AND max_lon >= :west AND min_lon <= :east"),
+            {'south': south, 'north': north, 'west': west, 'east': east},
+            bind_arguments={'bind': db.engines['hospitals']},
+        )
+    else:
+        rows = (HospitalProfile.query
+                .with_entities(HospitalProfile.hospital_id, HospitalProfile.latitude, HospitalProfile.longitude)
+                .filter(HospitalProfile.latitude.between(south, north),
+                        HospitalProfile.longitude.between(west, east)))
+    found = []
+    for hospital_id, lat, lon in rows:
+        distance = haversine_km(latitude, longitude, lat, lon)
+        if distance <= radius_km:
+            found.append((hospital_id, round(distance, 2)))
+    found.sort(key=lambda item: (item[1], item[0]))
+    return found[:limit] if limit else found
+
+
+# Coordinates follow the pincode and city: whenever a profile is added or
+# either field changes, they are looked up again before the flush.
+
+@event.listens_for(Session, 'before_flush')
+def _geocode_profiles(session, flush_context, instances):
+    if not has_app_context() or 'geo_places' not in current_app.extensions:
+        return
+    places = get_places()
+    for profile in list(session.new) + list(session.dirty):
+        if not isinstance(profile, HospitalProfile):
+            continue
+        state = inspect(profile)
+        if profile in session.new or state.attrs.pincode.history.has_changes() or state.attrs.city.history.has_changes():
+            profile.latitude, profile.longitude = places.locate(profile.pincode, profile.city) or (None, None)
+
+
+def geocode_hospitals(batch_size=1000):
+    """Fill in coordinates for every hospital profile from its pincode/city; returns the number updated."""
+    places = get_places()
+    updated = 0
+    last_id = 0
+    while True:
+        profiles = (HospitalProfile.query
+                    .with_entities(HospitalProfile.id, HospitalProfile.pincode, HospitalProfile.city,
+                                   HospitalProfile.latitude, HospitalProfile.longitude)
+                    .filter(HospitalProfile.id > last_id).order_by(HospitalProfile.id).limit(batch_size).all())
+        if not profiles:
+            return updated
+        changes = []
+        for profile_id, pincode, city, latitude, longitude in profiles:
+            point = places.locate(pincode, city) or (None, None)
+            if point != (latitude, longitude):
+                changes.append({'id': profile_id, 'latitude': point[0], 'longitude': point[1]})
+        if changes:
+            db.session.execute(update(HospitalProfile), changes)
+            db.session.commit()
+        updated += len(changes)
+        last_id = profiles[-1][0]
@@ -0,0 +1,217 @@
+# utils/lifecycle.py
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, literal, select, update
+
+from models import db, DoctorOutbox, HospitalOutbox, HospitalProfile, Shift, ShiftApplication, ShiftApplicationArchive, \
+    ShiftArchive
+from utils.background import run_periodically
+from utils.batching import chunked
+from utils.events import SHIFT_UPDATED, publish_shift
+from utils.notifications import APPLICATION_EXPIRED, DOCTOR, HOSPITAL, SHIFT_CLOSED, SHIFT_EXPIRED, notify_many
+
+EXPIRED = 'Expired'  # past, nobody booked
+CLOSED = 'Closed'    # past, some places booked but not all
+
+
+def _today():
+    return datetime.now(ZoneInfo(current_app.config['SHIFT_TIMEZONE'])).date()
+
+
+def _ids(query, batch_size):
+    return [row_id for row_id, in query.limit(batch_size)]
+
+
+def _rows(query, batch_size):
+    return query.limit(batch_size).all()
+
+
+def _update_ids(model, ids, condition, **values):
+    """UPDATE the rows in `ids` still matching `condition`; returns the set of ids this statement changed.
+
+    Another worker may have updated some of the rows since they were
+    selected, so callers notify only for what comes back. Uses UPDATE ...
+    RETURNING where the backend supports it, else one UPDATE per row.
+    """
+    if db.session.get_bind(mapper=model.__mapper__).dialect.update_returning:
+        statement = (update(model).where(model.id.in_(ids), condition).values(**values).returning(model.id)
+                     .execution_options(synchronize_session=False))
+        return {row_id for row_id, in db.session.execute(statement)}
+    return {row_id for row_id in ids
+            if db.session.execute(update(model).where(model.id == row_id, condition).values(**values)
+                                  .execution_options(synchronize_session=False)).rowcount}
+
+
+def expire_shifts(batch_size=1000):
+    """Take Open shifts dated before today (in SHIFT_TIMEZONE) out of the job search; returns how many.
+
+    A shift nobody was accepted for becomes Expired (SHIFT_EXPIRED to its
+    hospital); one with accepted bookings but places left becomes Closed
+    (SHIFT_CLOSED), so it is not reported as unfilled. Both drop out of the
+    Open-led indexes the job search reads. Each hospital is notified in the
+    same transaction, and a SHIFT_UPDATED event tells open job lists the
+    shift is gone once it commits; both only for the shifts this pass
+    changed, so overlapping passes don't repeat them.
+    """
+    today = _today()
+    total = 0
+    while True:
+        rows = _rows(Shift.query.with_entities(Shift.id, Shift.hospital_id, Shift.title, Shift.specialty,
+                                               Shift.shift_date, Shift.pay_rate, Shift.pay_type, Shift.is_urgent,
+                                               Shift.applications_count,
+                                               case((func.coalesce(Shift.applications_count, 0) > 0, CLOSED),
+                                                    else_=EXPIRED).label('status'))
+                     .filter(Shift.status == 'Open', Shift.shift_date < today), batch_size)
+        if not rows:
+            return total
+        now = datetime.utcnow()
+        changed = set()
+        for status in (EXPIRED, CLOSED):
+            ids = [row.id for row in rows if row.status == status]
+            if ids:
+                # Re-checks the bookings too, in case one was accepted since the SELECT.
+                booked = func.coalesce(Shift.applications_count, 0) > 0
+                changed |= _update_ids(Shift, ids, (Shift.status == 'Open') & (booked if status == CLOSED else ~booked),
+                                       status=status, updated_at=now)
+        rows = [row for row in rows if row.id in changed]
+        notify_many(HospitalOutbox, [
+            (HOSPITAL, row.hospital_id, SHIFT_EXPIRED if row.status == EXPIRED else SHIFT_CLOSED,
+             {'shift_id': row.id, 'shift_title': row.title, 'shift_date': row.shift_date,
+              'booked': row.applications_count})
+            for row in rows])
+        db.session.commit()
+        if rows:
+            _publish_updates(rows)
+        total += len(rows)
+
+
+def _publish_updates(shifts):
+    cities = dict(HospitalProfile.query
+                  .with_entities(HospitalProfile.hospital_id, HospitalProfile.city)
+                  .filter(HospitalProfile.hospital_id.in_({shift.hospital_id for shift in shifts})))
+    for shift in shifts:
+        publish_shift(SHIFT_UPDATED, shift, city=cities.get(shift.hospital_id))
+
+
+def reject_started_applications(batch_size=1000):
+    """Reject Pending applications whose shift has already started; returns how many.
+
+    Uses the UTC start stored on each application, so run
+    `flask backfill-shift-intervals` first on data from before it existed.
+    Pending applications count towards nothing in the payment summaries or
+    the double-booking index, so bulk updates are safe here. Each doctor
+    whose application this pass rejected is notified in the same
+    transaction.
+    """
+    now = datetime.utcnow()
+    total = 0
+    while True:
+        rows = _rows(ShiftApplication.query
+                     .with_entities(ShiftApplication.id, ShiftApplication.doctor_id, ShiftApplication.shift_id,
+                                    ShiftApplication.starts_at)
+                     .filter(ShiftApplication.status == 'Pending', ShiftApplication.starts_at < now), batch_size)
+        if not rows:
+            return total
+        rejected = _update_ids(ShiftApplication, [row.id for row in rows], ShiftApplication.status == 'Pending',
+                               status='Rejected', updated_at=now)
+        notify_many(DoctorOutbox, [
+            (DOCTOR, row.doctor_id, APPLICATION_EXPIRED, {'shift_id': row.shift_id, 'starts_at': row.starts_at})
+            for row in rows if row.id in rejected])
+        db.session.commit()
+        total += len(rejected)
+
+
+def _move(model, archive, condition):
+    """Copy the rows matching `condition` into `archive` and delete them, in the current transaction."""
+    columns = [column.name for column in model.__table__.columns]
+    db.session.execute(
+        insert(archive).from_select(
+            columns + ['archived_at'],
+            select(*model.__table__.columns, literal(datetime.utcnow()).label('archived_at')).where(condition),
+        )
+    )
+    return db.session.execute(delete(model).where(condition).execution_options(synchronize_session=False)).rowcount
+
+
+def archive_shifts(after_days, batch_size=1000):
+    """Move shifts dated more than `after_days` ago, and their applications, to the archive tables.
+
+    Accepted applications are payment history (utils/payments.py reads them
+    and their shifts), so they stay, and so does any shift that has one.
+    Such shifts are left out by the query itself (applications_count counts
+    accepted bookings), so they are not read again on every run; their
+    rejected applications are archived by start time instead. Applications
+    move first: if the run stops between the two databases' commits, the
+    next run finishes the shifts. Returns (shifts, applications) archived.
+    """
+    cutoff = _today() - timedelta(days=after_days)
+    shifts_moved = applications_moved = 0
+
+    # Applications store their shift's start in UTC (utils/scheduling.py).
+    started_before = (datetime.combine(cutoff, time.min, tzinfo=ZoneInfo(current_app.config['SHIFT_TIMEZONE']))
+                      .astimezone(timezone.utc).replace(tzinfo=None))
+    while True:
+        ids = _ids(ShiftApplication.query.with_entities(ShiftApplication.id)
+                   .filter(ShiftApplication.status == 'Rejected', ShiftApplication.starts_at < started_before),
+                   batch_size)
+        if not ids:
+            break
+        applications_moved += _move(ShiftApplication, ShiftApplicationArchive, ShiftApplication.id.in_(ids))
+        db.session.commit()
+
+    last_id = 0
+    while True:
+        ids = _ids(Shift.query.with_entities(Shift.id)
+                   .filter(Shift.shift_date < cutoff, Shift.status != 'Open',
+                           func.coalesce(Shift.applications_count, 0) == 0, Shift.id > last_id)
+                   .order_by(Shift.id), batch_size)
+        if not ids:
+            return shifts_moved, applications_moved
+        last_id = ids[-1]
+
+        applications_moved += _move(ShiftApplication, ShiftApplicationArchive,
+                                    ShiftApplication.shift_id.in_(ids) & (ShiftApplication.status != 'Accepted'))
+        db.session.commit()
+
+        # applications_count should already rule these out; an accepted
+        # booking it missed still keeps its shift.
+        keep = set()
+        for chunk in chunked(ids):
+            keep.update(shift_id for shift_id, in db.session.execute(
+                select(ShiftApplication.shift_id).where(ShiftApplication.shift_id.in_(chunk)).distinct()))
+        archivable = [shift_id for shift_id in ids if shift_id not in keep]
+        if archivable:
+            shifts_moved += _move(Shift, ShiftArchive, Shift.id.in_(archivable))
+            db.session.commit()
+
+
+def run_lifecycle():
+    """One pass of the shift lifecycle job; returns a dict of counts."""
+    config = current_app.config
+    batch_size = config['SHIFT_LIFECYCLE_BATCH_SIZE']
+    counts = {
+        'expired': expire_shifts(batch_size),
+        'rejected': reject_started_applications(batch_size),
+    }
+    counts['archived_shifts'], counts['archived_applications'] = archive_shifts(
+        config['SHIFT_ARCHIVE_AFTER_DAYS'], batch_size)
+    return counts
+
+
+def init_lifecycle(app):
+    """Run the lifecycle job every SHIFT_LIFECYCLE_INTERVAL seconds in a background thread.
+
+    The thread starts with the first request, so CLI commands don't start
+    it. Every pass is idempotent: each row is changed, and notified about,
+    by whichever pass's UPDATE gets to it first, so several workers (or a
+    `flask run-shift-lifecycle` alongside them) only repeat each other's
+    empty queries.
+    """
+    def run():
+        counts = run_lifecycle()
+        if any(counts.values()):
+            app.logger.info("Shift lifecycle: %s", counts)
+
+    run_periodically(app, 'shift-lifecycle', app.config['SHIFT_LIFECYCLE_INTERVAL'], run)
@@ -0,0 +1,36 @@
+# utils/loading.py
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import HospitalUser
+
+
+def load_shift_hospitals(shifts):
+    """Batch-load `shift.hospital` (and its profile) for a collection of shifts.
+
+    Rendering `shift.hospital.hospital_name` row by row lazy-loads one
+    hospital per shift. This issues at most two queries for the whole list
+    (hospitals, then their profiles) and attaches the results as if they had
+    been loaded by the relationship, so templates trigger no further SELECTs.
+    """
+    hospital_ids = {shift.hospital_id for shift in shifts if shift.hospital_id is not None}
+    if not hospital_ids:
+        return shifts
+
+    hospitals = (
+        HospitalUser.query
+        .options(selectinload(HospitalUser.profile))
+        .filter(HospitalUser.id.in_(hospital_ids))
+        .all()
+    )
+    by_id = {hospital.id: hospital for hospital in hospitals}
+    for shift in shifts:
+        set_committed_value(shift, 'hospital', by_id.get(shift.hospital_id))
+    return shifts
+
+
+def attach_hospital(shifts, hospital):
+    """Attach an already-loaded hospital to shifts known to belong to it (no queries)."""
+    for shift in shifts:
+        set_committed_value(shift, 'hospital', hospital)
+    return shifts
@@ -0,0 +1,287 @@
+# utils/matching.py
+import heapq
+import re
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import DoctorProfile, DoctorUser, Shift, ShiftApplication
+from utils.batching import chunked
+
+# Keyword patterns used to infer specialties from the free-text
+# DoctorProfile.qualifications field. Values match utils.shift_search.SPECIALTIES.
+# The basic degrees (MBBS, MD) are held by most specialists too, so they only
+# mean General Medicine when no other specialty matches.
+SPECIALTY_PATTERNS = [
+    ('Anesthesia', re.compile(r'an(a)?esth|\bda\b', re.I)),
+    ('Surgery', re.compile(r'surg|\bm\.?s\.?\b|\bfrcs\b|ortho', re.I)),
+    ('Pediatrics', re.compile(r'pa?ediat|\bdch\b|neonat', re.I)),
+    ('ICU/CCU', re.compile(r'\bicu\b|\bccu\b|critical care|intensiv|idccm|\bedic\b', re.I)),
+    ('Emergency Medicine', re.compile(r'emergency|\bem\b|casualty|\batls\b', re.I)),
+    ('Cardiology', re.compile(r'cardio|\bdm\b.*card', re.I)),
+    ('Orthopedics', re.compile(r'ortho', re.I)),
+    ('Nursing', re.compile(r'nurs|\bgnm\b|\bb\.?sc\.? n', re.I)),
+    ('General Medicine', re.compile(r'general medicine|internal medicine|physician|\bgp\b', re.I)),
+]
+GENERAL_FALLBACK = ('General Medicine', re.compile(r'mbbs|\bmd\b', re.I))
+
+SPECIALTY_SCORE = 50
+CITY_SCORE = 30
+MAX_EXPERIENCE_SCORE = 20
+
+
+def infer_specialties(qualifications):
+    if not qualifications:
+        return frozenset()
+    specialties = frozenset(name for name, pattern in SPECIALTY_PATTERNS if pattern.search(qualifications))
+    name, pattern = GENERAL_FALLBACK
+    if not specialties and pattern.search(qualifications):
+        return frozenset((name,))
+    return specialties
+
+
+class DoctorRecord:
+    __slots__ = ('id', 'name', 'years', 'city', 'specialties')
+
+    def __init__(self, id, name='', years=0, city=None, specialties=frozenset()):
+        self.id = id
+        self.name = name
+        self.years = years or 0
+        self.city = (city or '').strip().lower() or None
+        self.specialties = specialties
+
+
+class MatchingEngine:
+    """In-memory inverted index of doctors for ranking candidates for a shift.
+
+    Doctors are indexed by inferred specialty and by city; availability is
+    the set of dates each doctor already has an accepted shift on. The index
+    is built once per process and then kept current from ORM changes (see
+    the listeners at the end of this module), so scoring a shift only touches the doctors in its specialty
+    bucket instead of reloading the doctors table per request.
+
+    Score: +50 specialty match, +30 same city, +1 per year of experience
+    (capped at 20). Doctors booked on the shift's date are excluded.
+    """
+
+    def __init__(self):
+        self.doctors = {}
+        self.by_specialty = {}
+        self.by_city = {}
+        self.unspecified = set()
+        self.bookings = {}        # doctor_id -> {shift_id: shift_date}
+        self.busy_by_date = {}    # shift_date -> {doctor_id}
+        self._lock = threading.RLock()
+        self._pending = []        # committed application changes not yet applied, see queue_bookings
+        self._pending_lock = threading.Lock()
+
+    def _unindex(self, record):
+        for specialty in record.specialties:
+            self.by_specialty.get(specialty, set()).discard(record.id)
+        if not record.specialties:
+            self.unspecified.discard(record.id)
+        if record.city:
+            self.by_city.get(record.city, set()).discard(record.id)
+
+    def _index(self, record):
+        for specialty in record.specialties:
+            self.by_specialty.setdefault(specialty, set()).add(record.id)
+        if not record.specialties:
+            self.unspecified.add(record.id)
+        if record.city:
+            self.by_city.setdefault(record.city, set()).add(record.id)
+
+    def upsert_doctor(self, doctor_id, **fields):
+        """Insert or partially update a doctor: name, years, city, qualifications."""
+        with self._lock:
+            record = self.doctors.get(doctor_id)
+            if record is None:
+                record = self.doctors[doctor_id] = DoctorRecord(doctor_id)
+            else:
+                self._unindex(record)
+            if 'name' in fields:
+                record.name = fields['name']
+            if 'years' in fields:
+                record.years = fields['years'] or 0
+            if 'city' in fields:
+                record.city = (fields['city'] or '').strip().lower() or None
+            if 'qualifications' in fields:
+                record.specialties = infer_specialties(fields['qualifications'])
+            self._index(record)
+
+    def remove_doctor(self, doctor_id):
+        with self._lock:
+            record = self.doctors.pop(doctor_id, None)
+            if record is not None:
+                self._unindex(record)
+            for shift_date in self.bookings.pop(doctor_id, {}).values():
+                self.busy_by_date.get(shift_date, set()).discard(doctor_id)
+
+    def book(self, doctor_id, shift_id, shift_date):
+        with self._lock:
+            self.bookings.setdefault(doctor_id, {})[shift_id] = shift_date
+            if shift_date is not None:
+                self.busy_by_date.setdefault(shift_date, set()).add(doctor_id)
+
+    def unbook(self, doctor_id, shift_id):
+        with self._lock:
+            shift_date = self.bookings.get(doctor_id, {}).pop(shift_id, None)
+            if shift_date is not None and shift_date not in self.bookings[doctor_id].values():
+                self.busy_by_date.get(shift_date, set()).discard(doctor_id)
+
+    def score(self, record, specialty, city):
+        score = min(record.years, MAX_EXPERIENCE_SCORE)
+        if specialty and specialty in record.specialties:
+            score += SPECIALTY_SCORE
+        if city and record.city == city:
+            score += CITY_SCORE
+        return score
+
+    def _top(self, doctor_ids, specialty, city, limit):
+        doctors = self.doctors
+        ranked = heapq.nlargest(limit, ((self.score(doctors[doctor_id], specialty, city), doctor_id)
+                                        for doctor_id in doctor_ids))
+        return [(score, doctors[doctor_id]) for score, doctor_id in ranked]
+
+    def candidates(self, specialty, city=None, shift_date=None, limit=20):
+        """Top `limit` (score, DoctorRecord) pairs for a shift, best first.
+
+        Everyone in the shift's city outranks everyone outside it (the city
+        bonus exceeds the experience cap), so the city ∩ specialty bucket is
+        ranked first and the rest of the specialty bucket is only scanned
+        when that does not fill `limit`.
+        """
+        city = (city or '').strip().lower() or None
+        with self._lock:
+            # Unknown/'Other' specialty: anyone may apply, rank on city and experience.
+            pool = self.by_specialty.get(specialty)
+            busy = self.busy_by_date.get(shift_date, set()) if shift_date else set()
+            local = self.by_city.get(city, set()) if city else set()
+
+            nearby = (pool & local if pool is not None else set(local)) - busy
+            ranked = self._top(nearby, specialty, city, limit)
+            if len(ranked) < limit:
+                rest = pool if pool is not None else self.doctors.keys()
+                ranked += self._top((doctor_id for doctor_id in rest if doctor_id not in local and doctor_id not in busy),
+                                    specialty, city, limit - len(ranked))
+            return ranked
+
+    def candidates_for_shift(self, shift, limit=20):
+        profile = shift.hospital.profile if shift.hospital else None
+        return self.candidates(shift.specialty, profile.city if profile else None, shift.shift_date, limit)
+
+    def build(self):
+        """Load every doctor, profile and accepted application (one query each, plus chunked shift dates)."""
+        with self._lock:
+            for doctor in DoctorUser.query.with_entities(DoctorUser.id, DoctorUser.full_name,
+                                                         DoctorUser.years_of_experience):
+                self.upsert_doctor(doctor.id, name=doctor.full_name, years=doctor.years_of_experience)
+            for profile in DoctorProfile.query.with_entities(DoctorProfile.doctor_id, DoctorProfile.city,
+                                                             DoctorProfile.qualifications):
+                if profile.doctor_id in self.doctors:
+                    self.upsert_doctor(profile.doctor_id, city=profile.city, qualifications=profile.qualifications)
+            accepted = (ShiftApplication.query
+                        .with_entities(ShiftApplication.doctor_id, ShiftApplication.shift_id)
+                        .filter(ShiftApplication.status == 'Accepted').all())
+            self.apply_bookings([(doctor_id, shift_id, 'Accepted') for doctor_id, shift_id in accepted])
+        return self
+
+    def queue_bookings(self, changes):
+        """Hold committed application changes until the next lookup resolves their shift dates."""
+        with self._pending_lock:
+            self._pending.extend(changes)
+
+    def apply_pending(self):
+        with self._pending_lock:
+            changes, self._pending = self._pending, []
+        if changes:
+            self.apply_bookings(changes)
+
+    def apply_bookings(self, changes):
+        """Apply (doctor_id, shift_id, status) application changes, looking up shift dates in bulk."""
+        accepted = [(doctor_id, shift_id) for doctor_id, shift_id, status in changes if status == 'Accepted']
+        dates = {}
+        for chunk in chunked({shift_id for _, shift_id in accepted}):
+            dates.update(Shift.query.with_entities(Shift.id, Shift.shift_date).filter(Shift.id.in_(chunk)))
+        with self._lock:
+            for doctor_id, shift_id, status in changes:
+                if status == 'Accepted':
+                    self.book(doctor_id, shift_id, dates.get(shift_id))
+                else:
+                    self.unbook(doctor_id, shift_id)
+
+
+def get_matching_engine():
+    """The process-wide engine, built from the database on first use."""
+    engine = current_app.extensions.get('matching_engine')
+    if engine is None:
+        engine = current_app.extensions['matching_engine'] = MatchingEngine().build()
+    engine.apply_pending()
+    return engine
+
+
+# ORM change tracking. Doctor/profile edits and deletions are applied to a
+# built engine as soon as their transaction commits; accepted/withdrawn
+# applications need a shift date from the other database, so they are queued
+# on the engine and resolved in one query on the next lookup. Bulk Core
+# deletes (e.g. archiving) bypass these listeners.
+def _changes(session):
+    return session.info.setdefault('matching_changes', [])
+
+
+def _on_doctor(mapper, connection, target):
+    _changes(Session.object_session(target)).append(
+        ('doctor', target.id, {'name': target.full_name, 'years': target.years_of_experience}))
+
+
+def _on_profile(mapper, connection, target):
+    _changes(Session.object_session(target)).append(
+        ('doctor', target.doctor_id, {'city': target.city, 'qualifications': target.qualifications}))
+
+
+def _on_application(mapper, connection, target):
+    _changes(Session.object_session(target)).append(('application', target.doctor_id, target.shift_id, target.status))
+
+
+def _on_doctor_delete(mapper, connection, target):
+    _changes(Session.object_session(target)).append(('remove', target.id))
+
+
+def _on_profile_delete(mapper, connection, target):
+    _changes(Session.object_session(target)).append(
+        ('doctor', target.doctor_id, {'city': None, 'qualifications': None}))
+
+
+def _on_application_delete(mapper, connection, target):
+    _changes(Session.object_session(target)).append(('application', target.doctor_id, target.shift_id, None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_changes(session):
+    changes = session.info.pop('matching_changes', None)
+    if not changes or not has_app_context():
+        return
+    engine = current_app.extensions.get('matching_engine')
+    if engine is None:
+        return
+    for change in changes:
+        if change[0] == 'doctor':
+            engine.upsert_doctor(change[1], **change[2])
+        elif change[0] == 'remove':
+            engine.remove_doctor(change[1])
+    engine.queue_bookings([change[1:] for change in changes if change[0] == 'application'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('matching_changes', None)
+
+
+for _model, _listener in ((DoctorUser, _on_doctor), (DoctorProfile, _on_profile), (ShiftApplication, _on_application)):
+    event.listen(_model, 'after_insert', _listener)
+    event.listen(_model, 'after_update', _listener)
+for _model, _listener in ((DoctorUser, _on_doctor_delete), (DoctorProfile, _on_profile_delete),
+                          (ShiftApplication, _on_application_delete)):
+    event.listen(_model, 'after_delete', _listener)
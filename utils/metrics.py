@@ -0,0 +1,266 @@
+# utils/metrics.py
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import Response, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+from models import db
+from utils.encryption import operation_counts
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ('le',)
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(names, key + (f'{bound:g}',))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-2]:g}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class Metrics:
+    """Process-wide request, SQL, encryption and upload metrics in Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers; scrape every worker (or run
+    one worker per metrics target) to see them all. `collectors` are called
+    at scrape time for values other components already track, such as the
+    user and response cache statistics.
+    """
+
+    def __init__(self):
+        self.requests = Counter('http_requests_total', 'HTTP requests by endpoint, method and status.',
+                                ('endpoint', 'method', 'status'))
+        self.request_seconds = Histogram('http_request_duration_seconds', 'Time to produce a response.',
+                                         ('endpoint',))
+        self.queries = Counter('db_queries_total', 'SQL statements by bind and endpoint.', ('bind', 'endpoint'))
+        self.query_seconds = Counter('db_query_seconds_total', 'Time spent in SQL statements by bind and endpoint.',
+                                     ('bind', 'endpoint'))
+        self.uploads = Histogram('document_upload_duration_seconds', 'Time to push a document to storage.',
+                                 ('backend', 'outcome'), buckets=UPLOAD_BUCKETS)
+        self.collectors = []
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.request_seconds, self.queries, self.query_seconds, self.uploads):
+            lines.extend(metric.render())
+        for name, help, kind, values in self.collected():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def collected(self):
+        for collector in self.collectors:
+            yield from collector()
+
+
+def _bind_names(app):
+    with app.app_context():
+        return {engine: key or 'default' for key, engine in db.engines.items()}
+
+
+def init_metrics(app):
+    """Attach request timing, per-bind SQL accounting, /metrics, JSON request logs and the profiler hook."""
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    binds = _bind_names(app)
+
+    # The start time rides on the statement's execution context, which is
+    # dropped with the statement, so one that raises leaves nothing behind.
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        bind = binds.get(conn.engine, 'default')
+        endpoint = request.endpoint if has_request_context() else ''
+        metrics.queries.inc(bind=bind, endpoint=endpoint or '')
+        metrics.query_seconds.inc(elapsed, bind=bind, endpoint=endpoint or '')
+        if has_request_context():
+            stats = g.setdefault('db_stats', {})
+            count, seconds = stats.get(bind, (0, 0.0))
+            stats[bind] = (count + 1, seconds + elapsed)
+
+    for engine in binds:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    if app.config['LOG_JSON']:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        app.logger.handlers = [handler]
+        app.logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        # Profiling on request writes a file per request, so the header
+        # needs the metrics token; PROFILE_ENDPOINTS are chosen in config.
+        if app.config['PROFILER_ENABLED'] and ((request.headers.get('X-Profile') and _has_metrics_token())
+                                               or request.endpoint in app.config['PROFILE_ENDPOINTS']):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        metrics.requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.request_seconds.observe(elapsed, endpoint=endpoint)
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers['X-Profile-File'] = _save_profile(profiler, endpoint)
+
+        if app.config['LOG_JSON']:
+            app.logger.info('request', extra={'request': {
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 2),
+                'db': {bind: {'queries': count, 'ms': round(seconds * 1000, 2)}
+                       for bind, (count, seconds) in g.get('db_stats', {}).items()},
+                'encryption_ops': g.get('encryption_ops', 0),
+                'user': current_user.get_id() if current_user.is_authenticated else None,
+            }})
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        if not _has_metrics_token():
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    metrics.collectors.append(_encryption_collector)
+    return metrics
+
+
+def _has_metrics_token():
+    """True if the request carries "Authorization: Bearer <METRICS_TOKEN>"; always False while no token is set."""
+    token = current_app.config['METRICS_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def get_metrics():
+    return current_app.extensions.get('metrics')
+
+
+def _encryption_collector():
+    yield ('encryption_operations_total', 'Fernet operations performed by this process.', 'counter',
+           [({'operation': operation}, count) for operation, count in sorted(operation_counts().items())])
+
+
+def stats_collector(name, help, stats):
+    """Collector exporting each key of a `stats()` dict as `<name>{stat="<key>"}`."""
+    def collect():
+        yield name, help, 'gauge', [({'stat': key}, value) for key, value in sorted(stats().items())]
+    return collect
+
+
+def _save_profile(profiler, endpoint):
+    """Dump a request's cProfile stats to PROFILE_DIR and log the top functions; returns the file name."""
+    directory = current_app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    name = f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.prof"
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    top = [f"{func[2]} ({os.path.basename(func[0])}:{func[1]}) {stats.stats[func][3] * 1000:.1f}ms"
+           for func in stats.fcn_list[:15]]
+    current_app.logger.info("Profiled %s -> %s\n  %s", request.path, path, '\n  '.join(top))
+    return name
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per log line; request logs carry their fields under "request"."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if hasattr(record, 'request'):
+            entry.update(record.request)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,312 @@
+# utils/notifications.py
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from flask import current_app
+from sqlalchemy import func, insert, update
+
+from models import db, DoctorOutbox, DoctorUser, HospitalOutbox, HospitalUser
+from utils.background import run_periodically
+from utils.batching import chunked
+
+DOCTOR = 'doctor'
+HOSPITAL = 'hospital'
+
+NEW_APPLICANT = 'application.new'          # -> hospital
+APPLICATION_ACCEPTED = 'application.accepted'  # -> doctor
+APPLICATION_REJECTED = 'application.rejected'  # -> doctor
+APPLICATION_EXPIRED = 'application.expired'    # -> doctor, shift started while still Pending
+SHIFT_EXPIRED = 'shift.expired'            # -> hospital, shift date passed unfilled
+SHIFT_CLOSED = 'shift.closed'              # -> hospital, shift date passed with places still open
+
+SITE_NAME = 'TheLocum.in'
+DIGEST_LINES = 20  # a longer digest ends with "... and N more"
+OUTBOXES = (DoctorOutbox, HospitalOutbox)
+RECIPIENTS = {DOCTOR: DoctorUser, HOSPITAL: HospitalUser}
+
+
+# Writing: rows are added to the session (or inserted in bulk) by the code
+# making the change, before it commits, so the change and its notification
+# are committed together or not at all.
+
+def _row(recipient_type, recipient_id, kind, payload):
+    return {'recipient_type': recipient_type, 'recipient_id': recipient_id, 'kind': kind,
+            'payload': json.dumps(payload, default=str)}
+
+
+def notify(outbox, recipient_type, recipient_id, kind, **payload):
+    """Queue one notification in `outbox` (the model on the bind being changed); committed by the caller."""
+    if recipient_id is None:
+        return None
+    notification = outbox(**_row(recipient_type, recipient_id, kind, payload))
+    db.session.add(notification)
+    return notification
+
+
+def notify_many(outbox, rows):
+    """Queue (recipient_type, recipient_id, kind, payload) notifications with one bulk INSERT; committed by the caller."""
+    rows = [_row(*row) for row in rows if row[1] is not None]
+    for chunk in chunked(rows):
+        db.session.execute(insert(outbox), chunk)
+    return len(rows)
+
+
+# Rendering
+
+def _when(payload):
+    return payload.get('shift_date') or (payload.get('starts_at') or '')[:10] or 'an upcoming date'
+
+
+LINES = {
+    NEW_APPLICANT: lambda p: f"{p.get('doctor_name') or 'A doctor'} applied for {p.get('shift_title')} on {_when(p)}.",
+    APPLICATION_ACCEPTED: lambda p: f"{p.get('hospital_name') or 'The hospital'} accepted you for "
+                                    f"{p.get('shift_title')} on {_when(p)}.",
+    APPLICATION_REJECTED: lambda p: f"{p.get('hospital_name') or 'The hospital'} did not accept your application for "
+                                    f"{p.get('shift_title')} on {_when(p)}.",
+    APPLICATION_EXPIRED: lambda p: f"Your application for shift #{p.get('shift_id')} on {_when(p)} was closed "
+                                   "because the shift has started.",
+    SHIFT_EXPIRED: lambda p: f"{p.get('shift_title')} on {_when(p)} passed without being filled.",
+    SHIFT_CLOSED: lambda p: f"{p.get('shift_title')} on {_when(p)} has passed and was closed with "
+                            f"{p.get('booked')} doctor(s) booked.",
+}
+SUBJECTS = {
+    NEW_APPLICANT: 'New applicant',
+    APPLICATION_ACCEPTED: 'You got the shift',
+    APPLICATION_REJECTED: 'Application update',
+    APPLICATION_EXPIRED: 'Application closed',
+    SHIFT_EXPIRED: 'Shift expired unfilled',
+    SHIFT_CLOSED: 'Shift closed',
+}
+
+
+def render(name, notifications):
+    """(subject, body) for everything pending for one recipient: a single notice or a digest."""
+    lines = [LINES[kind](payload) for kind, payload in notifications[:DIGEST_LINES]]
+    if len(notifications) == 1:
+        subject = f"{SUBJECTS[notifications[0][0]]} - {SITE_NAME}"
+    else:
+        subject = f"{len(notifications)} updates - {SITE_NAME}"
+    if len(notifications) > DIGEST_LINES:
+        lines.append(f"... and {len(notifications) - DIGEST_LINES} more")
+    body = f"Hello {name},\n\n" + '\n'.join(f"- {line}" for line in lines) + f"\n\n{SITE_NAME}\n"
+    return subject, body
+
+
+# Transports. Each has send(to, subject, body) and raises on failure.
+# Register others (SMS gateways, a mail API...) with register_transport.
+
+class FileTransport:
+    """Writes each message as an .eml file; a local stand-in for development and tests."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, to, subject, body):
+        message = _email(current_app.config['NOTIFICATION_SENDER'], to, subject, body)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.eml"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), 'wb') as file:
+            file.write(bytes(message))
+
+
+class SMTPTransport:
+    """Sends through an SMTP server; point it at `python -m aiosmtpd -n -l localhost:1025` to debug."""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=False, timeout=10):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, to, subject, body):
+        message = _email(current_app.config['NOTIFICATION_SENDER'], to, subject, body)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+def _email(sender, to, subject, body):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    return message
+
+
+TRANSPORTS = {
+    'file': lambda config: FileTransport(config['NOTIFICATION_FILE_DIR']),
+    'smtp': lambda config: SMTPTransport(config['SMTP_HOST'], config['SMTP_PORT'], config['SMTP_USERNAME'],
+                                         config['SMTP_PASSWORD'], config['SMTP_USE_TLS']),
+}
+
+
+def register_transport(name, factory):
+    """Make NOTIFICATION_TRANSPORT = name use factory(app.config)."""
+    TRANSPORTS[name] = factory
+
+
+class NotificationDispatcher:
+    """Drains the outboxes in batches, one message per recipient.
+
+    A recipient's notifications wait until the oldest is
+    NOTIFICATION_COALESCE_SECONDS old, then everything pending for them goes
+    out as a single message (a digest when there are several). Rows are
+    claimed by pushing `next_attempt_at` out by a lease with a conditional
+    UPDATE, so several workers can drain at once without sending twice, and
+    rows claimed by a worker that died become due again when the lease
+    ends. A failed send is retried with exponential backoff up to
+    NOTIFICATION_MAX_ATTEMPTS, then marked Failed.
+    """
+
+    def __init__(self, app, transport=None):
+        config = app.config
+        self.transport = transport or TRANSPORTS[config['NOTIFICATION_TRANSPORT']](config)
+        self.batch_size = config['NOTIFICATION_BATCH_SIZE']
+        self.coalesce = timedelta(seconds=config['NOTIFICATION_COALESCE_SECONDS'])
+        self.lease = timedelta(seconds=config['NOTIFICATION_LEASE_SECONDS'])
+        self.retry_delay = config['NOTIFICATION_RETRY_DELAY']
+        self.max_attempts = config['NOTIFICATION_MAX_ATTEMPTS']
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {'sent': self.sent, 'failed': self.failed, 'retried': self.retried}
+
+    def drain(self, wait=True):
+        """Send everything that is due; returns the number of messages sent.
+
+        wait=False skips the coalescing wait and sends whatever is pending now.
+        """
+        sent = 0
+        for outbox in OUTBOXES:
+            while True:
+                batch = self._dispatch_batch(outbox, self.coalesce if wait else timedelta(0))
+                sent += batch
+                if not batch:
+                    break
+        return sent
+
+    def _due_recipients(self, outbox, now, coalesce):
+        return (db.session.query(outbox.recipient_type, outbox.recipient_id)
+                .filter(outbox.status == 'Pending', outbox.next_attempt_at <= now)
+                .group_by(outbox.recipient_type, outbox.recipient_id)
+                .having(func.min(outbox.created_at) <= now - coalesce)
+                .limit(self.batch_size).all())
+
+    def _claim(self, outbox, recipients, now):
+        """Lease the due rows of these recipients; returns {(type, id): [rows]} of what this worker got."""
+        lease = now + self.lease
+        claimed = defaultdict(list)
+        by_type = defaultdict(list)
+        for recipient_type, recipient_id in recipients:
+            by_type[recipient_type].append(recipient_id)
+        for recipient_type, ids in by_type.items():
+            for chunk in chunked(ids):
+                db.session.execute(
+                    update(outbox)
+                    .where(outbox.status == 'Pending', outbox.next_attempt_at <= now,
+                           outbox.recipient_type == recipient_type, outbox.recipient_id.in_(chunk))
+                    .values(next_attempt_at=lease, attempts=outbox.attempts + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+                rows = (outbox.query
+                        .filter(outbox.status == 'Pending', outbox.next_attempt_at == lease,
+                                outbox.recipient_type == recipient_type, outbox.recipient_id.in_(chunk))
+                        .order_by(outbox.id))
+                for row in rows:
+                    claimed[(row.recipient_type, row.recipient_id)].append(row)
+        return claimed
+
+    def _addresses(self, keys):
+        """{(type, id): (name, email)} for the recipients, one IN query per type and chunk."""
+        addresses = {}
+        by_type = defaultdict(list)
+        for recipient_type, recipient_id in keys:
+            by_type[recipient_type].append(recipient_id)
+        for recipient_type, ids in by_type.items():
+            model = RECIPIENTS[recipient_type]
+            name = model.full_name if model is DoctorUser else model.hospital_name
+            for chunk in chunked(ids):
+                for user_id, user_name, email in (db.session.query(model.id, name, model.email)
+                                                  .filter(model.id.in_(chunk))):
+                    addresses[(recipient_type, user_id)] = (user_name, email)
+        return addresses
+
+    def _dispatch_batch(self, outbox, coalesce):
+        now = datetime.utcnow()
+        recipients = self._due_recipients(outbox, now, coalesce)
+        if not recipients:
+            return 0
+        claimed = self._claim(outbox, recipients, now)
+        addresses = self._addresses(claimed)
+        sent = 0
+        for key, rows in claimed.items():
+            ids = [row.id for row in rows]
+            address = addresses.get(key)
+            try:
+                if address is None:
+                    raise LookupError(f"No {key[0]} {key[1]}")
+                subject, body = render(address[0], [(row.kind, json.loads(row.payload)) for row in rows])
+                self.transport.send(address[1], subject, body)
+            except Exception as error:
+                self._failed(outbox, rows, error)
+                continue
+            self._mark(outbox, ids, status='Sent', sent_at=datetime.utcnow(), last_error=None)
+            sent += 1
+        with self._lock:
+            self.sent += sent
+        return sent
+
+    def _failed(self, outbox, rows, error):
+        attempts = max(row.attempts for row in rows)
+        message = f"{type(error).__name__}: {error}"[:1000]
+        if attempts >= self.max_attempts:
+            self._mark(outbox, [row.id for row in rows], status='Failed', last_error=message)
+            current_app.logger.error("Giving up on %d notification(s) after %d attempts: %s",
+                                     len(rows), attempts, message)
+            with self._lock:
+                self.failed += len(rows)
+            return
+        retry_at = datetime.utcnow() + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+        self._mark(outbox, [row.id for row in rows], next_attempt_at=retry_at, last_error=message)
+        current_app.logger.warning("Notification send failed (attempt %d), retrying at %s: %s",
+                                   attempts, retry_at, message)
+        with self._lock:
+            self.retried += len(rows)
+
+    def _mark(self, outbox, ids, **values):
+        for chunk in chunked(ids):
+            db.session.execute(update(outbox).where(outbox.id.in_(chunk)).values(**values)
+                               .execution_options(synchronize_session=False))
+        db.session.commit()
+
+
+def init_notifications(app, transport=None):
+    """Create the dispatcher; with NOTIFICATION_POLL_INTERVAL set it drains in a background thread.
+
+    Like the lifecycle job, the thread starts with the first request so CLI
+    commands don't start one.
+    """
+    dispatcher = NotificationDispatcher(app, transport)
+    app.extensions['notifications'] = dispatcher
+    run_periodically(app, 'notifications', app.config['NOTIFICATION_POLL_INTERVAL'], dispatcher.drain)
+    return dispatcher
+
+
+def get_dispatcher():
+    return current_app.extensions['notifications']
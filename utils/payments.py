@@ -0,0 +1,244 @@
+# utils/payments.py
+import csv
+import io
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import and_, delete, event, inspect, insert, or_, update
+from sqlalchemy.orm import Session, joinedload
+
+from models import db, DoctorMonthlyEarnings, HospitalMonthlyPayouts, Shift, ShiftApplication
+from utils.applications import ApplicationRow, load_shifts
+from utils.batching import CHUNK_SIZE, chunked
+from utils.roster import duration_hours
+from utils.shift_search import decode_cursor, encode_cursor
+from utils.upsert import upsert
+
+UNPAID = 'Pending'
+PAID = 'Paid'
+
+
+def shift_earnings(shift):
+    """What one accepted doctor earns for a shift: rate x hours when Hourly, else the fixed rate."""
+    rate = shift.pay_rate or 0
+    if shift.pay_type == 'Hourly':
+        hours = shift.duration_hours
+        if hours is None and shift.start_time and shift.end_time:
+            hours = duration_hours(shift.start_time, shift.end_time)
+        return round(rate * (hours or 0), 2)
+    return round(rate, 2)
+
+
+def month_of(shift):
+    return (shift.shift_date or date.today()).replace(day=1)
+
+
+def _contribution(status, payment_status, amount):
+    """(shifts, earned, paid) an application adds to its monthly summaries."""
+    if status != 'Accepted':
+        return 0, 0.0, 0.0
+    amount = amount or 0.0
+    return 1, amount, amount if payment_status == PAID else 0.0
+
+
+def _previous(application, name):
+    history = inspect(application).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(application, name)
+
+
+# Monthly summaries are maintained incrementally: every flush that inserts,
+# updates or deletes applications adds the difference each one makes to its
+# doctor's and hospital's row for the shift's month, in the same transaction.
+# The no-op `set` listeners make the ORM load the previous value when one of
+# these is assigned on an expired instance, so the flush can tell what changed.
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for _attribute in (ShiftApplication.status, ShiftApplication.payment_status, ShiftApplication.payment_amount):
+    event.listen(_attribute, 'set', _keep_old_value, active_history=True)
+
+
+@event.listens_for(Session, 'before_flush')
+def _update_summaries(session, flush_context, instances):
+    changes = []
+    for application in session.new:
+        if isinstance(application, ShiftApplication):
+            changes.append((application, (0, 0.0, 0.0), False))
+    for application in list(session.dirty) + list(session.deleted):
+        if isinstance(application, ShiftApplication):
+            before = _contribution(_previous(application, 'status'), _previous(application, 'payment_status'),
+                                   _previous(application, 'payment_amount'))
+            changes.append((application, before, application in session.deleted))
+    changes = [change for change in changes if change[0].status == 'Accepted' or change[1][0]]
+    if not changes:
+        return
+
+    shift_ids = {application.shift_id for application, _, _ in changes}
+    shifts = {}
+    for chunk in chunked(shift_ids):
+        shifts.update((shift.id, shift) for shift in Shift.query.filter(Shift.id.in_(chunk)))
+
+    by_doctor = defaultdict(lambda: [0, 0.0, 0.0])
+    by_hospital = defaultdict(lambda: [0, 0.0, 0.0])
+    for application, before, deleted in changes:
+        shift = shifts.get(application.shift_id)
+        if shift is None:
+            continue
+        if application.status == 'Accepted' and application.payment_amount is None:
+            application.payment_amount = shift_earnings(shift)
+        after = (0, 0.0, 0.0) if deleted else _contribution(application.status, application.payment_status,
+                                                             application.payment_amount)
+        delta = [new - old for new, old in zip(after, before)]
+        if not any(delta):
+            continue
+        month = month_of(shift)
+        for totals, key in ((by_doctor, (application.doctor_id, month)), (by_hospital, (shift.hospital_id, month))):
+            totals[key] = [total + change for total, change in zip(totals[key], delta)]
+
+    _add_to_summaries(session, DoctorMonthlyEarnings, 'doctor_id', by_doctor)
+    _add_to_summaries(session, HospitalMonthlyPayouts, 'hospital_id', by_hospital)
+
+
+def _add_to_summaries(session, model, owner, deltas):
+    """Add (shifts, earned, paid) deltas to summary rows, creating missing rows."""
+    for (owner_id, month), (shifts, earned, paid) in deltas.items():
+        upsert(session, model, {owner: owner_id, 'month': month, 'shifts': shifts, 'earned': earned, 'paid': paid},
+               keys=(owner, 'month'), add=('shifts', 'earned', 'paid'))
+
+
+def mark_paid(application):
+    """Record an accepted application's payment as made; returns False if there was nothing to pay."""
+    if application.status != 'Accepted' or application.payment_status == PAID:
+        return False
+    application.payment_status = PAID
+    db.session.commit()
+    return True
+
+
+def monthly_summary(model, owner_id, months=12):
+    """The latest `months` summary rows for a doctor (DoctorMonthlyEarnings) or hospital (HospitalMonthlyPayouts)."""
+    owner = model.doctor_id if model is DoctorMonthlyEarnings else model.hospital_id
+    return model.query.filter(owner == owner_id).order_by(model.month.desc()).limit(months).all()
+
+
+def _accepted(doctor_id, cursor=None):
+    query = ShiftApplication.query.filter(
+        ShiftApplication.doctor_id == doctor_id,
+        ShiftApplication.status == 'Accepted',
+        ShiftApplication.starts_at.isnot(None),
+    )
+    position = decode_cursor(cursor, 'newest')  # (starts_at, id)
+    if position:
+        starts_at, application_id = position
+        query = query.filter(or_(ShiftApplication.starts_at < starts_at,
+                                 and_(ShiftApplication.starts_at == starts_at, ShiftApplication.id < application_id)))
+    return query.order_by(ShiftApplication.starts_at.desc(), ShiftApplication.id.desc())
+
+
+def payout_history(doctor_id, cursor=None, page_size=25):
+    """One page of a doctor's accepted shifts and their payments, newest shift first.
+
+    Returns (rows, next_cursor); a keyset page on (starts_at, id) served by
+    ix_shift_applications_doctor_status_starts.
+    """
+    applications = _accepted(doctor_id, cursor).limit(page_size + 1).all()
+    next_cursor = None
+    if len(applications) > page_size:
+        applications = applications[:page_size]
+        last = applications[-1]
+        next_cursor = encode_cursor(last.starts_at, last.id)
+    shifts = load_shifts(application.shift_id for application in applications)
+    return [ApplicationRow(application, shift=shifts.get(application.shift_id)) for application in applications], next_cursor
+
+
+def iter_doctor_payouts(doctor_id):
+    """All of a doctor's payout rows, fetched CHUNK_SIZE at a time."""
+    cursor = None
+    while True:
+        rows, cursor = payout_history(doctor_id, cursor, page_size=CHUNK_SIZE)
+        yield from rows
+        if cursor is None:
+            return
+
+
+def iter_hospital_payouts(hospital_id):
+    """Accepted applications on a hospital's shifts, one chunk of shifts at a time, with the doctor loaded."""
+    last_id = 0
+    while True:
+        shifts = (Shift.query.filter(Shift.hospital_id == hospital_id, Shift.id > last_id)
+                  .order_by(Shift.id).limit(CHUNK_SIZE).all())
+        if not shifts:
+            return
+        by_id = {shift.id: shift for shift in shifts}
+        applications = (
+            ShiftApplication.query
+            .options(joinedload(ShiftApplication.doctor))
+            .filter(ShiftApplication.shift_id.in_(by_id), ShiftApplication.status == 'Accepted')
+            .order_by(ShiftApplication.shift_id, ShiftApplication.id)
+        )
+        for application in applications:
+            yield ApplicationRow(application, shift=by_id[application.shift_id], doctor=application.doctor)
+        last_id = shifts[-1].id
+
+
+def csv_lines(header, rows):
+    """Encode rows as CSV one line at a time, for a streamed response."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def rebuild_summaries():
+    """Fill in missing payment amounts and recompute both summary tables from the applications.
+
+    Uses bulk statements, which bypass the flush listener above, so nothing
+    is counted twice. Returns the number of accepted applications seen.
+    """
+    by_doctor = defaultdict(lambda: [0, 0.0, 0.0])
+    by_hospital = defaultdict(lambda: [0, 0.0, 0.0])
+    amounts = []
+    count = 0
+    last_id = 0
+    while True:
+        applications = (ShiftApplication.query
+                        .filter(ShiftApplication.status == 'Accepted', ShiftApplication.id > last_id)
+                        .order_by(ShiftApplication.id).limit(CHUNK_SIZE).all())
+        if not applications:
+            break
+        shifts = {shift.id: shift for shift in
+                  Shift.query.filter(Shift.id.in_({application.shift_id for application in applications}))}
+        for application in applications:
+            shift = shifts.get(application.shift_id)
+            if shift is None:
+                continue
+            amount = application.payment_amount
+            if amount is None:
+                amount = shift_earnings(shift)
+                amounts.append({'id': application.id, 'payment_amount': amount})
+            contribution = _contribution('Accepted', application.payment_status, amount)
+            month = month_of(shift)
+            for totals, key in ((by_doctor, (application.doctor_id, month)), (by_hospital, (shift.hospital_id, month))):
+                totals[key] = [total + change for total, change in zip(totals[key], contribution)]
+            count += 1
+        last_id = applications[-1].id
+
+    db.session.expunge_all()
+    for chunk in chunked(amounts):
+        db.session.execute(update(ShiftApplication), chunk)
+    for model, owner, totals in ((DoctorMonthlyEarnings, 'doctor_id', by_doctor),
+                                 (HospitalMonthlyPayouts, 'hospital_id', by_hospital)):
+        db.session.execute(delete(model))
+        rows = [{owner: owner_id, 'month': month, 'shifts': shifts, 'earned': earned, 'paid': paid}
+                for (owner_id, month), (shifts, earned, paid) in totals.items()]
+        for chunk in chunked(rows):
+            db.session.execute(insert(model), chunk)
+    db.session.commit()
+    return count
@@ -0,0 +1,46 @@
+# utils/query_budget.py
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def init_query_budget(app):
+    """Count SQL statements per request across all binds and enforce per-view budgets.
+
+    Enabled by QUERY_BUDGET_ENABLED (defaults to on in debug and testing).
+    A view listed in QUERY_BUDGETS that issues more queries than its budget
+    raises QueryBudgetExceeded under TESTING and logs a warning otherwise,
+    so N+1 regressions surface in the test suite and the dev server.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def check_query_budget(response):
+        enabled = current_app.config.get('QUERY_BUDGET_ENABLED')
+        if enabled is None:
+            enabled = current_app.debug or current_app.testing
+        if not enabled:
+            return response
+
+        count = g.get('query_count', 0)
+        response.headers['X-Query-Count'] = str(count)
+
+        budget = current_app.config['QUERY_BUDGETS'].get(request.endpoint)
+        if budget is not None and count > budget:
+            message = f"{request.endpoint} issued {count} queries (budget {budget})"
+            if current_app.testing:
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message)
+        return response
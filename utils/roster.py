@@ -0,0 +1,277 @@
+# utils/roster.py
+import codecs
+import csv
+import json
+from datetime import datetime as dt, timedelta
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, DoctorUser, Shift, ShiftApplication
+from utils.applications import booked_overlaps_batch
+from utils.batching import chunked
+from utils.scheduling import get_scheduler, interval_for
+from utils.shift_search import SPECIALTIES
+
+PAY_TYPES = ('Fixed', 'Hourly')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+MAX_REPORTED_ERRORS = 1000
+
+
+def duration_hours(start_time, end_time):
+    """Length of a shift in hours; an end time before the start means it runs past midnight."""
+    start = dt.combine(dt.min, start_time)
+    end = dt.combine(dt.min, end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return round((end - start).total_seconds() / 3600, 2)
+
+
+def parse_shift_row(row):
+    """Validate one shift (form, CSV row or JSON object). Returns (values, errors).
+
+    Dates and times use the same formats as the create-shift form:
+    YYYY-MM-DD and HH:MM.
+    """
+    errors = []
+
+    def text(name, required=False):
+        value = row.get(name)
+        value = str(value).strip() if value is not None else ''
+        if required and not value:
+            errors.append(f"{name} is required")
+        return value
+
+    def parse(name, fmt, example, convert):
+        value = text(name, required=True)
+        if not value:
+            return None
+        try:
+            return convert(dt.strptime(value, fmt))
+        except ValueError:
+            errors.append(f"{name} must look like {example}")
+            return None
+
+    title = text('title', required=True)
+    specialty = text('specialty', required=True)
+    if specialty and specialty not in SPECIALTIES:
+        errors.append(f"specialty must be one of: {', '.join(SPECIALTIES)}")
+
+    shift_date = parse('shift_date', '%Y-%m-%d', 'YYYY-MM-DD', lambda value: value.date())
+    start_time = parse('start_time', '%H:%M', 'HH:MM', lambda value: value.time())
+    end_time = parse('end_time', '%H:%M', 'HH:MM', lambda value: value.time())
+
+    pay_rate = None
+    raw_pay = text('pay_rate', required=True)
+    if raw_pay:
+        try:
+            pay_rate = float(raw_pay)
+            if pay_rate < 0:
+                raise ValueError
+        except ValueError:
+            errors.append("pay_rate must be a positive number")
+
+    pay_type = text('pay_type') or 'Fixed'
+    if pay_type not in PAY_TYPES:
+        errors.append(f"pay_type must be one of: {', '.join(PAY_TYPES)}")
+
+    capacity = None
+    raw_capacity = text('capacity')
+    if raw_capacity:
+        try:
+            capacity = int(raw_capacity)
+            if capacity < 1:
+                raise ValueError
+        except ValueError:
+            errors.append("capacity must be a whole number of at least 1")
+
+    is_urgent = row.get('is_urgent')
+    if not isinstance(is_urgent, bool):
+        is_urgent = str(is_urgent or '').strip().lower() in TRUE_VALUES
+
+    if errors:
+        return None, errors
+    return {
+        'title': title,
+        'specialty': specialty,
+        'shift_date': shift_date,
+        'start_time': start_time,
+        'end_time': end_time,
+        'duration_hours': duration_hours(start_time, end_time),
+        'pay_rate': pay_rate,
+        'pay_type': pay_type,
+        'location_ward': text('location_ward'),
+        'requirements': text('requirements'),
+        'is_urgent': is_urgent,
+        'capacity': capacity,
+    }, []
+
+
+def read_rows(file):
+    """Yield dict rows from an uploaded CSV, JSON array or JSON Lines file.
+
+    CSV and JSON Lines are decoded incrementally from the upload stream, so
+    a large roster is never held in memory as a whole. A JSON Lines row that
+    does not parse is yielded as its ValueError so it can be reported
+    against its row number.
+    """
+    name = (file.filename or '').lower()
+    if name.endswith('.csv'):
+        reader = codecs.getreader('utf-8-sig')(file.stream)
+        yield from csv.DictReader(reader)
+        return
+
+    stream = codecs.getreader('utf-8-sig')(file.stream)
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if first == '[':
+        # A JSON array has to be parsed in one go.
+        rows = json.loads(first + stream.read())
+        yield from rows
+        return
+    pending = first
+    for line in stream:
+        line = (pending + line).strip()
+        pending = ''
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield error
+
+
+class RosterImport:
+    """Validate rows and insert the valid ones in batched transactions.
+
+    Invalid rows are skipped and reported with their 1-based row number;
+    each batch of `batch_size` valid rows is one executemany INSERT and one
+    commit.
+
+    A row may name a `doctor_id` the hospital has already booked for the
+    shift. Those rows are checked as a batch against the doctor's accepted
+    shifts, in the database as well as in the in-process index (which may
+    not yet have bookings made by another worker), and against earlier rows
+    in the roster (utils/scheduling.py). They are created with an Accepted
+    application for the doctor.
+
+    Shifts (hospitals.db) and their bookings (doctors.db) cannot share a
+    transaction: each batch commits its shifts, then the bookings. If the
+    bookings fail to commit, the batch's assigned shifts are deleted again
+    and those rows reported as failed, so importing them again does not
+    duplicate them. Only a crash between the two commits can leave assigned
+    shifts without their booking.
+    """
+
+    def __init__(self, hospital_id, batch_size=500):
+        self.hospital_id = hospital_id
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+        self._batch = []  # (row number, shift values, assigned doctor id or None)
+
+    def add(self, number, row):
+        if isinstance(row, ValueError):
+            self._error(number, [f"invalid JSON: {row}"])
+            return
+        if not isinstance(row, dict):
+            self._error(number, ["row must be an object"])
+            return
+        values, errors = parse_shift_row(row)
+        doctor_id = str(row.get('doctor_id') or '').strip() or None
+        if doctor_id is not None:
+            try:
+                doctor_id = int(doctor_id)
+            except ValueError:
+                errors.append("doctor_id must be a whole number")
+        if errors:
+            self._error(number, errors)
+            return
+        values['hospital_id'] = self.hospital_id
+        self._batch.append((number, values, doctor_id))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def _error(self, number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def _check_assignments(self, batch):
+        """Drop (and report) assigned rows for unknown or double-booked doctors."""
+        assigned = [(number, values, doctor_id) for number, values, doctor_id in batch if doctor_id is not None]
+        if not assigned:
+            return batch
+        doctor_ids = {doctor_id for _, _, doctor_id in assigned}
+        known = {doctor_id for doctor_id, in db.session.query(DoctorUser.id).filter(DoctorUser.id.in_(doctor_ids))}
+        bookings = []
+        for number, values, doctor_id in assigned:
+            values['starts_at'], values['ends_at'] = interval_for(values)
+            if doctor_id in known:
+                bookings.append((doctor_id, values['starts_at'], values['ends_at'], number))
+        # The database first, so a row it rules out cannot shadow a later row in the batch check.
+        conflicts = {number: (shift_ids, ()) for number, shift_ids in booked_overlaps_batch(bookings).items()}
+        conflicts.update(get_scheduler().check_batch([booking for booking in bookings if booking[3] not in conflicts]))
+
+        accepted = []
+        for number, values, doctor_id in batch:
+            if doctor_id is not None and doctor_id not in known:
+                self._error(number, [f"doctor {doctor_id} does not exist"])
+            elif number in conflicts:
+                booked, earlier = conflicts[number]
+                if booked:
+                    message = f"doctor {doctor_id} is already booked for an overlapping shift"
+                else:
+                    message = f"doctor {doctor_id} is also booked on overlapping row {earlier[0]}"
+                self._error(number, [message])
+            else:
+                accepted.append((number, values, doctor_id))
+        return accepted
+
+    def flush(self):
+        batch, self._batch = self._check_assignments(self._batch), []
+        if not batch:
+            return
+        rows = []
+        for _, values, doctor_id in batch:
+            row = {key: value for key, value in values.items() if key not in ('starts_at', 'ends_at')}
+            # Every row needs the same keys for a single executemany.
+            row['applications_count'] = 0 if doctor_id is None else 1
+            row['status'] = 'Filled' if doctor_id is not None and row['capacity'] == 1 else 'Open'
+            rows.append(row)
+        shift_ids = db.session.scalars(insert(Shift).returning(Shift.id, sort_by_parameter_order=True), rows).all()
+        db.session.commit()
+
+        assigned = [(number, shift_id, values, doctor_id)
+                    for (number, values, doctor_id), shift_id in zip(batch, shift_ids) if doctor_id is not None]
+        unbooked = 0
+        if assigned:
+            try:
+                db.session.add_all([ShiftApplication(doctor_id=doctor_id, shift_id=shift_id, status='Accepted',
+                                                     starts_at=values['starts_at'], ends_at=values['ends_at'])
+                                    for _, shift_id, values, doctor_id in assigned])
+                db.session.commit()
+            except SQLAlchemyError as error:
+                db.session.rollback()
+                unbooked = self._unbook(assigned, error)
+        self.created += len(batch) - unbooked
+
+    def _unbook(self, assigned, error):
+        """Delete the shifts whose bookings failed to commit and report their rows; returns how many."""
+        for chunk in chunked([shift_id for _, shift_id, _, _ in assigned]):
+            db.session.execute(delete(Shift).where(Shift.id.in_(chunk)).execution_options(synchronize_session=False))
+        db.session.commit()
+        reason = str(getattr(error, 'orig', None) or error)
+        for number, _, _, doctor_id in assigned:
+            self._error(number, [f"could not book doctor {doctor_id}: {reason}"])
+        return len(assigned)
+
+    def run(self, rows):
+        for number, row in enumerate(rows, start=1):
+            self.add(number, row)
+        self.flush()
+        return self.report()
+
+    def report(self):
+        return {'created': self.created, 'failed': self.error_count, 'errors': self.errors}
@@ -0,0 +1,204 @@
+# utils/scheduling.py
+import bisect
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import ShiftApplication
+
+
+def shift_interval(shift_date, start_time, end_time, tz):
+    """[start, end) of a shift as naive UTC datetimes, or None if a part is missing.
+
+    Times are wall-clock times in `tz`. An end time at or before the start
+    time means the shift runs past midnight into the next day.
+    """
+    if shift_date is None or start_time is None or end_time is None:
+        return None
+    start = datetime.combine(shift_date, start_time, tzinfo=tz)
+    end_date = shift_date if end_time > start_time else shift_date + timedelta(days=1)
+    end = datetime.combine(end_date, end_time, tzinfo=tz)
+    return _utc(start), _utc(end)
+
+
+def _utc(value):
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def interval_for(shift):
+    """UTC interval of a Shift (or a dict of shift values) in the configured SHIFT_TIMEZONE."""
+    get = shift.get if isinstance(shift, dict) else lambda name: getattr(shift, name)
+    return shift_interval(get('shift_date'), get('start_time'), get('end_time'),
+                          ZoneInfo(current_app.config['SHIFT_TIMEZONE']))
+
+
+class IntervalIndex:
+    """Half-open [start, end) intervals grouped by key, each group sorted by start.
+
+    An overlap query bisects to the first interval starting at or after the
+    query's end and walks back only as far as the group's longest interval
+    could reach. For a doctor's bookings, which do not overlap each other,
+    that is one or two entries past the O(log n) bisect.
+    """
+
+    def __init__(self):
+        self._starts = {}   # key -> [start, ...]
+        self._entries = {}  # key -> [(start, end, item), ...] in the same order
+        self._longest = {}  # key -> longest interval ever added (an upper bound after removals)
+        self._spans = {}    # (key, item) -> (start, end)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def add(self, key, start, end, item):
+        self.remove(key, item)
+        starts = self._starts.setdefault(key, [])
+        position = bisect.bisect_right(starts, start)
+        starts.insert(position, start)
+        self._entries.setdefault(key, []).insert(position, (start, end, item))
+        self._spans[(key, item)] = (start, end)
+        if end - start > self._longest.get(key, timedelta(0)):
+            self._longest[key] = end - start
+
+    def remove(self, key, item):
+        span = self._spans.pop((key, item), None)
+        if span is None:
+            return
+        starts, entries = self._starts[key], self._entries[key]
+        position = bisect.bisect_left(starts, span[0])
+        while entries[position][2] != item:
+            position += 1
+        del starts[position]
+        del entries[position]
+
+    def overlapping(self, key, start, end):
+        """Items in `key`'s group whose interval overlaps [start, end)."""
+        starts = self._starts.get(key)
+        if not starts:
+            return []
+        entries = self._entries[key]
+        reach = start - self._longest[key]
+        found = []
+        position = bisect.bisect_left(starts, end)
+        while position > 0:
+            position -= 1
+            entry_start, entry_end, item = entries[position]
+            if entry_start <= reach:
+                break
+            if entry_end > start:
+                found.append(item)
+        return found
+
+
+class Scheduler:
+    """Accepted shifts per doctor, for double-booking checks.
+
+    The index is keyed by doctor id with shift ids as items, built from the
+    UTC spans stored on accepted applications and kept current from ORM
+    changes (see the listeners at the end of this module). Other workers'
+    acceptances only reach this process's index once it is rebuilt, so
+    utils.applications.decide_application repeats the check in SQL before
+    committing an acceptance.
+    """
+
+    def __init__(self):
+        self.index = IntervalIndex()
+        self._lock = threading.RLock()
+
+    def build(self):
+        """Load every accepted application that has a stored interval (one query)."""
+        rows = (ShiftApplication.query
+                .with_entities(ShiftApplication.doctor_id, ShiftApplication.shift_id,
+                               ShiftApplication.starts_at, ShiftApplication.ends_at)
+                .filter(ShiftApplication.status == 'Accepted', ShiftApplication.starts_at.isnot(None)))
+        with self._lock:
+            for doctor_id, shift_id, starts_at, ends_at in rows:
+                self.index.add(doctor_id, starts_at, ends_at, shift_id)
+        return self
+
+    def book(self, doctor_id, shift_id, starts_at, ends_at):
+        with self._lock:
+            self.index.add(doctor_id, starts_at, ends_at, shift_id)
+
+    def unbook(self, doctor_id, shift_id):
+        with self._lock:
+            self.index.remove(doctor_id, shift_id)
+
+    def conflicts(self, doctor_id, starts_at, ends_at, exclude=None):
+        """Ids of the doctor's accepted shifts overlapping [starts_at, ends_at)."""
+        with self._lock:
+            found = self.index.overlapping(doctor_id, starts_at, ends_at)
+        return [shift_id for shift_id in found if shift_id != exclude]
+
+    def check_batch(self, bookings):
+        """Validate (doctor_id, starts_at, ends_at, key) bookings as a whole, in order.
+
+        Each booking is checked against the accepted shifts and against the
+        bookings before it in the batch that passed, so the first of two
+        overlapping rows wins. Returns {key: (booked shift ids, earlier keys)}
+        for the bookings that conflict; the index itself is not changed.
+        """
+        staged = IntervalIndex()
+        conflicts = {}
+        with self._lock:
+            for doctor_id, starts_at, ends_at, key in bookings:
+                booked = self.index.overlapping(doctor_id, starts_at, ends_at)
+                earlier = staged.overlapping(doctor_id, starts_at, ends_at)
+                if booked or earlier:
+                    conflicts[key] = (booked, earlier)
+                else:
+                    staged.add(doctor_id, starts_at, ends_at, key)
+        return conflicts
+
+
+def get_scheduler():
+    """The process-wide scheduler, built from the database on first use."""
+    scheduler = current_app.extensions.get('scheduler')
+    if scheduler is None:
+        scheduler = current_app.extensions['scheduler'] = Scheduler().build()
+    return scheduler
+
+
+# ORM change tracking: application rows written in a transaction are
+# applied to a built scheduler once it commits.
+
+def _changes(session):
+    return session.info.setdefault('scheduling_changes', [])
+
+
+def _on_application(mapper, connection, target):
+    _changes(Session.object_session(target)).append(
+        (target.doctor_id, target.shift_id, target.status, target.starts_at, target.ends_at))
+
+
+def _on_application_delete(mapper, connection, target):
+    _changes(Session.object_session(target)).append((target.doctor_id, target.shift_id, None, None, None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_changes(session):
+    changes = session.info.pop('scheduling_changes', None)
+    if not changes or not has_app_context():
+        return
+    scheduler = current_app.extensions.get('scheduler')
+    if scheduler is None:
+        return
+    for doctor_id, shift_id, status, starts_at, ends_at in changes:
+        if status == 'Accepted' and starts_at is not None:
+            scheduler.book(doctor_id, shift_id, starts_at, ends_at)
+        else:
+            scheduler.unbook(doctor_id, shift_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('scheduling_changes', None)
+
+
+event.listen(ShiftApplication, 'after_insert', _on_application)
+event.listen(ShiftApplication, 'after_update', _on_application)
+event.listen(ShiftApplication, 'after_delete', _on_application_delete)
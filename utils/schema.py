@@ -0,0 +1,180 @@
+# utils/schema.py
+import hashlib
+import threading
+from datetime import datetime
+
+from flask import Response, current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.schema import CreateColumn
+
+from models import db
+from utils.applications import remove_duplicate_applications
+from utils.fulltext import ensure_fulltext, init_fulltext
+from utils.geo import detect_rtree, ensure_geo
+
+# One row per database: the fingerprint of the models it was last upgraded to.
+VERSION_TABLE = 'schema_version'
+
+
+class SchemaUpgradeError(RuntimeError):
+    """The upgrade could not be completed; the schema version is left as it was."""
+
+
+def _remove_duplicate_applications(conn):
+    removed = remove_duplicate_applications(conn)
+    if removed:
+        current_app.logger.warning("Removed %d duplicate shift application(s); run `flask "
+                                   "rebuild-payment-summaries` if any of them were accepted", removed)
+
+
+# Unique indexes that existing data may violate, and how to clean the table
+# up so they can be built. Called inside the transaction that creates the index.
+UNIQUE_INDEX_CLEANUPS = {
+    'uq_shift_applications_doctor_shift': _remove_duplicate_applications,
+}
+
+
+def ensure_columns():
+    """Add columns declared on the models that are missing from existing tables.
+
+    Only nullable or defaulted columns can be added this way; a scalar
+    Python-side default is written as the column DEFAULT so existing rows
+    pick it up.
+    """
+    for bind_key, metadata in db.metadatas.items():
+        engine = db.engines[bind_key]
+        inspector = inspect(engine)
+        for table in metadata.tables.values():
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = str(CreateColumn(column).compile(dialect=engine.dialect))
+                if column.server_default is None and column.default is not None and column.default.is_scalar:
+                    default = column.type.literal_processor(engine.dialect)
+                    value = default(column.default.arg) if default else column.default.arg
+                    ddl += f" DEFAULT {value}"
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def ensure_indexes():
+    """Create any index declared on the models that is missing in an existing database.
+
+    `db.create_all()` skips tables that already exist, so indexes added to a
+    model after its table was first created would otherwise never be built.
+    A unique index the existing rows violate is built after the cleanup in
+    UNIQUE_INDEX_CLEANUPS; without one (or if rows still clash) the upgrade
+    stops with SchemaUpgradeError rather than run without the index.
+    """
+    for bind_key, metadata in db.metadatas.items():
+        engine = db.engines[bind_key]
+        for table in metadata.tables.values():
+            for index in table.indexes:
+                try:
+                    index.create(bind=engine, checkfirst=True)
+                except IntegrityError:
+                    cleanup = UNIQUE_INDEX_CLEANUPS.get(index.name)
+                    if cleanup is None:
+                        raise SchemaUpgradeError(f"Cannot create unique index {index.name}: "
+                                                 f"duplicate rows in {table.name}") from None
+                    try:
+                        with engine.begin() as conn:
+                            cleanup(conn)
+                            index.create(bind=conn)
+                    except IntegrityError:
+                        raise SchemaUpgradeError(f"Cannot create unique index {index.name}: duplicate rows "
+                                                 f"in {table.name} remain after cleanup") from None
+
+
+def ensure_schema():
+    db.create_all()
+    ensure_columns()
+    ensure_indexes()
+
+
+def schema_fingerprint(bind_key):
+    """Short hash of the tables, columns and indexes the models declare on one bind."""
+    parts = []
+    for table in sorted(db.metadatas[bind_key].tables.values(), key=lambda table: table.name):
+        parts.append(table.name)
+        parts.extend(f"{column.name} {column.type} {column.nullable}" for column in table.columns)
+        parts.extend(sorted(f"{index.name} {[str(expr) for expr in index.expressions]} {index.unique}"
+                            for index in table.indexes))
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()[:16]
+
+
+def _recorded_fingerprint(engine):
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT fingerprint FROM {VERSION_TABLE}")).scalar()
+    except DBAPIError:
+        return None
+
+
+def outdated_binds():
+    """Bind keys whose database was never upgraded or was upgraded to different models; one query each."""
+    return [bind_key for bind_key in db.metadatas
+            if _recorded_fingerprint(db.engines[bind_key]) != schema_fingerprint(bind_key)]
+
+
+def upgrade_schema():
+    """Bring every database up to the models and record their fingerprints.
+
+    Adds missing tables, columns and indexes (all additive, so safe to
+    repeat), then the search indexes in hospitals.db. This is `flask
+    upgrade-db`; the app no longer does it on every start. A failed step
+    raises before any fingerprint is recorded, so the databases stay
+    out of date.
+    """
+    ensure_schema()
+    ensure_fulltext()
+    ensure_geo()
+    for bind_key in db.metadatas:
+        with db.engines[bind_key].begin() as conn:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} "
+                              "(fingerprint VARCHAR(40) NOT NULL, upgraded_at DATETIME NOT NULL)"))
+            conn.execute(text(f"DELETE FROM {VERSION_TABLE}"))
+            conn.execute(text(f"INSERT INTO {VERSION_TABLE} (fingerprint, upgraded_at) VALUES (:fingerprint, :now)"),
+                         {'fingerprint': schema_fingerprint(bind_key), 'now': datetime.utcnow()})
+
+
+def check_schema(app):
+    """Make sure an out-of-date database is never served, without running DDL at every start.
+
+    With SCHEMA_AUTO_UPGRADE the upgrade runs here when the recorded
+    versions differ. Otherwise the versions are compared on the first
+    request, so CLI commands (`flask upgrade-db` included) still run, and
+    while any database is behind every request gets a 503 naming it.
+    Once `flask upgrade-db` has run, the next request finds the schema
+    current, re-detects the search indexes it created and serves normally;
+    no restart is needed.
+    """
+    if app.config['SCHEMA_AUTO_UPGRADE']:
+        with app.app_context():
+            if outdated_binds():
+                upgrade_schema()
+        return
+    current = threading.Event()
+    logged = threading.Event()
+
+    @app.before_request
+    def require_current_schema():
+        if current.is_set():
+            return None
+        outdated = outdated_binds()
+        if not outdated:
+            if logged.is_set():  # upgraded while we were running
+                init_fulltext(app)
+                detect_rtree(app)
+            current.set()
+            return None
+        message = (f"Database schema out of date ({', '.join(bind_key or 'default' for bind_key in outdated)}); "
+                   "run `flask upgrade-db`")
+        if not logged.is_set():
+            logged.set()
+            app.logger.error(message)
+        return Response(message, status=503, mimetype='text/plain')
@@ -0,0 +1,254 @@
+# utils/shift_search.py
+import base64
+import json
+from datetime import date, datetime as dt
+
+from flask import current_app
+from sqlalchemy import and_, case, false, or_, select
+
+from models import HospitalProfile, Shift
+from utils.fulltext import fts_matches, fulltext_enabled, highlight, like_filter, render_snippet, search_terms
+from utils.geo import hospitals_near, search_origin
+
+# Same options as the create-shift form
+SPECIALTIES = ['General Medicine', 'Anesthesia', 'Surgery', 'Pediatrics', 'Emergency Medicine', 'ICU/CCU',
+               'Cardiology', 'Orthopedics', 'Nursing', 'Other']
+
+# sort name -> (column, descending). Ties are always broken on Shift.id in the
+# same direction so (value, id) is a unique, seekable position.
+SORTS = {
+    'date': (Shift.shift_date, False),
+    'pay': (Shift.pay_rate, True),
+    'newest': (Shift.posted_at, True),
+}
+DEFAULT_SORT = 'date'
+RELEVANCE = 'relevance'  # bm25 rank of a text search; only with `q` and FTS5
+DISTANCE = 'distance'    # km from the search origin; only with `near` (or lat/lon)
+MAX_PAGE_SIZE = 100
+
+
+def _parse_date(value):
+    try:
+        return dt.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_cursor(value, shift_id):
+    if isinstance(value, (date, dt)):
+        value = value.isoformat()
+    raw = json.dumps([value, shift_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Return the (value, id) pair a cursor points at, or None if it is malformed.
+
+    The value is None for a cursor into the NULL tail of a SORTS column.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, shift_id = json.loads(raw)
+        shift_id = int(shift_id)
+        if value is None:
+            return (None, shift_id) if sort in SORTS else None
+        if sort == 'date':
+            value = _parse_date(value)
+        elif sort == 'newest':
+            value = dt.fromisoformat(value)
+        else:
+            value = float(value)
+    except (ValueError, TypeError):
+        return None
+    if value is None:
+        return None
+    return value, shift_id
+
+
+class ShiftSearch:
+    """Server-side filters and keyset pagination for the doctor job listing.
+
+    Each page is a single indexed range scan: `status = 'Open'` plus the
+    optional filters, ordered by (sort column, id) and seeking past the last
+    row of the previous page instead of using OFFSET. Shifts with no value
+    in the sort column (e.g. no pay rate) come after all the others, by id,
+    from a second scan once the first runs out; their cursors carry a null
+    value.
+
+    A free-text `q` is matched against the FTS5 index (utils/fulltext.py),
+    which can also order results by relevance; each returned shift then
+    carries a highlighted `search_snippet`. Without FTS5 the terms become
+    LIKE filters and relevance falls back to the date order.
+
+    With an `origin` (latitude, longitude), only shifts at the nearest
+    GEO_MAX_HOSPITALS hospitals within `radius_km` are listed, found through
+    the spatial index (utils/geo.py), and each gets a `distance_km`.
+    """
+
+    def __init__(self, specialty=None, min_pay=None, date_from=None, date_to=None,
+                 city=None, urgent_only=False, sort=DEFAULT_SORT, page_size=25, cursor=None, q=None,
+                 near=None, origin=None, radius_km=15, max_hospitals=500):
+        self.q = (q or '').strip() or None
+        self.terms = search_terms(self.q)
+        self.fulltext = bool(self.terms) and fulltext_enabled()
+        self.specialty = specialty or None
+        self.min_pay = min_pay
+        self.date_from = date_from
+        self.date_to = date_to
+        self.city = (city or '').strip() or None
+        self.urgent_only = urgent_only
+        self.near = (near or '').strip() or None
+        self.origin = origin
+        self.radius_km = radius_km
+        self.max_hospitals = max_hospitals
+        self.distances = None  # {hospital_id: km}, looked up by the first query with an origin
+        if sort == RELEVANCE:
+            self.sort = RELEVANCE if self.fulltext else DEFAULT_SORT
+        elif sort == DISTANCE:
+            self.sort = DISTANCE if origin else DEFAULT_SORT
+        else:
+            self.sort = sort if sort in SORTS else DEFAULT_SORT
+        self.page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        self.cursor = cursor
+
+    @classmethod
+    def from_args(cls, args, page_size=25):
+        q = args.get('q')
+        origin, radius_km = search_origin(args)
+        if args.get('sort'):
+            sort = args['sort']
+        else:
+            sort = RELEVANCE if q else DISTANCE if origin else DEFAULT_SORT
+        date_from = _parse_date(args.get('date_from'))
+        if date_from is None and 'date_from' not in args:
+            # Past shifts cannot be worked, so hide them unless explicitly asked for.
+            date_from = date.today()
+        return cls(
+            specialty=args.get('specialty'),
+            min_pay=args.get('min_pay', type=float),
+            date_from=date_from,
+            date_to=_parse_date(args.get('date_to')),
+            city=args.get('city'),
+            urgent_only=args.get('urgent') in ('1', 'on', 'true'),
+            sort=sort,
+            page_size=args.get('page_size', page_size, type=int),
+            cursor=args.get('cursor'),
+            q=q,
+            near=args.get('near'),
+            origin=origin,
+            radius_km=radius_km,
+            max_hospitals=current_app.config['GEO_MAX_HOSPITALS'],
+        )
+
+    def filters(self):
+        """Query-string form of the active filters, for building pagination links."""
+        params = {'sort': self.sort}
+        if self.q:
+            params['q'] = self.q
+        if self.near:
+            params['near'] = self.near
+        elif self.origin:
+            params['lat'], params['lon'] = self.origin
+        if self.near or self.origin:
+            params['radius'] = self.radius_km
+        if self.specialty:
+            params['specialty'] = self.specialty
+        if self.min_pay is not None:
+            params['min_pay'] = self.min_pay
+        params['date_from'] = self.date_from.isoformat() if self.date_from else ''
+        if self.date_to:
+            params['date_to'] = self.date_to.isoformat()
+        if self.city:
+            params['city'] = self.city
+        if self.urgent_only:
+            params['urgent'] = '1'
+        return params
+
+    def query(self, position=None, nulls=False):
+        """Rows after `position` ((value, id) from a cursor); with `nulls`, the rows whose sort column is NULL."""
+        q = Shift.query.filter(Shift.status == 'Open')
+        matches = None
+        if self.fulltext:
+            matches = fts_matches(self.terms)
+            q = q.join(matches, matches.c.rowid == Shift.id).add_columns(matches.c.rank, matches.c.snippet)
+        elif self.terms:
+            q = q.filter(like_filter(self.terms))
+        if self.origin:
+            if self.distances is None:
+                self.distances = dict(hospitals_near(*self.origin, self.radius_km, limit=self.max_hospitals))
+            q = q.filter(Shift.hospital_id.in_(list(self.distances)) if self.distances else false())
+
+        if self.sort == RELEVANCE:
+            column, descending = matches.c.rank, False  # bm25: lower is better
+        elif self.sort == DISTANCE:
+            column, descending = case(self.distances, value=Shift.hospital_id) if self.distances else Shift.id, False
+        else:
+            column, descending = SORTS[self.sort]
+
+        if self.specialty:
+            q = q.filter(Shift.specialty == self.specialty)
+        if self.min_pay is not None:
+            q = q.filter(Shift.pay_rate >= self.min_pay)
+        if self.date_from:
+            q = q.filter(Shift.shift_date >= self.date_from)
+        if self.date_to:
+            q = q.filter(Shift.shift_date <= self.date_to)
+        if self.urgent_only:
+            q = q.filter(Shift.is_urgent.is_(True))
+        if self.city:
+            hospitals_in_city = select(HospitalProfile.hospital_id).where(HospitalProfile.city == self.city)
+            q = q.filter(Shift.hospital_id.in_(hospitals_in_city))
+
+        # NULLs have no place in a (value, id) seek, so they are listed
+        # separately, after the others, ordered by id alone.
+        if nulls:
+            q = q.filter(column.is_(None))
+            if position:
+                q = q.filter(Shift.id < position[1] if descending else Shift.id > position[1])
+            return q.order_by(Shift.id.desc() if descending else Shift.id.asc())
+        q = q.filter(column.isnot(None))
+
+        if position:
+            value, shift_id = position
+            if descending:
+                q = q.filter(or_(column < value, and_(column == value, Shift.id < shift_id)))
+            else:
+                q = q.filter(or_(column > value, and_(column == value, Shift.id > shift_id)))
+
+        if descending:
+            return q.order_by(column.desc(), Shift.id.desc())
+        return q.order_by(column.asc(), Shift.id.asc())
+
+    def page(self):
+        """Return (shifts, next_cursor); next_cursor is None on the last page."""
+        limit = self.page_size + 1
+        position = decode_cursor(self.cursor, self.sort)
+        in_tail = position is not None and position[0] is None
+        rows = [] if in_tail else self.query(position).limit(limit).all()
+        if len(rows) < limit and self.sort in SORTS:
+            rows += self.query(position if in_tail else None, nulls=True).limit(limit - len(rows)).all()
+        if self.fulltext:
+            shifts = []
+            for shift, rank, snippet in rows:
+                shift.search_rank = rank
+                shift.search_snippet = render_snippet(snippet)
+                shifts.append(shift)
+            rows = shifts
+        elif self.terms:
+            for shift in rows:
+                shift.search_snippet = highlight(shift.requirements, self.terms) or highlight(shift.title, self.terms)
+        if self.origin:
+            for shift in rows:
+                shift.distance_km = self.distances.get(shift.hospital_id)
+        if len(rows) <= self.page_size:
+            return rows, None
+        rows = rows[:self.page_size]
+        last = rows[-1]
+        if self.sort == RELEVANCE:
+            return rows, encode_cursor(last.search_rank, last.id)
+        if self.sort == DISTANCE:
+            return rows, encode_cursor(last.distance_km, last.id)
+        column, _ = SORTS[self.sort]
+        return rows, encode_cursor(getattr(last, column.key), last.id)
@@ -0,0 +1,172 @@
+# utils/uploads.py
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from models import db
+
+
+class CloudinaryStorage:
+    """Uploads to Cloudinary; the SDK is imported and configured on the first upload, not at startup."""
+
+    def __init__(self):
+        self.configured = False
+
+    def save(self, path):
+        import cloudinary
+        from cloudinary.uploader import upload
+        if not self.configured:
+            cloudinary.config(
+                cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
+                api_key=os.environ.get('CLOUDINARY_API_KEY'),
+                api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
+                secure=True
+            )
+            self.configured = True
+        result = upload(path, resource_type="auto")
+        return result['secure_url']
+
+
+class LocalStorage:
+    """Stand-in backend that copies files under static/ (static/uploads/docs by default)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def save(self, path):
+        os.makedirs(self.directory, exist_ok=True)
+        name = os.path.basename(path)
+        shutil.copyfile(path, os.path.join(self.directory, name))
+        relative = os.path.relpath(os.path.join(self.directory, name), current_app.static_folder)
+        return f"{current_app.static_url_path}/{relative.replace(os.sep, '/')}"
+
+
+def make_storage(app):
+    backend = app.config['DOCUMENT_STORAGE']
+    if backend == 'cloudinary':
+        return CloudinaryStorage()
+    if backend == 'local':
+        return LocalStorage(app.config['LOCAL_UPLOAD_DIR'])
+    raise ValueError(f"Unknown DOCUMENT_STORAGE backend: {backend}")
+
+
+class UploadPipeline:
+    """Spool uploaded files to disk and push them to storage off the request thread.
+
+    The request only writes the file to UPLOAD_SPOOL_DIR and creates the
+    document row with status 'Pending' and no file_path; the spooled copy
+    is named after the row (`<table>-<id>-<filename>`), so the server's
+    paths never reach the database. A worker thread then uploads it,
+    retrying with exponential backoff, and moves the row to 'Uploaded' with
+    the storage URL, or to 'Failed'. Either way the spooled copy is then
+    deleted. UPLOAD_WORKERS = 0 runs the transfer inline, which tests use.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.storage = make_storage(app)
+        self.spool_dir = app.config['UPLOAD_SPOOL_DIR']
+        self.max_retries = app.config['UPLOAD_MAX_RETRIES']
+        self.retry_delay = app.config['UPLOAD_RETRY_DELAY']
+        workers = app.config['UPLOAD_WORKERS']
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload') if workers else None
+        app.extensions['upload_pipeline'] = self
+
+    def spool(self, file, model, document_id):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        name = f"{model.__tablename__}-{document_id}-{secure_filename(file.filename) or 'document'}"
+        path = os.path.join(self.spool_dir, name)
+        file.save(path)
+        return path
+
+    def accept(self, model, owner_field, owner_id, document_type, file):
+        """Spool `file`, create a Pending `model` row and queue the transfer. Returns the row."""
+        document = model(document_type=document_type, file_path=None, status='Pending')
+        setattr(document, owner_field, owner_id)
+        db.session.add(document)
+        path = None
+        try:
+            db.session.flush()
+            path = self.spool(file, model, document.id)
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            _remove(path)
+            raise
+        self.submit(model, document.id, path)
+        return document
+
+    def submit(self, model, document_id, path):
+        if self.executor is None:
+            self._transfer(model, document_id, path)
+        else:
+            self.executor.submit(self._transfer, model, document_id, path)
+
+    def _transfer(self, model, document_id, path):
+        with self.app.app_context():
+            url = None
+            metrics = self.app.extensions.get('metrics')
+            for attempt in range(self.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    url = self.storage.save(path)
+                    if metrics:
+                        metrics.uploads.observe(time.perf_counter() - started, backend=self.app.config['DOCUMENT_STORAGE'],
+                                                outcome='ok')
+                    break
+                except Exception:
+                    if metrics:
+                        metrics.uploads.observe(time.perf_counter() - started, backend=self.app.config['DOCUMENT_STORAGE'],
+                                                outcome='error')
+                    self.app.logger.exception("Upload of %s #%s failed (attempt %d)",
+                                              model.__tablename__, document_id, attempt + 1)
+                    if attempt < self.max_retries:
+                        time.sleep(self.retry_delay * 2 ** attempt)
+
+            try:
+                document = db.session.get(model, document_id)
+                if document is not None:
+                    if url:
+                        document.file_path = url
+                        document.status = 'Uploaded'
+                    else:
+                        document.file_path = None
+                        document.status = 'Failed'
+                    db.session.commit()
+            finally:
+                db.session.remove()
+                _remove(path)
+
+    def resume(self, *models):
+        """Re-queue Pending documents whose spooled file survived a restart."""
+        spooled = {}
+        if os.path.isdir(self.spool_dir):
+            for entry in os.scandir(self.spool_dir):
+                table, _, rest = entry.name.partition('-')
+                document_id, _, _ = rest.partition('-')
+                if document_id.isdigit():
+                    spooled[(table, int(document_id))] = entry.path
+        count = 0
+        for model in models:
+            for document in model.query.filter_by(status='Pending'):
+                path = spooled.get((model.__tablename__, document.id))
+                if path is None and document.file_path and os.path.exists(document.file_path):
+                    path = document.file_path  # spooled before rows stopped holding the path
+                if path is not None:
+                    self.submit(model, document.id, path)
+                    count += 1
+        return count
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def get_pipeline():
+    return current_app.extensions['upload_pipeline']
@@ -0,0 +1,64 @@
+# utils/upsert.py
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+
+def dialect_insert(session, model):
+    """The INSERT construct with ON CONFLICT support for the model's bind (SQLite/PostgreSQL), else None."""
+    dialect = session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as on_conflict_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as on_conflict_insert
+    else:
+        return None
+    return on_conflict_insert
+
+
+def insert_ignore(session, model, values):
+    """INSERT `values`, doing nothing if a unique index already holds the row; returns True if a row was written.
+
+    Uses ON CONFLICT DO NOTHING where supported, otherwise a savepoint that
+    swallows the IntegrityError.
+    """
+    on_conflict_insert = dialect_insert(session, model)
+    if on_conflict_insert is not None:
+        return session.execute(on_conflict_insert(model).values(**values).on_conflict_do_nothing()).rowcount == 1
+    try:
+        with session.begin_nested():
+            session.execute(insert(model).values(**values))
+    except IntegrityError:
+        return False
+    return True
+
+
+def upsert(session, model, values, keys, add):
+    """INSERT `values`, or add the `add` columns onto the row already holding the same `keys`.
+
+    Uses ON CONFLICT DO UPDATE where supported. Elsewhere the row is updated
+    first and inserted if missing; an insert that loses a race to another
+    writer falls back to the update.
+    """
+    on_conflict_insert = dialect_insert(session, model)
+    if on_conflict_insert is not None:
+        statement = on_conflict_insert(model).values(**values)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: getattr(model, column) + getattr(statement.excluded, column) for column in add},
+        ))
+        return
+
+    def add_to_existing():
+        return session.execute(
+            update(model)
+            .where(*(getattr(model, key) == values[key] for key in keys))
+            .values({column: getattr(model, column) + values[column] for column in add})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if not add_to_existing():
+        try:
+            with session.begin_nested():
+                session.execute(insert(model).values(**values))
+        except IntegrityError:
+            add_to_existing()
@@ -0,0 +1,109 @@
+# utils/user_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import db, DoctorUser, HospitalUser
+
+
+class UserCache:
+    """Short-lived, in-process cache of authenticated users keyed by `get_id()`.
+
+    Only the user's column values are cached. On a hit a fresh instance is
+    rebuilt from them and attached to the request's session as if it had
+    been loaded, so relationships such as `current_user.profile` still
+    lazy-load normally, but the user row itself costs no query.
+
+    Entries expire after USER_CACHE_TTL seconds and are dropped explicitly
+    whenever the user row is updated or deleted (password change etc.).
+    Other worker processes only see such changes once their own entry
+    expires, which is why the TTL is kept short.
+    """
+
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def load(self, model, user_key, pk):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                values = entry[1]
+            else:
+                self.misses += 1
+                values = None
+
+        if values is not None:
+            user = model(**values)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(model, pk)
+        if user is not None:
+            values = {attr.key: getattr(user, attr.key) for attr in inspect(model).column_attrs}
+            with self._lock:
+                self._entries[user_key] = (now + self.ttl, values)
+                self._entries.move_to_end(user_key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_key):
+        with self._lock:
+            if self._entries.pop(user_key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def init_user_cache(app):
+    cache = UserCache(ttl=app.config['USER_CACHE_TTL'], max_size=app.config['USER_CACHE_MAX_SIZE'])
+    app.extensions['user_cache'] = cache
+    return cache
+
+
+def get_user_cache():
+    return current_app.extensions['user_cache']
+
+
+def invalidate_user(user):
+    if has_app_context() and 'user_cache' in current_app.extensions:
+        get_user_cache().invalidate(user.get_id())
+
+
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target)
+
+
+def watch(*models):
+    """Drop cached entries whenever a row of `models` is updated or deleted."""
+    for model in models:
+        event.listen(model, 'after_update', _invalidate_on_change)
+        event.listen(model, 'after_delete', _invalidate_on_change)
+
+
+watch(DoctorUser, HospitalUser)